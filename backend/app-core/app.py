@@ -1,10 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from lib.helpers.extraction import shutdown_document_extractor
+from lib.helpers.openai import close_async_openai_helper
+from lib.helpers.s3 import close_s3_handler
 from router.dev import router as dev_router
+from db.db import engine, replica_engine, track_writes
+from router.resume import router as resume_router
+from router.role import router as role_router
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Release pooled connections held by process-wide clients
+    await close_async_openai_helper()
+    await close_s3_handler()
+    shutdown_document_extractor()
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
-app: FastAPI = FastAPI()
+
+app: FastAPI = FastAPI(lifespan=lifespan)
 
 # Should be coming from config/env
 origins: list[str] = [
@@ -20,4 +40,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.middleware("http")(track_writes)
+
 app.include_router(dev_router, prefix="/dev")
+app.include_router(resume_router, prefix="/resume")
+app.include_router(role_router, prefix="/role")
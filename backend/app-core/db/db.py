@@ -1,7 +1,16 @@
+import asyncio
+import logging
+import math
 import os
+import time
+from contextvars import ContextVar
+from uuid import uuid4
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from fastapi import Request, Response
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from contextlib import asynccontextmanager
 
@@ -13,10 +22,86 @@ host = postgres_settings.HOST
 port = postgres_settings.PORT
 db = postgres_settings.DB
 
-def get_db_url(is_async=False):
+def get_db_url(is_async=False, host=host, port=port):
     return f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{db}" if is_async else f"postgresql://{user}:{password}@{host}:{port}/{db}"
 
-engine = create_async_engine(get_db_url(is_async=True))
+
+class PoolMetrics:
+    """
+    Time spent waiting for a connection from the pool, accumulated since the process started
+    """
+
+    def __init__(self):
+        self.checkouts: int = 0
+        self.total_wait_seconds: float = 0.0
+        self.max_wait_seconds: float = 0.0
+
+    def record_wait(self, wait_seconds: float) -> None:
+        self.checkouts += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default pool of async engines, measuring how long each checkout waits for a connection
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.metrics.record_wait(time.perf_counter() - started_at)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def get_connect_args() -> dict:
+    """
+    Arguments passed to asyncpg when opening connections.
+    In PgBouncer transaction mode, prepared statements are disabled, and any statement that is still prepared
+    (ie: by the asyncpg dialect itself) gets a unique name, so that it never collides on a shared server connection.
+    """
+
+    connect_args: dict = {"timeout": postgres_settings.CONNECT_TIMEOUT_SECONDS}
+
+    if postgres_settings.PGBOUNCER_TRANSACTION_MODE:
+        connect_args.update(
+            statement_cache_size=0,
+            prepared_statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+        )
+    else:
+        connect_args.update(
+            statement_cache_size=postgres_settings.STATEMENT_CACHE_SIZE,
+            prepared_statement_cache_size=postgres_settings.STATEMENT_CACHE_SIZE,
+        )
+
+    return connect_args
+
+
+def create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=postgres_settings.POOL_SIZE,
+        max_overflow=postgres_settings.MAX_OVERFLOW,
+        pool_timeout=postgres_settings.POOL_TIMEOUT_SECONDS,
+        pool_recycle=postgres_settings.POOL_RECYCLE_SECONDS,
+        pool_pre_ping=postgres_settings.POOL_PRE_PING,
+        connect_args=get_connect_args(),
+    )
+
+
+engine = create_engine(get_db_url(is_async=True))
 
 AsyncSessionLocal = sessionmaker(
     bind=engine, 
@@ -24,10 +109,206 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False, 
 )
 
+replica_engine: AsyncEngine | None = None
+ReadSessionLocal = AsyncSessionLocal
+if postgres_settings.REPLICA_HOST:
+    replica_engine = create_engine(
+        get_db_url(is_async=True, host=postgres_settings.REPLICA_HOST, port=postgres_settings.REPLICA_PORT)
+    )
+    ReadSessionLocal = sessionmaker(
+        bind=replica_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+# Zero on a primary, or on a replica that replayed everything it received
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+# Cookie holding when the client last wrote (epoch seconds), so that its reads are routed to see its own writes
+LAST_WRITE_COOKIE = "last_write_at"
+
+
+class WriteTracker:
+    """
+    When the current request last committed a write to the primary (epoch seconds), see `track_writes`
+    """
+
+    def __init__(self):
+        self.committed_at: float | None = None
+
+
+current_write_tracker: ContextVar[WriteTracker | None] = ContextVar("current_write_tracker", default=None)
+
+
+class ReplicaRouter:
+    """
+    Decides whether a read-only session can be served by the replica, or must go to the primary.
+
+    Reads go to the primary when:
+      - The replica lags further behind than `max_lag_seconds`, or its lag cannot be measured
+      - The client reading wrote more recently than the replica's lag (plus a margin of
+        `lag_check_interval_seconds`), so that it sees its own write
+
+    The replica's lag is measured at most once every `lag_check_interval_seconds`.
+    NOTE: Only the client's own writes are waited for, writes of other clients and processes
+    (ie: scoring workers) become visible once the replica catches up.
+    """
+
+    def __init__(
+        self,
+        max_lag_seconds: float,
+        lag_check_interval_seconds: float,
+    ):
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_interval_seconds = lag_check_interval_seconds
+        self.lag_seconds: float | None = None
+        self.lag_checked_at: float = float("-inf")
+        self._lag_lock = asyncio.Lock()
+
+    async def get_lag_seconds(self) -> float | None:
+        """
+        Returns the lag of the replica, measured at most once every `lag_check_interval_seconds`,
+        or None when it could not be measured
+        """
+
+        if time.monotonic() - self.lag_checked_at < self.lag_check_interval_seconds:
+            return self.lag_seconds
+
+        async with self._lag_lock:
+            if time.monotonic() - self.lag_checked_at >= self.lag_check_interval_seconds:
+                try:
+                    async with replica_engine.connect() as connection:
+                        self.lag_seconds = float((await connection.execute(REPLICA_LAG_QUERY)).scalar())
+                except Exception as e:
+                    logging.error(f"Failed to measure replica lag, reading from the primary | {str(e)}")
+                    self.lag_seconds = None
+                self.lag_checked_at = time.monotonic()
+
+        return self.lag_seconds
+
+    async def get_session_factory(self, last_write_at: float | None = None) -> sessionmaker:
+        """
+        Args:
+          - last_write_at: When the client reading last wrote (epoch seconds), if known
+        """
+
+        if replica_engine is None:
+            return AsyncSessionLocal
+
+        lag_seconds = await self.get_lag_seconds()
+        if lag_seconds is None or lag_seconds > self.max_lag_seconds:
+            return AsyncSessionLocal
+
+        if last_write_at is not None and time.time() - last_write_at < lag_seconds + self.lag_check_interval_seconds:
+            return AsyncSessionLocal
+
+        return ReadSessionLocal
+
+
+replica_router = ReplicaRouter(
+    max_lag_seconds=postgres_settings.REPLICA_MAX_LAG_SECONDS,
+    lag_check_interval_seconds=postgres_settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+)
+
+
+@event.listens_for(engine.sync_engine, "commit")
+def record_primary_commit(conn) -> None:
+    tracker: WriteTracker | None = current_write_tracker.get()
+    if tracker is not None:
+        tracker.committed_at = time.time()
+
+
+async def track_writes(request: Request, call_next) -> Response:
+    """
+    HTTP middleware tracking whether a request wrote to the primary, in which case the time of the write is sent
+    back in the `LAST_WRITE_COOKIE` cookie, so that the client's next reads go to the primary until the replica
+    caught up with it (see `get_read_db`).
+    NOTE: Writes made after the response is sent (ie: by background tasks) are not tracked.
+    """
+
+    tracker = WriteTracker()
+    token = current_write_tracker.set(tracker)
+    try:
+        response: Response = await call_next(request)
+    finally:
+        current_write_tracker.reset(token)
+
+    if tracker.committed_at is not None and replica_engine is not None:
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            str(tracker.committed_at),
+            # Past the maximum lag, reads go to the primary anyway
+            max_age=math.ceil(replica_router.max_lag_seconds + replica_router.lag_check_interval_seconds),
+            httponly=True,
+            samesite="lax",
+        )
+
+    return response
+
+
+def get_last_write_at(request: Request) -> float | None:
+    """
+    Returns when the client last wrote (epoch seconds), in this request or as reported by its `LAST_WRITE_COOKIE`
+    """
+
+    last_write_at: float | None = None
+    try:
+        last_write_at = float(request.cookies[LAST_WRITE_COOKIE])
+    except (KeyError, ValueError):
+        pass
+
+    tracker: WriteTracker | None = current_write_tracker.get()
+    if tracker is not None and tracker.committed_at is not None:
+        last_write_at = max(last_write_at or 0.0, tracker.committed_at)
+
+    return last_write_at
+
+
+def get_pool_status() -> dict:
+    """
+    Returns the usage of the engine's connection pool: its configured size, the connections currently
+    checked out, idle and in overflow, and the time checkouts spent waiting for a connection.
+    """
+
+    pool: InstrumentedQueuePool = engine.pool
+    metrics: PoolMetrics = pool.metrics
+
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": postgres_settings.MAX_OVERFLOW,
+        "checkouts": metrics.checkouts,
+        "average_wait_seconds": metrics.total_wait_seconds / metrics.checkouts if metrics.checkouts else 0.0,
+        "max_wait_seconds": metrics.max_wait_seconds,
+    }
+
+
 async def get_db():
     async with AsyncSessionLocal() as db:
         yield db
 
+async def get_read_db(request: Request):
+    """
+    Session for read-only handlers, served by the read replica when one is configured and fresh enough
+    for the client (see `ReplicaRouter`), and by the primary otherwise.
+    NOTE: Never write through this session.
+    """
+
+    session_factory: sessionmaker = await replica_router.get_session_factory(
+        last_write_at=get_last_write_at(request)
+    )
+    async with session_factory() as db:
+        yield db
+
 @asynccontextmanager
 async def get_context_managed_session():
     async with AsyncSessionLocal() as db:
@@ -1,7 +1,11 @@
-from sqlalchemy import Column, Integer, String
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, func, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base
 
 from lib.helpers.ulid import generate_ulid
+from lib.models.product.resume import StatusTypes
 
 
 Base = declarative_base()
@@ -13,3 +17,62 @@ class Test(Base):
     id: str = Column(String, primary_key=True, default=generate_ulid)
     message: str = Column(String)
     number: int = Column(Integer)
+
+
+class Role(Base):
+    __tablename__ = "role"
+
+    id: str = Column(String, primary_key=True, default=generate_ulid)
+    name: str = Column(String, nullable=False)
+    description: str = Column(String, nullable=False)
+
+
+class Resume(Base):
+    __tablename__ = "resume"
+
+    id: str = Column(String, primary_key=True, default=generate_ulid)
+    role_id: str = Column(String, ForeignKey("role.id"), nullable=False)
+    status: StatusTypes = Column(String, nullable=False, default=StatusTypes.PENDING)
+    content: str = Column(String, nullable=False)
+    # Hash of the original file, see `hash_document_content`
+    content_hash: str = Column(String)
+    s3_object_key: str = Column(String)
+    base_requirement_satisfaction_score: int = Column(Integer)
+    exceptional_considerations: str = Column(String)
+    fitness_score: int = Column(Integer)
+
+    # Work queue lease, held by the scoring worker processing the resume
+    lease_owner: str = Column(String)
+    lease_expires_at: datetime = Column(DateTime(timezone=True))
+    attempts: int = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # Listing by role and status, in ID (keyset) order
+        Index("ix_resume_role_id_status_id", "role_id", "status", "id"),
+        # Listing by role and classifier (fitness score range)
+        Index("ix_resume_role_id_fitness_score", "role_id", "fitness_score"),
+        # Duplicate detection at registration
+        Index("ix_resume_role_id_content_hash", "role_id", "content_hash"),
+        # Work queue: claiming PENDING resumes oldest first, and reclaiming expired leases.
+        # Partial, so they stay small no matter how many resumes were already processed.
+        Index("ix_resume_pending_id", "id", postgresql_where=text("status = 'pending'")),
+        Index("ix_resume_in_progress_lease_expires_at", "lease_expires_at", postgresql_where=text("status = 'in_progress'")),
+    )
+
+
+class AssessmentCacheEntry(Base):
+    __tablename__ = "assessment_cache"
+
+    key: str = Column(String, primary_key=True)
+    assessment: dict = Column(JSONB, nullable=False)
+    created_at: datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_accessed_at: datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+
+
+class ExtractedTextCacheEntry(Base):
+    __tablename__ = "extracted_text_cache"
+
+    content_hash: str = Column(String, primary_key=True)
+    text: str = Column(String, nullable=False)
+    created_at: datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_accessed_at: datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
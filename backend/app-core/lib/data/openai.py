@@ -35,3 +35,53 @@ TOOLS: dict[RoleTypes] = {
     }
   }
 }
+
+
+def build_multi_resume_tool(tool: dict) -> dict:
+  """
+  Builds the multi-resume counterpart of an assessment tool, which returns one assessment per resume,
+  keyed by resume ID, with the same fields as the single resume tool.
+  """
+
+  function: dict = tool["function"]
+  assessment_parameters: dict = function["parameters"]
+
+  return {
+    "type": "function",
+    "function": {
+      "name": "get_resume_assessments",
+      "description": function["description"] + """
+        Several resumes are provided at once, each delimited by a <resume id="..."> tag.
+        Assess every resume on its own, independently of the other resumes, and return exactly one assessment per resume.
+      """,
+      "parameters": {
+        "type": "object",
+        "properties": {
+          "assessments": {
+            "type": "array",
+            "description": "One assessment per provided resume",
+            "items": {
+              "type": "object",
+              "properties": {
+                "resume_id": {
+                  "type": "string",
+                  "description": "The ID of the assessed resume, exactly as given in its <resume id=\"...\"> tag"
+                },
+                **assessment_parameters["properties"],
+              },
+              "required": ["resume_id", *assessment_parameters["required"]],
+              "additionalProperties": False,
+            },
+          },
+        },
+        "required": ["assessments"],
+        "additionalProperties": False,
+      }
+    }
+  }
+
+
+MULTI_RESUME_TOOLS: dict[RoleTypes] = {
+  role_type: build_multi_resume_tool(tool)
+  for role_type, tool in TOOLS.items()
+}
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import re
+
+from lib.helpers.db.kv_cache import KVCacheDBHelper
+from lib.helpers.kv_cache import PostgresKVCache
+
+from db.models import AssessmentCacheEntry
+
+from settings import assessment_cache_settings
+
+
+def normalize_resume_text(resume_text: str) -> str:
+  """
+  Normalizes resume text so that re-extractions of the same resume map to the same cache key.
+  Collapses all whitespace runs into single spaces and lower-cases the text.
+  """
+
+  return re.sub(r"\s+", " ", resume_text).strip().lower()
+
+
+def build_assessment_cache_key(
+  resume_text: str,
+  role_description: str,
+  model: str,
+  tools: list[dict[str]],
+) -> str:
+  """
+  Builds a content-addressed cache key for an assessment.
+  Any change to the resume, the role, the model or the tool schema yields a new key.
+
+  Returns:
+    - The SHA-256 hex digest identifying the assessment
+  """
+
+  payload = json.dumps(
+    {
+      "resume_text": normalize_resume_text(resume_text),
+      "role_description": role_description.strip(),
+      "model": model,
+      "tools": tools,
+    },
+    sort_keys=True,
+    ensure_ascii=False,
+  )
+  return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AssessmentCache(PostgresKVCache):
+  """
+  Persistent (Postgres-backed) cache of OpenAI resume assessments, keyed by `build_assessment_cache_key`,
+  with a TTL and size-bounded LRU eviction (see `PostgresKVCache`).
+  """
+
+  def __init__(
+    self,
+    ttl_seconds: int,
+    max_entries: int,
+    enabled: bool = True,
+    eviction_interval: int = 100,
+  ):
+    super().__init__(
+      name="assessment cache",
+      db_helper=KVCacheDBHelper(
+        model=AssessmentCacheEntry,
+        key_column=AssessmentCacheEntry.key,
+        value_column=AssessmentCacheEntry.assessment,
+      ),
+      max_entries=max_entries,
+      ttl_seconds=ttl_seconds,
+      enabled=enabled,
+      eviction_interval=eviction_interval,
+    )
+
+
+_assessment_cache: AssessmentCache | None = None
+
+
+def get_assessment_cache() -> AssessmentCache:
+  """
+  Returns the process-wide `AssessmentCache`, creating it from settings on first use
+  """
+
+  global _assessment_cache
+
+  if _assessment_cache is None:
+    _assessment_cache = AssessmentCache(
+      ttl_seconds=assessment_cache_settings.TTL_SECONDS,
+      max_entries=assessment_cache_settings.MAX_ENTRIES,
+      enabled=assessment_cache_settings.ENABLED,
+    )
+
+  return _assessment_cache
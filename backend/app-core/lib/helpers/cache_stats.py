@@ -0,0 +1,16 @@
+class CacheStats:
+  """
+  Hits and misses of a cache. Caches counting more events extend it.
+  """
+
+  def __init__(self):
+    self.hits: int = 0
+    self.misses: int = 0
+
+  @property
+  def hit_rate(self) -> float:
+    lookups = self.hits + self.misses
+    return self.hits / lookups if lookups else 0.0
+
+  def __str__(self) -> str:
+    return f"hits={self.hits} misses={self.misses} hit_rate={self.hit_rate:.2%}"
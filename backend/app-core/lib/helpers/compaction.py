@@ -0,0 +1,252 @@
+import logging
+import re
+import unicodedata
+
+from lib.helpers.rate_limit import estimate_tokens
+
+from settings import compaction_settings
+
+try:
+  import tiktoken
+except ImportError:
+  tiktoken = None
+
+
+# Lines that are explicitly page numbers, ie: "Page 2", "Page 2 of 5", "2 of 5", "2/5", "- 4 -"
+# Numbers are capped at 3 digits, so that years and dates (ie: "2019", "06/2019") are never taken for page numbers
+PAGE_NUMBER_LINE = re.compile(
+  r"^(page\s*\d{1,3}(\s*(of|/)\s*\d{1,3})?|\d{1,3}\s*(of|/)\s*\d{1,3}|[-–—]\s*\d{1,3}\s*[-–—])$",
+  re.IGNORECASE,
+)
+# A bare number, only taken for a page number on the first or last line of a page, ie: "3"
+BARE_PAGE_NUMBER_LINE = re.compile(r"^\d{1,3}$")
+# A hyphen at a line break, ie: "manage-\nment" split by the PDF layout, or a compound such as "full-\nstack"
+HYPHENATED_LINE_BREAK = re.compile(r"(\w)-\n(\w)")
+# Control characters left by extraction, except newlines, tabs and form feeds (page breaks)
+CONTROL_CHARACTERS = re.compile(r"[\x00-\x08\x0b\x0e-\x1f\x7f]")
+WHITESPACE_RUN = re.compile(r"[ \t\u00a0]+")
+PAGE_BREAK = "\x0c"
+# The number of lines at the top and bottom of each page where running headers and footers are looked for
+PAGE_EDGE_LINES = 3
+
+
+class Tokenizer:
+  """
+  Counts and truncates tokens with the `tiktoken` encoding used by the model, when `tiktoken` is installed
+  and its encoding can be loaded. Otherwise falls back to the ~4 characters per token estimate of `estimate_tokens`.
+  """
+
+  def __init__(self, encoding_name: str):
+    self.encoding = None
+
+    if tiktoken is None:
+      logging.warning("tiktoken is not installed, estimating token counts from text length")
+      return
+
+    try:
+      self.encoding = tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+      logging.warning(f"Failed to load tokenizer encoding {encoding_name}, estimating token counts | {str(e)}")
+
+  def count(self, text: str) -> int:
+    if self.encoding is None:
+      return estimate_tokens(text)
+
+    return len(self.encoding.encode(text, disallowed_special=()))
+
+  def truncate(self, text: str, max_tokens: int) -> str:
+    """
+    Truncates the text to at most `max_tokens` tokens, cutting at the last line break that fits when possible.
+    """
+
+    if self.encoding is None:
+      truncated = text[:max(0, (max_tokens - 1) * 4)]
+    else:
+      tokens = self.encoding.encode(text, disallowed_special=())
+      if len(tokens) <= max_tokens:
+        return text
+      truncated = self.encoding.decode(tokens[:max_tokens])
+
+    line_break = truncated.rfind("\n")
+    if line_break > len(truncated) // 2:
+      truncated = truncated[:line_break]
+
+    return truncated
+
+
+class CompactionResult:
+  """
+  text: The compacted text.
+  original_tokens: The number of tokens of the text before compaction.
+  compacted_tokens: The number of tokens of the compacted text.
+  is_truncated: Whether the text had to be cut to fit the token ceiling.
+  """
+
+  def __init__(
+    self,
+    text: str,
+    original_tokens: int,
+    compacted_tokens: int,
+    is_truncated: bool,
+  ):
+    self.text = text
+    self.original_tokens = original_tokens
+    self.compacted_tokens = compacted_tokens
+    self.is_truncated = is_truncated
+
+  @property
+  def tokens_saved(self) -> int:
+    return self.original_tokens - self.compacted_tokens
+
+
+class CompactionStats:
+  def __init__(self):
+    self.texts: int = 0
+    self.truncated: int = 0
+    self.original_tokens: int = 0
+    self.compacted_tokens: int = 0
+
+  @property
+  def tokens_saved(self) -> int:
+    return self.original_tokens - self.compacted_tokens
+
+  @property
+  def saved_rate(self) -> float:
+    return self.tokens_saved / self.original_tokens if self.original_tokens else 0.0
+
+  def record(self, result: CompactionResult) -> None:
+    self.texts += 1
+    self.truncated += int(result.is_truncated)
+    self.original_tokens += result.original_tokens
+    self.compacted_tokens += result.compacted_tokens
+
+  def __str__(self) -> str:
+    return (
+      f"texts={self.texts} truncated={self.truncated} original_tokens={self.original_tokens} "
+      f"compacted_tokens={self.compacted_tokens} tokens_saved={self.tokens_saved} saved_rate={self.saved_rate:.2%}"
+    )
+
+
+def normalize_extracted_text(text: str) -> str:
+  """
+  Removes extraction artifacts from resume text without changing its content:
+    - Normalizes unicode (ie: ligatures such as "ﬁ") and strips control characters
+    - Joins words hyphenated across line breaks, keeping the hyphen, as it cannot be told whether it splits a word
+      (ie: "manage-ment") or belongs to a compound (ie: "full-stack"), which must not be merged
+    - Collapses runs of spaces and tabs, and strips each line
+    - Drops page number lines ("Page 2", "2 of 5", or a bare number on the first or last line of a page),
+      and running headers and footers (lines at the edge of a page that already appeared at the edge of a previous page)
+    - Drops lines identical to the line before them, and collapses runs of blank lines
+  """
+
+  text = unicodedata.normalize("NFKC", text)
+  text = text.replace("\r\n", "\n").replace("\r", "\n")
+  text = CONTROL_CHARACTERS.sub("", text)
+  text = HYPHENATED_LINE_BREAK.sub(r"\1-\2", text)
+
+  lines: list[str] = []
+  page_edge_lines: set[str] = set()
+  for page in text.split(PAGE_BREAK):
+    page_lines: list[str] = [
+      line
+      for line in (WHITESPACE_RUN.sub(" ", line).strip() for line in page.split("\n"))
+      if not PAGE_NUMBER_LINE.match(line)
+    ]
+
+    content_indexes: list[int] = [i for i, line in enumerate(page_lines) if line]
+    if content_indexes:
+      page_number_indexes: set[int] = {
+        i for i in (content_indexes[0], content_indexes[-1]) if BARE_PAGE_NUMBER_LINE.match(page_lines[i])
+      }
+      page_lines = [line for i, line in enumerate(page_lines) if i not in page_number_indexes]
+
+    content_indexes: list[int] = [i for i, line in enumerate(page_lines) if line]
+    edge_indexes: set[int] = set(content_indexes[:PAGE_EDGE_LINES] + content_indexes[-PAGE_EDGE_LINES:])
+
+    for i, line in enumerate(page_lines):
+      if i in edge_indexes:
+        key = line.lower()
+        if key in page_edge_lines:
+          continue
+        page_edge_lines.add(key)
+
+      if not line:
+        if lines and lines[-1]:
+          lines.append("")
+        continue
+
+      if lines and lines[-1] == line:
+        continue
+      lines.append(line)
+
+    if lines and lines[-1]:
+      lines.append("")
+
+  return "\n".join(lines).strip()
+
+
+class TextCompactor:
+  """
+  Compacts extracted resume text before it is sent for scoring, to cut token cost and latency:
+  normalizes the text (see `normalize_extracted_text`) and enforces a ceiling of `max_tokens`.
+  """
+
+  def __init__(
+    self,
+    max_tokens: int,
+    encoding_name: str,
+    enabled: bool = True,
+  ):
+    self.max_tokens = max_tokens
+    self.enabled = enabled
+    self.tokenizer = Tokenizer(encoding_name=encoding_name)
+    self.stats = CompactionStats()
+
+  def compact(self, text: str) -> CompactionResult:
+    original_tokens: int = self.tokenizer.count(text)
+
+    if not self.enabled:
+      return CompactionResult(
+        text=text,
+        original_tokens=original_tokens,
+        compacted_tokens=original_tokens,
+        is_truncated=False,
+      )
+
+    compacted: str = normalize_extracted_text(text)
+    compacted_tokens: int = self.tokenizer.count(compacted)
+
+    is_truncated: bool = compacted_tokens > self.max_tokens
+    if is_truncated:
+      compacted = self.tokenizer.truncate(compacted, self.max_tokens)
+      compacted_tokens = self.tokenizer.count(compacted)
+
+    result = CompactionResult(
+      text=compacted,
+      original_tokens=original_tokens,
+      compacted_tokens=compacted_tokens,
+      is_truncated=is_truncated,
+    )
+    self.stats.record(result)
+
+    return result
+
+
+_text_compactor: TextCompactor | None = None
+
+
+def get_text_compactor() -> TextCompactor:
+  """
+  Returns the process-wide `TextCompactor`, creating it from settings on first use
+  """
+
+  global _text_compactor
+
+  if _text_compactor is None:
+    _text_compactor = TextCompactor(
+      max_tokens=compaction_settings.MAX_TOKENS,
+      encoding_name=compaction_settings.TOKENIZER_ENCODING,
+      enabled=compaction_settings.ENABLED,
+    )
+
+  return _text_compactor
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from db.models import Base
+
+
+class KVCacheDBHelper:
+  """
+  Queries of a key-value cache table, configured with the table's model and its key and value columns.
+  The table also has `created_at` and `last_accessed_at` columns, for expiry and LRU eviction.
+  """
+
+  def __init__(
+    self,
+    model: type[Base],
+    key_column: InstrumentedAttribute,
+    value_column: InstrumentedAttribute,
+  ):
+    self.model = model
+    self.key_column = key_column
+    self.value_column = value_column
+
+  async def get(
+    self,
+    session: AsyncSession,
+    key: str,
+    ttl_seconds: int | None = None,
+  ):
+    """
+    Fetches a cached value by key, ignoring entries older than the TTL, if any.
+    A hit refreshes the entry's `last_accessed_at` so it is evicted last.
+
+    Returns:
+      - The cached value, or None on a miss
+    """
+
+    stmt = (
+      update(self.model)
+      .where(self.key_column == key)
+      .values(last_accessed_at=datetime.now(timezone.utc))
+      .returning(self.value_column)
+    )
+    if ttl_seconds is not None:
+      stmt = stmt.where(self.model.created_at > datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds))
+
+    result = await session.execute(stmt)
+    value = result.scalars().first()
+    await session.commit()
+
+    return value
+
+  async def upsert(
+    self,
+    session: AsyncSession,
+    key: str,
+    value,
+  ) -> None:
+    """
+    Inserts a value into the cache, replacing any existing entry for the key.
+    """
+
+    now = datetime.now(timezone.utc)
+
+    stmt = insert(self.model).values({
+      self.key_column.key: key,
+      self.value_column.key: value,
+      "created_at": now,
+      "last_accessed_at": now,
+    })
+    stmt = stmt.on_conflict_do_update(
+      index_elements=[self.key_column],
+      set_={
+        self.value_column.key: stmt.excluded[self.value_column.key],
+        "created_at": stmt.excluded.created_at,
+        "last_accessed_at": stmt.excluded.last_accessed_at,
+      },
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+  async def evict(
+    self,
+    session: AsyncSession,
+    max_entries: int,
+    ttl_seconds: int | None = None,
+  ) -> int:
+    """
+    Deletes expired entries, if there is a TTL, then the least recently accessed entries beyond `max_entries`.
+
+    Returns:
+      - The number of entries evicted
+    """
+
+    evicted: int = 0
+
+    if ttl_seconds is not None:
+      expires_before = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+      expired_result = await session.execute(
+        delete(self.model).where(self.model.created_at <= expires_before)
+      )
+      evicted += expired_result.rowcount
+
+    overflow_keys = (
+      select(self.key_column)
+      .order_by(self.model.last_accessed_at.desc())
+      .offset(max_entries)
+      .scalar_subquery()
+    )
+    overflow_result = await session.execute(
+      delete(self.model).where(self.key_column.in_(overflow_keys))
+    )
+    evicted += overflow_result.rowcount
+    await session.commit()
+
+    return evicted
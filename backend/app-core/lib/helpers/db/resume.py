@@ -1,117 +1,745 @@
-# from sqlalchemy import select, update
-# from sqlalchemy.ext.asyncio import AsyncSession
-
-# from lib.models.product.resume import StatusTypes, ClassifierTypes
-
-# from db.models import Resume
-
-
-# class ResumeDBHelper:
-#   async def select_by_filters(
-#     session: AsyncSession,
-#     role_id: str | None = None,
-#     status: StatusTypes | None = None,
-#     classifier: ClassifierTypes | None = None,
-#   ) -> list[Resume]:
-#     """
-#     Retrieves resume details by given filters from the DB.
-#     """
-
-#     stmt = select(Resume)
-
-#     if role_id:
-#       stmt = stmt.where(Resume.role_id == role_id)
-
-#     if status:
-#       stmt = stmt.where(Resume.status == status)
-
-#     if classifier:
-#       if classifier == ClassifierTypes.VERY_FIT:
-#         stmt = stmt.where(Resume.fitness_score >= 85)
-#       elif classifier == ClassifierTypes.FIT:
-#         stmt = stmt.where(Resume.fitness_score < 85)
-#         stmt = stmt.where(Resume.fitness_score >= 50)
-#       elif classifier == ClassifierTypes.UNFIT:
-#         stmt = stmt.where(Resume.fitness_score < 50)
-#       else:
-#         # Should not happen
-#         # TODO: Raise exception
-#         pass
-
-#     result = await session.execute(stmt)
-#     resumes = result.scalars().all()
-#     return resumes
-
-#   async def insert(
-#     session: AsyncSession,
-#     role_id: str,
-#     status: StatusTypes,
-#     content: str,
-#   ) -> str:
-#     """
-#     Inserts resume details into the DB
-#     """
-
-#     new_resume: Resume = Resume(
-#       role_id=role_id,
-#       status=status,
-#       content=content,
-#     )
-
-#     session.add(new_resume)
-#     await session.commit()
-#     await session.refresh(new_resume)
-
-#     return new_resume.id
-
-#   async def update(
-#     session: AsyncSession,
-#     id: str,
-#     base_requirement_satisfaction_score: int,
-#     exceptional_considerations: str,
-#     fitness_score: int,
-#   ) -> None:
-#     """
-#     Update resume details in the DB.
-#     TODO: Helper function should be more robust instead of for specific use-case.
-#     """
-
-#     stmt = update(Resume).where(Resume.id == id).values(
-#       base_requirement_satisfaction_score=base_requirement_satisfaction_score,
-#       exceptional_considerations=exceptional_considerations,
-#       fitness_score=fitness_score,
-#     )
-#     await session.execute(stmt)
-#     await session.commit()
-
-#   async def update_status(
-#     session: AsyncSession,
-#     id: str,
-#     status: StatusTypes,
-#   ) -> None:
-#     """
-#     Updates the status of a resume detail in the DB.
-#     """
-#     print(' yaaaa', status)
-
-#     stmt = update(Resume).where(Resume.id == id).values(
-#       status=status,
-#     )
-#     await session.execute(stmt)
-#     await session.commit()
-
-#   async def bulk_update_status(
-#     session: AsyncSession,
-#     ids: list[str],
-#     status: StatusTypes,
-#   ) -> None:
-#     """
-#     Updates the status of resume details in bulk.
-#     """
-#     stmt = (
-#       update(Resume)
-#       .where(Resume.id.in_(ids))
-#       .values(status=status)
-#     )
-#     await session.execute(stmt)
-#     await session.commit()
+from datetime import timedelta
+
+from sqlalchemy import String, Row, Select, and_, case, column, func, insert, literal, select, tuple_, union_all, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lib.models.product.resume import StatusTypes, ClassifierTypes, REVIEWER_STATUSES
+from lib.models.role import FitnessScoreHistogramBucket, RoleStats
+from lib.helpers.ulid import generate_ulid
+
+from db.models import Resume
+
+from settings import classifier_settings
+
+
+# Rows per INSERT statement, keeping bulk inserts well under the Postgres limit of 32767 bind parameters
+BULK_INSERT_CHUNK_SIZE = 1000
+
+# The columns needed to build `ResumeDetails`, so that listings never load resume content
+RESUME_DETAILS_COLUMNS = [
+  Resume.id,
+  Resume.base_requirement_satisfaction_score,
+  Resume.exceptional_considerations,
+  Resume.fitness_score,
+  Resume.s3_object_key,
+]
+
+# The classifier bucket of a resume, by fitness score. NULL for resumes that were not scored yet.
+# Values are rendered inline, so that the expression is identical wherever it appears in a statement (ie: GROUP BY)
+CLASSIFIER_BUCKET = case(
+  (Resume.fitness_score >= literal(classifier_settings.VERY_FIT_MIN_SCORE, literal_execute=True), literal(ClassifierTypes.VERY_FIT.value, literal_execute=True)),
+  (Resume.fitness_score >= literal(classifier_settings.FIT_MIN_SCORE, literal_execute=True), literal(ClassifierTypes.FIT.value, literal_execute=True)),
+  (Resume.fitness_score.is_not(None), literal(ClassifierTypes.UNFIT.value, literal_execute=True)),
+)
+
+# Statuses are inlined rather than bound, so that the planner matches the partial work queue indexes of `Resume`
+# in generic plans of prepared statements too
+IS_PENDING = Resume.status == literal(StatusTypes.PENDING.value, literal_execute=True)
+
+# Resumes whose scoring worker died without finishing them
+IS_LEASE_EXPIRED = and_(
+  Resume.status == literal(StatusTypes.IN_PROGRESS.value, literal_execute=True),
+  Resume.lease_expires_at < func.now(),
+)
+
+# Postgres NOTIFY channel on which scoring workers are woken up when new resumes are PENDING
+RESUME_PENDING_CHANNEL = "resume_pending"
+
+
+def sanitize_content(content: str) -> str:
+  """
+  Makes extracted text storable in a Postgres text column, which rejects NUL characters
+  and strings that cannot be encoded to UTF-8 (ie: lone surrogates).
+  """
+
+  return content.replace("\x00", "").encode("utf-8", errors="replace").decode("utf-8")
+
+
+class ResumeDBHelper:
+  async def select_by_filters(
+    session: AsyncSession,
+    role_id: str | None = None,
+    status: StatusTypes | None = None,
+    classifier: ClassifierTypes | None = None,
+    after_id: str | None = None,
+    limit: int | None = None,
+  ) -> list[Row]:
+    """
+    Retrieves resume details by given filters from the DB, ordered by ID.
+    Only `RESUME_DETAILS_COLUMNS` are selected.
+
+    Pages are fetched by keyset: pass the ID of the last resume of a page as `after_id` to fetch the next one.
+    Since IDs are ULIDs, this is an index range scan no matter how deep the page is.
+
+    Args:
+      - after_id: Only resumes with an ID greater than this are returned
+      - limit: The maximum number of resumes returned
+    """
+
+    stmt = ResumeDBHelper.build_select_by_filters(
+      role_id=role_id,
+      status=status,
+      classifier=classifier,
+      after_id=after_id,
+      limit=limit,
+    )
+    result = await session.execute(stmt)
+    resumes = result.all()
+    return resumes
+
+  def build_select_by_filters(
+    role_id: str | None = None,
+    status: StatusTypes | None = None,
+    classifier: ClassifierTypes | None = None,
+    after_id: str | None = None,
+    limit: int | None = None,
+  ) -> Select:
+    """
+    Builds the statement of `select_by_filters`, so that its plan can be inspected (see `benchmark_resume_queries`).
+    """
+
+    stmt = select(*RESUME_DETAILS_COLUMNS)
+
+    if role_id:
+      stmt = stmt.where(Resume.role_id == role_id)
+
+    if status:
+      stmt = stmt.where(Resume.status == status)
+
+    if classifier:
+      # Plain ranges rather than `CLASSIFIER_BUCKET`, so that the (role_id, fitness_score) index is used
+      if classifier == ClassifierTypes.VERY_FIT:
+        stmt = stmt.where(Resume.fitness_score >= classifier_settings.VERY_FIT_MIN_SCORE)
+      elif classifier == ClassifierTypes.FIT:
+        stmt = stmt.where(Resume.fitness_score < classifier_settings.VERY_FIT_MIN_SCORE)
+        stmt = stmt.where(Resume.fitness_score >= classifier_settings.FIT_MIN_SCORE)
+      elif classifier == ClassifierTypes.UNFIT:
+        stmt = stmt.where(Resume.fitness_score < classifier_settings.FIT_MIN_SCORE)
+      else:
+        # Should not happen
+        # TODO: Raise exception
+        pass
+
+    if after_id:
+      stmt = stmt.where(Resume.id > after_id)
+
+    stmt = stmt.order_by(Resume.id)
+
+    if limit:
+      stmt = stmt.limit(limit)
+
+    return stmt
+
+  async def select_classified(
+    session: AsyncSession,
+    role_id: str,
+    status: StatusTypes | None = None,
+    limit_per_bucket: int | None = None,
+  ) -> tuple[dict[ClassifierTypes, list[Row]], dict[ClassifierTypes, int]]:
+    """
+    Retrieves the resume details of a role grouped into classifier buckets, in a single query.
+    Each resume is assigned a bucket with `CLASSIFIER_BUCKET`, then window functions rank resumes within their bucket
+    (highest fitness score first) and count the bucket, so that only the top `limit_per_bucket` rows of each bucket
+    are returned. Resumes that were not scored yet are excluded.
+
+    Returns:
+      - The resume details of each bucket, highest fitness score first
+      - The total number of resumes in each bucket
+    """
+
+    bucket = CLASSIFIER_BUCKET.label("bucket")
+    ranked = (
+      select(
+        *RESUME_DETAILS_COLUMNS,
+        bucket,
+        func.row_number().over(
+          partition_by=CLASSIFIER_BUCKET,
+          order_by=(Resume.fitness_score.desc(), Resume.id),
+        ).label("rank"),
+        func.count().over(partition_by=CLASSIFIER_BUCKET).label("bucket_count"),
+      )
+      .where(Resume.role_id == role_id)
+      .where(Resume.fitness_score.is_not(None))
+    )
+
+    if status:
+      ranked = ranked.where(Resume.status == status)
+
+    ranked = ranked.subquery()
+    stmt = select(ranked)
+    if limit_per_bucket:
+      stmt = stmt.where(ranked.c.rank <= limit_per_bucket)
+    stmt = stmt.order_by(ranked.c.bucket, ranked.c.rank)
+
+    result = await session.execute(stmt)
+
+    resumes: dict[ClassifierTypes, list[Row]] = {classifier: [] for classifier in ClassifierTypes}
+    counts: dict[ClassifierTypes, int] = {classifier: 0 for classifier in ClassifierTypes}
+    for row in result:
+      classifier = ClassifierTypes(row.bucket)
+      resumes[classifier].append(row)
+      counts[classifier] = row.bucket_count
+
+    return resumes, counts
+
+  async def select_role_stats(
+    session: AsyncSession,
+    role_id: str,
+    num_buckets: int = 10,
+  ) -> RoleStats:
+    """
+    Computes the dashboard stats of a role in a single scan of its resumes, with GROUPING SETS:
+    counts by status, counts by classifier bucket, a fitness score histogram (`width_bucket` over 0-100),
+    and totals and averages over all of the role's resumes.
+    Resume content is never read.
+
+    Args:
+      - num_buckets: The number of equal-width buckets of the fitness score histogram
+    """
+
+    # width_bucket puts scores of 100 and above in an overflow bucket, and scores below 0 in bucket 0,
+    # fold them into the last and first buckets
+    num_buckets_literal = literal(num_buckets, literal_execute=True)
+    histogram_bucket = func.greatest(
+      func.least(
+        func.width_bucket(
+          Resume.fitness_score,
+          literal(0, literal_execute=True),
+          literal(100, literal_execute=True),
+          num_buckets_literal,
+        ),
+        num_buckets_literal,
+      ),
+      literal(1, literal_execute=True),
+    )
+
+    stmt = (
+      select(
+        func.grouping(Resume.status).label("is_not_by_status"),
+        func.grouping(CLASSIFIER_BUCKET).label("is_not_by_classifier"),
+        func.grouping(histogram_bucket).label("is_not_by_histogram_bucket"),
+        Resume.status,
+        CLASSIFIER_BUCKET.label("classifier"),
+        histogram_bucket.label("histogram_bucket"),
+        func.count().label("count"),
+        func.count(Resume.fitness_score).label("scored"),
+        func.avg(Resume.fitness_score).label("average_fitness_score"),
+        func.avg(Resume.base_requirement_satisfaction_score).label("average_base_requirement_satisfaction_score"),
+      )
+      .where(Resume.role_id == role_id)
+      .group_by(
+        func.grouping_sets(
+          tuple_(Resume.status),
+          tuple_(CLASSIFIER_BUCKET),
+          tuple_(histogram_bucket),
+          tuple_(),
+        )
+      )
+    )
+    result = await session.execute(stmt)
+
+    bucket_width: float = 100 / num_buckets
+    stats = RoleStats(
+      role_id=role_id,
+      total=0,
+      status_counts={},
+      classifier_counts={classifier.value: 0 for classifier in ClassifierTypes},
+      scored=0,
+      average_fitness_score=None,
+      average_base_requirement_satisfaction_score=None,
+      fitness_score_histogram=[
+        FitnessScoreHistogramBucket(lower=i * bucket_width, upper=(i + 1) * bucket_width, count=0)
+        for i in range(num_buckets)
+      ],
+    )
+
+    for row in result:
+      if not row.is_not_by_status:
+        stats.status_counts[row.status] = row.count
+      elif not row.is_not_by_classifier:
+        if row.classifier is not None:
+          stats.classifier_counts[row.classifier] = row.count
+      elif not row.is_not_by_histogram_bucket:
+        if row.histogram_bucket is not None and 1 <= row.histogram_bucket <= num_buckets:
+          stats.fitness_score_histogram[row.histogram_bucket - 1].count = row.count
+      else:
+        stats.total = row.count
+        stats.scored = row.scored
+        stats.average_fitness_score = row.average_fitness_score
+        stats.average_base_requirement_satisfaction_score = row.average_base_requirement_satisfaction_score
+
+    return stats
+
+  async def select_object_keys(
+    session: AsyncSession,
+    role_id: str,
+  ) -> list[tuple[str, str]]:
+    """
+    Retrieves the IDs and S3 object keys of the resumes of a role whose original file is stored in S3.
+    Only these two columns are loaded, so that listing a large role stays cheap.
+    """
+
+    stmt = (
+      select(Resume.id, Resume.s3_object_key)
+      .where(Resume.role_id == role_id)
+      .where(Resume.s3_object_key.is_not(None))
+      .order_by(Resume.id)
+    )
+    result = await session.execute(stmt)
+    return [(row.id, row.s3_object_key) for row in result]
+
+  async def select_ids_by_content_hashes(
+    session: AsyncSession,
+    role_id: str,
+    content_hashes: list[str],
+  ) -> dict[str, str]:
+    """
+    Finds resumes of a role that were registered from the same files, by content hash.
+
+    Returns:
+      - The ID of the first resume registered for each content hash found, by content hash
+    """
+
+    if not content_hashes:
+      return {}
+
+    stmt = (
+      select(Resume.content_hash, func.min(Resume.id).label("id"))
+      .where(Resume.role_id == role_id)
+      .where(Resume.content_hash.in_(set(content_hashes)))
+      .group_by(Resume.content_hash)
+    )
+    result = await session.execute(stmt)
+    return {row.content_hash: row.id for row in result}
+
+  async def insert(
+    session: AsyncSession,
+    role_id: str,
+    status: StatusTypes,
+    content: str,
+  ) -> str:
+    """
+    Inserts resume details into the DB
+    """
+
+    new_resume: Resume = Resume(
+      role_id=role_id,
+      status=status,
+      content=sanitize_content(content),
+    )
+
+    session.add(new_resume)
+    if status == StatusTypes.PENDING:
+      await ResumeDBHelper.notify_pending(session=session)
+    await session.commit()
+    await session.refresh(new_resume)
+
+    return new_resume.id
+
+  async def bulk_insert(
+    session: AsyncSession,
+    role_id: str,
+    status: StatusTypes,
+    contents: list[str],
+    s3_object_keys: list[str | None] | None = None,
+    content_hashes: list[str | None] | None = None,
+  ) -> list[str]:
+    """
+    Inserts many resumes into the DB with multi-row INSERT statements, in a single transaction.
+    IDs are generated client-side, so no refresh round trip is needed per resume.
+    Contents are sanitized first (see `sanitize_content`).
+
+    Args:
+      - contents: The extracted text of each resume
+      - s3_object_keys: The S3 object key of each resume's original file, if stored
+      - content_hashes: The hash of each resume's original file, if known
+
+    Returns:
+      - The IDs of the inserted resumes, in the order of `contents`
+    """
+
+    if not contents:
+      return []
+
+    if s3_object_keys is None:
+      s3_object_keys = [None] * len(contents)
+    if content_hashes is None:
+      content_hashes = [None] * len(contents)
+
+    rows: list[dict] = [
+      {
+        "id": generate_ulid(),
+        "role_id": role_id,
+        "status": status,
+        "content": sanitize_content(content),
+        "s3_object_key": s3_object_key,
+        "content_hash": content_hash,
+      }
+      for content, s3_object_key, content_hash in zip(contents, s3_object_keys, content_hashes, strict=True)
+    ]
+
+    for i in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+      stmt = insert(Resume).values(rows[i:i + BULK_INSERT_CHUNK_SIZE])
+      await session.execute(stmt)
+
+    if status == StatusTypes.PENDING:
+      await ResumeDBHelper.notify_pending(session=session)
+    await session.commit()
+
+    return [row["id"] for row in rows]
+
+  async def notify_pending(
+    session: AsyncSession,
+  ) -> None:
+    """
+    Notifies listening scoring workers that there are PENDING resumes.
+    NOTE: Postgres only delivers the notification once the session's transaction commits.
+    """
+
+    await session.execute(select(func.pg_notify(RESUME_PENDING_CHANNEL, "")))
+
+  async def update(
+    session: AsyncSession,
+    id: str,
+    base_requirement_satisfaction_score: int,
+    exceptional_considerations: str,
+    fitness_score: int,
+    worker_id: str | None = None,
+  ) -> bool:
+    """
+    Update resume details in the DB.
+    TODO: Helper function should be more robust instead of for specific use-case.
+
+    Args:
+      - worker_id: When set, the resume is only updated while this worker holds its lease
+
+    Returns:
+      - bool: Whether the resume was updated
+    """
+
+    stmt = update(Resume).where(Resume.id == id).values(
+      base_requirement_satisfaction_score=base_requirement_satisfaction_score,
+      exceptional_considerations=exceptional_considerations,
+      fitness_score=fitness_score,
+    )
+    if worker_id is not None:
+      stmt = ResumeDBHelper.where_leased_by(stmt, worker_id)
+    result = await session.execute(stmt)
+    await session.commit()
+
+    return result.rowcount > 0
+
+  async def bulk_update(
+    session: AsyncSession,
+    assessments: list[dict],
+    worker_id: str | None = None,
+  ) -> list[str]:
+    """
+    Update resume details of many resumes in the DB in a single statement.
+
+    Args:
+      - assessments: One dict per resume, containing its `id` and the columns to update
+        (ie: `base_requirement_satisfaction_score`, `exceptional_considerations`, `fitness_score`, `status`)
+      - worker_id: When set, only resumes whose lease this worker holds are updated
+
+    Returns:
+      - list[str]: The IDs of the resumes that were updated
+    """
+
+    if not assessments:
+      return []
+
+    if worker_id is not None:
+      # Lock the leased rows, so that their leases cannot be taken over before they are updated
+      stmt = ResumeDBHelper.where_leased_by(
+        select(Resume.id).where(Resume.id.in_([assessment["id"] for assessment in assessments])),
+        worker_id,
+      ).with_for_update()
+      leased_ids: set[str] = set((await session.execute(stmt)).scalars().all())
+      assessments = [assessment for assessment in assessments if assessment["id"] in leased_ids]
+
+    if assessments:
+      await session.execute(update(Resume), assessments)
+    await session.commit()
+
+    return [assessment["id"] for assessment in assessments]
+
+  async def bulk_update_content(
+    session: AsyncSession,
+    contents: dict[str, str],
+    rescore: bool = False,
+  ) -> list[str]:
+    """
+    Updates the content of many resumes, leaving resumes whose content did not change untouched.
+    Contents are sanitized first (see `sanitize_content`).
+
+    Args:
+      - contents: The new content of each resume, by ID
+      - rescore: Whether to also set resumes whose content changed back to PENDING, so that they are assessed again.
+        Resumes in a status set by a reviewer (see `REVIEWER_STATUSES`) keep their status.
+
+    Returns:
+      - list[str]: The IDs of the resumes whose content changed
+    """
+
+    if not contents:
+      return []
+
+    new_contents = values(column("id", String), column("content", String), name="new_contents").data(
+      [(id, sanitize_content(content)) for id, content in contents.items()]
+    )
+    is_changed = and_(Resume.id == new_contents.c.id, Resume.content.is_distinct_from(new_contents.c.content))
+
+    rescored_ids: list[str] = []
+    if rescore:
+      stmt = (
+        update(Resume)
+        .where(is_changed)
+        .where(Resume.status.not_in(REVIEWER_STATUSES))
+        .values(
+          content=new_contents.c.content,
+          status=StatusTypes.PENDING,
+          attempts=0,
+          lease_owner=None,
+          lease_expires_at=None,
+        )
+        .returning(Resume.id)
+        .execution_options(synchronize_session=False)
+      )
+      rescored_ids = list((await session.execute(stmt)).scalars().all())
+
+    # Resumes already rescored above now have their new content, so they are not updated twice
+    stmt = (
+      update(Resume)
+      .where(is_changed)
+      .values(content=new_contents.c.content)
+      .returning(Resume.id)
+      .execution_options(synchronize_session=False)
+    )
+    updated_ids: list[str] = list((await session.execute(stmt)).scalars().all())
+
+    if rescored_ids:
+      await ResumeDBHelper.notify_pending(session=session)
+    await session.commit()
+
+    return rescored_ids + updated_ids
+
+  async def update_status(
+    session: AsyncSession,
+    id: str,
+    status: StatusTypes,
+    worker_id: str | None = None,
+  ) -> bool:
+    """
+    Updates the status of a resume detail in the DB.
+
+    Args:
+      - worker_id: When set, the resume is only updated while this worker holds its lease
+
+    Returns:
+      - bool: Whether the resume was updated
+    """
+
+    stmt = update(Resume).where(Resume.id == id).values(
+      status=status,
+      lease_owner=None,
+      lease_expires_at=None,
+    )
+    if worker_id is not None:
+      stmt = ResumeDBHelper.where_leased_by(stmt, worker_id)
+    result = await session.execute(stmt)
+    await session.commit()
+
+    return result.rowcount > 0
+
+  async def bulk_update_status(
+    session: AsyncSession,
+    ids: list[str],
+    status: StatusTypes,
+    worker_id: str | None = None,
+  ) -> int:
+    """
+    Updates the status of resume details in bulk.
+
+    Args:
+      - worker_id: When set, only resumes whose lease this worker holds are updated
+
+    Returns:
+      - int: The number of resumes updated
+    """
+
+    if not ids:
+      return 0
+
+    stmt = (
+      update(Resume)
+      .where(Resume.id.in_(ids))
+      .values(status=status, lease_owner=None, lease_expires_at=None)
+    )
+    if worker_id is not None:
+      stmt = ResumeDBHelper.where_leased_by(stmt, worker_id)
+    result = await session.execute(stmt)
+    await session.commit()
+
+    return result.rowcount
+
+  def where_leased_by(stmt, worker_id: str):
+    """
+    Restricts a statement to IN_PROGRESS resumes whose lease is held by the worker, so that a worker whose lease
+    expired (and was claimed by another worker) cannot overwrite the other worker's result
+    """
+
+    return stmt.where(Resume.status == StatusTypes.IN_PROGRESS).where(Resume.lease_owner == worker_id)
+
+  async def claim_pending(
+    session: AsyncSession,
+    worker_id: str,
+    limit: int,
+    lease_seconds: int,
+    max_attempts: int,
+  ) -> list[Resume]:
+    """
+    Claims up to `limit` resumes for processing, oldest (by ULID) first, and sets them to IN_PROGRESS
+    under a lease owned by `worker_id`.
+
+    Claimable resumes are PENDING resumes, and IN_PROGRESS resumes whose lease expired (ie: their worker died).
+    Rows are locked with `FOR UPDATE SKIP LOCKED`, so concurrent workers never claim the same resume.
+    Expired resumes that already used up `max_attempts` are set to FAILED instead of being reclaimed.
+
+    Returns:
+      - The claimed resumes
+    """
+
+    exhausted_stmt = (
+      update(Resume)
+      .where(IS_LEASE_EXPIRED)
+      .where(Resume.attempts >= max_attempts)
+      .values(status=StatusTypes.FAILED, lease_owner=None, lease_expires_at=None)
+    )
+    await session.execute(exhausted_stmt)
+
+    claimable_ids = ResumeDBHelper.build_select_claimable_ids(limit=limit)
+    stmt = (
+      update(Resume)
+      .where(Resume.id.in_(claimable_ids))
+      .values(
+        status=StatusTypes.IN_PROGRESS,
+        lease_owner=worker_id,
+        lease_expires_at=func.now() + timedelta(seconds=lease_seconds),
+        attempts=Resume.attempts + 1,
+      )
+      .returning(Resume)
+      .execution_options(synchronize_session=False)
+    )
+    result = await session.execute(stmt)
+    resumes = result.scalars().all()
+    await session.commit()
+
+    return sorted(resumes, key=lambda resume: resume.id)
+
+  def build_select_claimable_ids(
+    limit: int,
+  ) -> Select:
+    """
+    Builds the locking subquery of `claim_pending`, so that its plan can be inspected (see `benchmark_resume_queries`).
+
+    PENDING resumes and expired leases are selected by separate subqueries, each limited and walking its own
+    partial index (`ix_resume_pending_id` and `ix_resume_in_progress_lease_expires_at`), then merged oldest first.
+    A single query with an OR of both would not match either index, and scan the whole table to sort it.
+    NOTE: Rows locked by a subquery that do not make the final cut stay locked until the claim commits.
+    """
+
+    pending = (
+      select(Resume.id)
+      .where(IS_PENDING)
+      .order_by(Resume.id)
+      .limit(limit)
+      .with_for_update(skip_locked=True)
+      .subquery("pending")
+    )
+    expired = (
+      select(Resume.id)
+      .where(IS_LEASE_EXPIRED)
+      .order_by(Resume.lease_expires_at)
+      .limit(limit)
+      .with_for_update(skip_locked=True)
+      .subquery("expired")
+    )
+    claimable = union_all(select(pending.c.id), select(expired.c.id)).subquery("claimable")
+
+    return select(claimable.c.id).order_by(claimable.c.id).limit(limit)
+
+  async def release(
+    session: AsyncSession,
+    ids: list[str],
+    worker_id: str,
+  ) -> None:
+    """
+    Returns claimed resumes that were never started back to PENDING, without counting the claim as an attempt.
+    """
+
+    if not ids:
+      return
+
+    stmt = (
+      update(Resume)
+      .where(Resume.id.in_(ids))
+      .where(Resume.status == StatusTypes.IN_PROGRESS)
+      .where(Resume.lease_owner == worker_id)
+      .values(
+        status=StatusTypes.PENDING,
+        lease_owner=None,
+        lease_expires_at=None,
+        attempts=Resume.attempts - 1,
+      )
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+  async def defer(
+    session: AsyncSession,
+    ids: list[str],
+    worker_id: str,
+    delay_seconds: float,
+  ) -> None:
+    """
+    Gives up claimed resumes whose processing failed transiently, so that they are reclaimed after `delay_seconds`.
+    The resumes stay IN_PROGRESS with their lease cut short, so the claim counts as an attempt,
+    and resumes that used up their attempts are set to FAILED when their lease expires (see `claim_pending`).
+    """
+
+    if not ids:
+      return
+
+    stmt = (
+      update(Resume)
+      .where(Resume.id.in_(ids))
+      .where(Resume.status == StatusTypes.IN_PROGRESS)
+      .where(Resume.lease_owner == worker_id)
+      .values(lease_expires_at=func.now() + timedelta(seconds=delay_seconds))
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+  async def extend_leases(
+    session: AsyncSession,
+    ids: list[str],
+    worker_id: str,
+    lease_seconds: int,
+  ) -> None:
+    """
+    Heartbeat for claimed resumes: extends the leases that `worker_id` still holds on the given resumes.
+    """
+
+    if not ids:
+      return
+
+    stmt = (
+      update(Resume)
+      .where(Resume.id.in_(ids))
+      .where(Resume.status == StatusTypes.IN_PROGRESS)
+      .where(Resume.lease_owner == worker_id)
+      .values(lease_expires_at=func.now() + timedelta(seconds=lease_seconds))
+    )
+    await session.execute(stmt)
+    await session.commit()
@@ -1,91 +1,116 @@
-# from sqlalchemy import select, update
-# from sqlalchemy.ext.asyncio import AsyncSession
-
-# from db.models import Role
-
-
-# class RoleDBHelper:
-#   async def get_role(
-#     session: AsyncSession,
-#     id: str,
-#   ) -> Role:
-#     """
-#     Fetch a role from the DB by ID.
-
-#     Returns:
-#       - The role with matching ID
-#     """
-
-#     stmt = select(Role).where(Role.id == id)
-#     result = await session.execute(stmt)
-#     role = result.scalars().first()
-
-#     if not role:
-#       raise ValueError(f"Role with ID {id} not found.")
-
-#     return role
-
-
-#   async def list_roles(
-#     session: AsyncSession,
-#   ) -> list[Role]:
-#     """
-#     Lists all roles from the DB.
-#     TODO: Add constraint to num roles
-
-#     Returns:
-#       - A list of all roles
-#     """
-
-#     stmt = select(Role)
-#     result = await session.execute(stmt)
-#     roles = result.scalars().all()
-#     return roles
-
-#   async def insert(
-#     session: AsyncSession,
-#     name: str,
-#     description: str,
-#   ) -> str:
-#     """
-#     Inserts a role into the DB
-
-#     Args:
-#       - The description of the role.
-#         NOTE: Should be parsed from markdown.
-
-#     Returns:
-#       - The ID of the inserted role
-#     """
-
-#     new_role: Role = Role(
-#       name=name,
-#       description=description
-#     )
-
-#     session.add(new_role)
-#     await session.commit()
-#     await session.refresh(new_role)
-
-#     return new_role.id
-
-#   async def update(
-#     session: AsyncSession,
-#     id: str,
-#     name: str,
-#     description: str,
-#   ) -> None:
-#     """
-#     Update a role in the DB.
-
-#     Args:
-#       - id: The ID of the role to update
-#       - description: The new description of the role
-#     """
-
-#     stmt = update(Role).where(Role.id == id).values(
-#       name=name,
-#       description=description,
-#     )
-#     await session.execute(stmt)
-#     await session.commit()
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lib.helpers.role_cache import get_role_cache
+from lib.models.role import RoleDetails
+
+from db.models import Role
+
+
+class RoleDBHelper:
+  async def get_role(
+    session: AsyncSession,
+    id: str,
+  ) -> Role:
+    """
+    Fetch a role from the DB by ID.
+
+    Returns:
+      - The role with matching ID
+    """
+
+    stmt = select(Role).where(Role.id == id)
+    result = await session.execute(stmt)
+    role = result.scalars().first()
+
+    if not role:
+      raise ValueError(f"Role with ID {id} not found.")
+
+    return role
+
+
+  async def get_role_details(
+    session: AsyncSession,
+    id: str,
+  ) -> RoleDetails:
+    """
+    Fetch the details of a role by ID, through the process-wide `RoleCache`.
+
+    Returns:
+      - The details of the role with matching ID
+    """
+
+    role_cache = get_role_cache()
+
+    role_details: RoleDetails | None = role_cache.get(id)
+    if role_details is None:
+      role: Role = await RoleDBHelper.get_role(session=session, id=id)
+      role_details = RoleDetails(id=role.id, name=role.name, description=role.description)
+      role_cache.put(role_details)
+
+    return role_details
+
+  async def list_roles(
+    session: AsyncSession,
+  ) -> list[Role]:
+    """
+    Lists all roles from the DB.
+    TODO: Add constraint to num roles
+
+    Returns:
+      - A list of all roles
+    """
+
+    stmt = select(Role)
+    result = await session.execute(stmt)
+    roles = result.scalars().all()
+    return roles
+
+  async def insert(
+    session: AsyncSession,
+    name: str,
+    description: str,
+  ) -> str:
+    """
+    Inserts a role into the DB
+
+    Args:
+      - The description of the role.
+        NOTE: Should be parsed from markdown.
+
+    Returns:
+      - The ID of the inserted role
+    """
+
+    new_role: Role = Role(
+      name=name,
+      description=description
+    )
+
+    session.add(new_role)
+    await session.commit()
+    await session.refresh(new_role)
+
+    return new_role.id
+
+  async def update(
+    session: AsyncSession,
+    id: str,
+    name: str,
+    description: str,
+  ) -> None:
+    """
+    Update a role in the DB.
+
+    Args:
+      - id: The ID of the role to update
+      - description: The new description of the role
+    """
+
+    stmt = update(Role).where(Role.id == id).values(
+      name=name,
+      description=description,
+    )
+    await session.execute(stmt)
+    await session.commit()
+    get_role_cache().invalidate(id)
@@ -0,0 +1,43 @@
+import io
+from typing import BinaryIO
+
+
+# A document to extract text from: a path, the raw bytes of the document, or a binary file-like object
+DocumentSource = str | bytes | bytearray | memoryview | BinaryIO
+
+
+def open_document_source(source: DocumentSource) -> str | BinaryIO:
+    """
+    Normalizes a document source into something the extraction libraries accept: a path or a binary file-like object.
+    In-memory buffers are wrapped without touching disk, and file-like objects are rewound.
+    """
+
+    if isinstance(source, str):
+        return source
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+
+    if source.seekable():
+        source.seek(0)
+    return source
+
+
+def read_document_source(source: DocumentSource) -> bytes:
+    """
+    Reads a document source fully into bytes.
+    """
+
+    if isinstance(source, str):
+        with open(source, "rb") as file:
+            return file.read()
+
+    if isinstance(source, bytes):
+        return source
+
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+
+    if source.seekable():
+        source.seek(0)
+    return source.read()
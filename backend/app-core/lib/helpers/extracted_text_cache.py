@@ -0,0 +1,67 @@
+import hashlib
+
+from lib.helpers.db.kv_cache import KVCacheDBHelper
+from lib.helpers.kv_cache import PostgresKVCache
+
+from db.models import ExtractedTextCacheEntry
+
+from settings import extracted_text_cache_settings
+
+
+def hash_document_content(contents: bytes) -> str:
+  """
+  Hashes the raw bytes of a document, so that the same file uploaded twice maps to the same hash.
+
+  Returns:
+    - The BLAKE2b (256 bit) hex digest of the document
+  """
+
+  return hashlib.blake2b(contents, digest_size=32).hexdigest()
+
+
+class ExtractedTextCache(PostgresKVCache):
+  """
+  Persistent (Postgres-backed) cache of the text extracted from documents, keyed by the hash of their bytes
+  (see `hash_document_content`), so that duplicate uploads skip parsing entirely.
+  Evicts the least recently used entries beyond `max_entries` (see `PostgresKVCache`).
+
+  NOTE: Entries do not expire, as the same bytes always extract to the same text.
+  Disable the cache or clear the table when the extraction logic changes.
+  """
+
+  def __init__(
+    self,
+    max_entries: int,
+    enabled: bool = True,
+    eviction_interval: int = 100,
+  ):
+    super().__init__(
+      name="extracted text cache",
+      db_helper=KVCacheDBHelper(
+        model=ExtractedTextCacheEntry,
+        key_column=ExtractedTextCacheEntry.content_hash,
+        value_column=ExtractedTextCacheEntry.text,
+      ),
+      max_entries=max_entries,
+      enabled=enabled,
+      eviction_interval=eviction_interval,
+    )
+
+
+_extracted_text_cache: ExtractedTextCache | None = None
+
+
+def get_extracted_text_cache() -> ExtractedTextCache:
+  """
+  Returns the process-wide `ExtractedTextCache`, creating it from settings on first use
+  """
+
+  global _extracted_text_cache
+
+  if _extracted_text_cache is None:
+    _extracted_text_cache = ExtractedTextCache(
+      max_entries=extracted_text_cache_settings.MAX_ENTRIES,
+      enabled=extracted_text_cache_settings.ENABLED,
+    )
+
+  return _extracted_text_cache
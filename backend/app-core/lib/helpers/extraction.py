@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import resource
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pydantic import BaseModel
+
+from lib.helpers.pdf import extract_text_from_pdf
+from lib.helpers.worddoc import extract_text_from_word
+from lib.helpers.markdown import extract_text_from_markdown
+from lib.helpers.document import DocumentSource, read_document_source
+
+from settings import extraction_settings
+
+
+PDF_CONTENT_TYPE = "application/pdf"
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+MARKDOWN_CONTENT_TYPES = [
+    "text/markdown",
+    "text/x-markdown",
+    "text/plain",
+    "application/octet-stream",
+]
+
+
+def detect_content_type(head: bytes) -> str | None:
+    """
+    Detects the content type of a document from its first bytes, for documents stored without one.
+    NOTE: Any zip archive is assumed to be a DOCX
+    """
+
+    if head.startswith(b"%PDF"):
+        return PDF_CONTENT_TYPE
+    if head.startswith(b"PK\x03\x04"):
+        return DOCX_CONTENT_TYPE
+    return None
+
+
+class ExtractionResult(BaseModel):
+    """
+    text: The text extracted from the document.
+    timings: Seconds spent in each stage of the extraction
+      - queued: Waiting for a free worker process
+      - extract: Parsing the document in the worker process
+      - total: End to end, as seen by the caller
+    """
+
+    text: str
+    timings: dict[str, float]
+
+
+def _limit_worker_memory(memory_limit_mb: int) -> None:
+    """
+    Caps the address space of a worker process, so that a pathological document
+    fails with a MemoryError instead of exhausting the host.
+    """
+
+    if memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _raise_timeout(signum, frame) -> None:
+    raise TimeoutError("Document extraction timed out")
+
+
+def _extract_in_worker(
+    source: str | bytes,
+    content_type: str,
+    timeout_seconds: int,
+    submitted_at: float,
+) -> tuple[str, dict[str, float]]:
+    """
+    Extracts text from a document inside a worker process.
+    The alarm frees up the worker when a document takes too long to parse.
+    """
+
+    started_at = time.time()
+
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.alarm(timeout_seconds)
+    try:
+        if content_type == PDF_CONTENT_TYPE:
+            text = extract_text_from_pdf(source)
+        elif content_type == DOCX_CONTENT_TYPE:
+            text = extract_text_from_word(source)
+        elif content_type in MARKDOWN_CONTENT_TYPES:
+            text = extract_text_from_markdown(source)
+        else:
+            raise ValueError(f"Unsupported content type {content_type}")
+    finally:
+        signal.alarm(0)
+
+    timings = {
+        "queued": started_at - submitted_at,
+        "extract": time.time() - started_at,
+    }
+    return text, timings
+
+
+class DocumentExtractor:
+    """
+    Extracts text from documents in a bounded pool of worker processes, so that CPU-heavy parsing
+    (ie: pdfminer) never blocks the event loop. Each extraction is subject to a timeout and each
+    worker process to a memory cap.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        timeout_seconds: int,
+        memory_limit_mb: int,
+    ):
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self._executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_limit_worker_memory,
+            initargs=(self.memory_limit_mb,),
+        )
+
+    async def extract(
+        self,
+        source: DocumentSource,
+        content_type: str,
+        filename: str | None = None,
+    ) -> ExtractionResult:
+        """
+        Extracts text from a document, based on its content type.
+
+        Args:
+          - source: The document, as a path, bytes, memoryview or binary file-like object.
+            NOTE: In-memory documents are sent to the worker process as bytes, without touching disk.
+          - content_type: The MIME type of the document
+          - filename: The original name of the document, for logging
+        """
+
+        loop = asyncio.get_running_loop()
+        started_at = time.time()
+
+        # File-like objects and memoryviews cannot be sent to another process
+        if not isinstance(source, (str, bytes)):
+            source = read_document_source(source)
+
+        try:
+            text, timings = await asyncio.wait_for(
+                loop.run_in_executor(
+                    self._executor,
+                    _extract_in_worker,
+                    source,
+                    content_type,
+                    self.timeout_seconds,
+                    started_at,
+                ),
+                # The worker enforces the timeout itself, this only guards against a stuck worker
+                timeout=self.timeout_seconds * 2,
+            )
+        except BrokenProcessPool as e:
+            # A worker died (ie: killed for exceeding memory), replace the pool for subsequent extractions
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create_executor()
+            raise ValueError(f"Document extraction worker crashed | {str(e)}")
+        except (TimeoutError, asyncio.TimeoutError):
+            raise ValueError(f"Document extraction timed out after {self.timeout_seconds}s")
+
+        timings["total"] = time.time() - started_at
+        logging.info(
+            f"Extracted text from {filename or 'document'} | "
+            + " ".join(f"{stage}={seconds:.3f}s" for stage, seconds in timings.items())
+        )
+
+        return ExtractionResult(text=text, timings=timings)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_document_extractor: DocumentExtractor | None = None
+
+
+def get_document_extractor() -> DocumentExtractor:
+    """
+    Returns the process-wide `DocumentExtractor`, creating it from settings on first use
+    """
+
+    global _document_extractor
+
+    if _document_extractor is None:
+        _document_extractor = DocumentExtractor(
+            max_workers=extraction_settings.MAX_WORKERS,
+            timeout_seconds=extraction_settings.TIMEOUT_SECONDS,
+            memory_limit_mb=extraction_settings.MEMORY_LIMIT_MB,
+        )
+
+    return _document_extractor
+
+
+def shutdown_document_extractor() -> None:
+    """
+    Shuts down the process-wide `DocumentExtractor` if it was created
+    """
+
+    global _document_extractor
+
+    if _document_extractor is not None:
+        _document_extractor.shutdown()
+        _document_extractor = None
@@ -0,0 +1,438 @@
+import asyncio
+import io
+import logging
+import time
+from collections import Counter
+from typing import BinaryIO
+
+from lib.helpers.db.resume import ResumeDBHelper, sanitize_content
+from lib.helpers.extracted_text_cache import (
+    ExtractedTextCache,
+    get_extracted_text_cache,
+    hash_document_content,
+)
+from lib.helpers.extraction import (
+    DOCX_CONTENT_TYPE,
+    PDF_CONTENT_TYPE,
+    get_document_extractor,
+)
+from lib.helpers.s3 import get_s3_handler
+from lib.helpers.ulid import generate_ulid
+from lib.models.product.resume import IngestionStatusTypes, StatusTypes
+from lib.models.resume import RegisterDuplicate, RegisterFailure, RegisterJobDetails
+from lib.models.s3 import UploadResourceType
+
+from db.db import get_context_managed_session
+
+from settings import ingestion_settings, s3_settings
+
+
+class IngestionFile:
+    """
+    A resume file to ingest.
+    The file is read by the pipeline itself, so `file` may be an upload spooled to disk.
+    """
+
+    def __init__(
+        self,
+        filename: str | None,
+        content_type: str | None,
+        file: BinaryIO,
+    ):
+        self.filename = filename
+        self.content_type = content_type
+        self.file = file
+
+    @classmethod
+    def from_bytes(
+        cls,
+        filename: str | None,
+        content_type: str | None,
+        contents: bytes,
+    ) -> "IngestionFile":
+        return cls(filename=filename, content_type=content_type, file=io.BytesIO(contents))
+
+
+class ReadResume:
+    """
+    cached_text: The text already extracted from an identical file, if any
+    """
+
+    def __init__(
+        self,
+        file: IngestionFile,
+        contents: bytes,
+        content_hash: str,
+        cached_text: str | None,
+    ):
+        self.file = file
+        self.contents = contents
+        self.content_hash = content_hash
+        self.cached_text = cached_text
+
+
+class ExtractedResume:
+    """
+    is_cached: Whether the text was taken from the `ExtractedTextCache`, rather than newly extracted
+    """
+
+    def __init__(
+        self,
+        filename: str | None,
+        text: str,
+        s3_object_key: str | None,
+        content_hash: str,
+        is_cached: bool = False,
+    ):
+        self.filename = filename
+        self.text = text
+        self.s3_object_key = s3_object_key
+        self.content_hash = content_hash
+        self.is_cached = is_cached
+
+
+class IngestionJob:
+    def __init__(self, total: int):
+        self.id: str = generate_ulid()
+        self.status: IngestionStatusTypes = IngestionStatusTypes.PENDING
+        self.total: int = total
+        self.ids: list[str] = []
+        self.failures: list[RegisterFailure] = []
+        self.duplicates: list[RegisterDuplicate] = []
+        self.created_at: float = time.monotonic()
+        self.finished_at: float | None = None
+
+    def to_details(self) -> RegisterJobDetails:
+        return RegisterJobDetails(
+            id=self.id,
+            status=self.status,
+            total=self.total,
+            ids=list(self.ids),
+            failures=list(self.failures),
+            duplicates=list(self.duplicates),
+        )
+
+
+class IngestionJobRegistry:
+    """
+    In-process registry of ingestion jobs, so that their progress can be polled.
+    Finished jobs are forgotten after `ttl_seconds`.
+    NOTE: Jobs are only visible to the process that runs them.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._jobs: dict[str, IngestionJob] = {}
+        # Keeps running pipelines from being garbage collected
+        self._tasks: set[asyncio.Task] = set()
+
+    def create(self, total: int) -> IngestionJob:
+        self._prune()
+        job = IngestionJob(total=total)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, id: str) -> IngestionJob | None:
+        self._prune()
+        return self._jobs.get(id)
+
+    def run_in_background(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        expired_ids = [
+            job.id
+            for job in self._jobs.values()
+            if job.finished_at is not None and now - job.finished_at > self.ttl_seconds
+        ]
+        for id in expired_ids:
+            del self._jobs[id]
+
+
+ingestion_job_registry = IngestionJobRegistry(ttl_seconds=ingestion_settings.JOB_TTL_SECONDS)
+
+
+async def ingest_resumes(
+    job: IngestionJob,
+    role_id: str,
+    files: list[IngestionFile],
+    concurrency: int | None = None,
+    queue_size: int | None = None,
+    insert_batch_size: int | None = None,
+) -> IngestionJob:
+    """
+    Registers resume files into the DB into PENDING mode, as a pipeline of overlapping stages:
+      1. read: Reads each file, validates its type, and looks up text already extracted from an identical file
+         in the `ExtractedTextCache`
+      2. process: Uploads the file to S3 (when a bucket is configured) while its text is extracted in the process pool,
+         unless it was found in the cache. Process workers never touch the DB.
+      3. insert: Inserts extracted resumes into the DB in batches, caches newly extracted text, and flags files
+         identical to a resume already registered for the role in the job's duplicates
+
+    Stages are connected by bounded queues, so a slow stage applies backpressure to the stages before it,
+    and the whole job takes about as long as its slowest stage.
+    The read and insert stages share a single DB session, taking turns through a lock.
+
+    Files that fail at any stage are reported in the job's failures, without affecting the other files:
+    when a batch cannot be inserted, its resumes are inserted one by one, and only those that fail are reported.
+    Files uploaded to S3 that could not be registered are deleted from S3.
+    When a stage itself fails, the other stages are cancelled and the job is FAILED: resumes already inserted
+    stay registered, and every file that was neither registered nor failed yet is reported in the job's failures.
+
+    Returns:
+      - IngestionJob: The finished job
+    """
+
+    concurrency = concurrency or ingestion_settings.CONCURRENCY
+    queue_size = queue_size or ingestion_settings.QUEUE_SIZE
+    insert_batch_size = insert_batch_size or ingestion_settings.INSERT_BATCH_SIZE
+    extracted_text_cache: ExtractedTextCache = get_extracted_text_cache()
+
+    read_queue: asyncio.Queue[ReadResume | None] = asyncio.Queue(maxsize=queue_size)
+    insert_queue: asyncio.Queue[ExtractedResume | None] = asyncio.Queue(maxsize=queue_size)
+    # Sessions cannot be used concurrently, so the stages sharing it take turns
+    session_lock = asyncio.Lock()
+
+    job.status = IngestionStatusTypes.IN_PROGRESS
+    started_at = time.monotonic()
+
+    # The files not yet registered nor failed, by filename
+    unfinished_filenames: Counter[str | None] = Counter(file.filename for file in files)
+
+    def fail(filename: str | None, detail: str) -> None:
+        job.failures.append(RegisterFailure(filename=filename, detail=detail))
+        unfinished_filenames[filename] -= 1
+        logging.error(f"Failed to register resume {filename} | {detail}")
+
+    async def fail_uploaded(filename: str | None, s3_object_key: str | None, detail: str) -> None:
+        """
+        Reports a file that could not be registered, and deletes its S3 object so that it is not orphaned
+        """
+
+        if s3_object_key is not None:
+            try:
+                await get_s3_handler().delete_file(s3_object_key)
+            except Exception as e:
+                detail += f" | Failed to delete its S3 object {s3_object_key} | {str(e)}"
+
+        fail(filename, detail)
+
+    async def read(session) -> None:
+        for file in files:
+            if file.content_type not in [PDF_CONTENT_TYPE, DOCX_CONTENT_TYPE]:
+                fail(file.filename, "Invalid file type. Please upload a PDF of DOCX file.")
+                continue
+
+            try:
+                contents: bytes = await asyncio.to_thread(file.file.read)
+            except Exception as e:
+                fail(file.filename, f"Failed to read file | {str(e)}")
+                continue
+
+            content_hash: str = hash_document_content(contents)
+            async with session_lock:
+                cached_text: str | None = await extracted_text_cache.get(session=session, key=content_hash)
+
+            await read_queue.put(
+                ReadResume(file=file, contents=contents, content_hash=content_hash, cached_text=cached_text)
+            )
+
+        for _ in range(concurrency):
+            await read_queue.put(None)
+
+    async def upload(file: IngestionFile, contents: bytes) -> str | None:
+        if not s3_settings.BUCKET_NAME:
+            return None
+
+        return await get_s3_handler().upload_fileobj(
+            upload_resource_type=UploadResourceType.RESUME,
+            organization_id=s3_settings.ORGANIZATION_ID,
+            fileobj=io.BytesIO(contents),
+            filename=file.filename,
+            content_type=file.content_type,
+        )
+
+    async def extract(item: ReadResume) -> str:
+        if item.cached_text is not None:
+            return item.cached_text
+
+        extraction_result = await get_document_extractor().extract(
+            source=item.contents,
+            content_type=item.file.content_type,
+            filename=item.file.filename,
+        )
+
+        return extraction_result.text
+
+    async def process() -> None:
+        while True:
+            item = await read_queue.get()
+            if item is None:
+                return
+
+            s3_result, extraction_result = await asyncio.gather(
+                upload(item.file, item.contents),
+                extract(item),
+                return_exceptions=True,
+            )
+
+            if isinstance(s3_result, Exception):
+                fail(item.file.filename, f"Failed to upload file to S3 | {str(s3_result)}")
+                continue
+            if isinstance(extraction_result, Exception):
+                await fail_uploaded(
+                    item.file.filename,
+                    s3_result,
+                    f"Failed to extract text from provided file | {str(extraction_result)}",
+                )
+                continue
+
+            await insert_queue.put(
+                ExtractedResume(
+                    filename=item.file.filename,
+                    text=sanitize_content(extraction_result),
+                    s3_object_key=s3_result,
+                    content_hash=item.content_hash,
+                    is_cached=item.cached_text is not None,
+                )
+            )
+
+    async def process_all() -> None:
+        async with asyncio.TaskGroup() as workers:
+            for _ in range(concurrency):
+                workers.create_task(process())
+
+        await insert_queue.put(None)
+
+    # The first resume registered for each content hash in this job
+    registered_ids_by_hash: dict[str, str] = {}
+
+    async def save(session, batch: list[ExtractedResume]) -> tuple[dict[str, str], list[str]]:
+        """
+        Inserts a batch of resumes and caches their newly extracted text.
+
+        Returns:
+          - The IDs of resumes already registered for the role, by content hash, and the IDs of the inserted resumes
+        """
+
+        try:
+            existing_ids_by_hash: dict[str, str] = await ResumeDBHelper.select_ids_by_content_hashes(
+                session=session,
+                role_id=role_id,
+                content_hashes=[resume.content_hash for resume in batch],
+            )
+            ids: list[str] = await ResumeDBHelper.bulk_insert(
+                session=session,
+                role_id=role_id,
+                status=StatusTypes.PENDING,
+                contents=[resume.text for resume in batch],
+                s3_object_keys=[resume.s3_object_key for resume in batch],
+                content_hashes=[resume.content_hash for resume in batch],
+            )
+        except Exception:
+            await session.rollback()
+            raise
+        job.ids += ids
+
+        for resume in batch:
+            if not resume.is_cached:
+                await extracted_text_cache.put(session=session, key=resume.content_hash, value=resume.text)
+
+        return existing_ids_by_hash, ids
+
+    async def insert(session) -> None:
+        is_done: bool = False
+        while not is_done:
+            batch: list[ExtractedResume] = []
+
+            # Wait for the first resume of a batch, then gather more for a short while
+            item = await insert_queue.get()
+            if item is None:
+                return
+            batch.append(item)
+
+            flush_at = time.monotonic() + ingestion_settings.INSERT_FLUSH_SECONDS
+            while len(batch) < insert_batch_size:
+                try:
+                    item = await asyncio.wait_for(
+                        insert_queue.get(),
+                        timeout=max(0, flush_at - time.monotonic()),
+                    )
+                except (TimeoutError, asyncio.TimeoutError):
+                    break
+                if item is None:
+                    is_done = True
+                    break
+                batch.append(item)
+
+            try:
+                async with session_lock:
+                    existing_ids_by_hash, ids = await save(session, batch)
+                # Each saved resume, its ID, and the ID of a resume identical to it registered before this job
+                saved: list[tuple[ExtractedResume, str, str | None]] = [
+                    (resume, id, existing_ids_by_hash.get(resume.content_hash)) for resume, id in zip(batch, ids)
+                ]
+            except Exception as e:
+                if len(batch) == 1:
+                    await fail_uploaded(
+                        batch[0].filename,
+                        batch[0].s3_object_key,
+                        f"Failed to save processed resume into the DB | {str(e)}",
+                    )
+                    continue
+
+                # Save the resumes one by one, so that a single bad resume does not fail the whole batch
+                logging.warning(f"Failed to save {len(batch)} resumes into the DB, saving them one by one | {str(e)}")
+                saved = []
+                for resume in batch:
+                    try:
+                        async with session_lock:
+                            resume_existing_ids_by_hash, resume_ids = await save(session, [resume])
+                    except Exception as resume_error:
+                        await fail_uploaded(
+                            resume.filename,
+                            resume.s3_object_key,
+                            f"Failed to save processed resume into the DB | {str(resume_error)}",
+                        )
+                        continue
+                    saved.append((resume, resume_ids[0], resume_existing_ids_by_hash.get(resume.content_hash)))
+
+            for resume, id, existing_id in saved:
+                unfinished_filenames[resume.filename] -= 1
+                duplicate_of = existing_id or registered_ids_by_hash.get(resume.content_hash)
+                if duplicate_of is not None:
+                    job.duplicates.append(
+                        RegisterDuplicate(filename=resume.filename, id=id, duplicate_of=duplicate_of)
+                    )
+                else:
+                    registered_ids_by_hash[resume.content_hash] = id
+
+    try:
+        async with get_context_managed_session() as session:
+            # A stage that fails cancels the others, rather than leaving them blocked on its queue
+            async with asyncio.TaskGroup() as stages:
+                stages.create_task(read(session))
+                stages.create_task(process_all())
+                stages.create_task(insert(session))
+        job.status = IngestionStatusTypes.COMPLETE
+    except* Exception as e:
+        job.status = IngestionStatusTypes.FAILED
+        detail: str = " | ".join(str(error) for error in e.exceptions)
+        logging.error(f"Resume ingestion job {job.id} failed | {detail}")
+        # Resumes already inserted stay registered, every other file is reported as failed
+        for filename, count in list(unfinished_filenames.items()):
+            for _ in range(count):
+                fail(filename, f"Registration was interrupted | {detail}")
+    finally:
+        job.finished_at = time.monotonic()
+
+    logging.info(
+        f"Ingested {len(job.ids)}/{job.total} resumes for job {job.id} "
+        f"in {job.finished_at - started_at:.2f}s ({len(job.failures)} failures, {len(job.duplicates)} duplicates) | "
+        f"extracted text cache: {extracted_text_cache.stats}"
+    )
+
+    return job
@@ -0,0 +1,96 @@
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lib.helpers.cache_stats import CacheStats
+from lib.helpers.db.kv_cache import KVCacheDBHelper
+
+
+class KVCacheStats(CacheStats):
+  def __init__(self):
+    super().__init__()
+    self.writes: int = 0
+    self.evictions: int = 0
+
+  def __str__(self) -> str:
+    return f"{super().__str__()} writes={self.writes} evictions={self.evictions}"
+
+
+class PostgresKVCache:
+  """
+  Persistent (Postgres-backed) key-value cache with size-bounded LRU eviction, and an optional TTL.
+  Eviction runs every `eviction_interval` writes rather than on each write, to keep writes cheap.
+  Cache errors are logged, and never fail the caller: a failed read is a miss, and a failed write is dropped.
+
+  Caches configure it with the table they are stored in (see `KVCacheDBHelper`).
+  """
+
+  def __init__(
+    self,
+    name: str,
+    db_helper: KVCacheDBHelper,
+    max_entries: int,
+    ttl_seconds: int | None = None,
+    enabled: bool = True,
+    eviction_interval: int = 100,
+  ):
+    self.name = name
+    self.db_helper = db_helper
+    self.max_entries = max_entries
+    self.ttl_seconds = ttl_seconds
+    self.enabled = enabled
+    self.eviction_interval = eviction_interval
+    self.stats = KVCacheStats()
+
+  async def get(
+    self,
+    session: AsyncSession,
+    key: str,
+  ):
+    """
+    Returns the cached value for the key, or None on a miss
+    """
+
+    if not self.enabled:
+      return None
+
+    try:
+      value = await self.db_helper.get(session=session, key=key, ttl_seconds=self.ttl_seconds)
+    except Exception as e:
+      await session.rollback()
+      logging.error(f"Failed to read from the {self.name} | {str(e)}")
+      value = None
+
+    if value is None:
+      self.stats.misses += 1
+    else:
+      self.stats.hits += 1
+
+    return value
+
+  async def put(
+    self,
+    session: AsyncSession,
+    key: str,
+    value,
+  ) -> None:
+    """
+    Stores a value in the cache
+    """
+
+    if not self.enabled:
+      return
+
+    try:
+      await self.db_helper.upsert(session=session, key=key, value=value)
+      self.stats.writes += 1
+
+      if self.stats.writes % self.eviction_interval == 0:
+        self.stats.evictions += await self.db_helper.evict(
+          session=session,
+          max_entries=self.max_entries,
+          ttl_seconds=self.ttl_seconds,
+        )
+    except Exception as e:
+      await session.rollback()
+      logging.error(f"Failed to write to the {self.name} | {str(e)}")
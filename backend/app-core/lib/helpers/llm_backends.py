@@ -0,0 +1,353 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import StrEnum
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+from lib.helpers.rate_limit import estimate_tokens
+from lib.helpers.resilience import LLMCallError, LLMErrorTypes
+
+from settings import llm_settings, open_api_settings
+
+
+class LLMBackendTypes(StrEnum):
+  OPENAI = "openai"
+  OPENAI_COMPATIBLE = "openai_compatible"
+  STUB = "stub"
+
+
+class StubLatencyDistributionTypes(StrEnum):
+  FIXED = "fixed"
+  UNIFORM = "uniform"
+  NORMAL = "normal"
+  LOGNORMAL = "lognormal"
+
+
+def parse_retry_after(headers: httpx.Headers | None) -> float | None:
+  """
+  Parses how many seconds to wait before retrying from the `retry-after-ms` or `retry-after` response header
+  (in seconds, or as an HTTP date)
+  """
+
+  if headers is None:
+    return None
+
+  try:
+    if headers.get("retry-after-ms") is not None:
+      return max(0.0, float(headers["retry-after-ms"]) / 1000)
+
+    retry_after: str | None = headers.get("retry-after")
+    if retry_after is None:
+      return None
+    try:
+      return max(0.0, float(retry_after))
+    except ValueError:
+      return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+  except Exception:
+    return None
+
+
+def classify_openai_error(e: Exception) -> LLMCallError:
+  """
+  Classifies an exception raised by the OpenAI client into an `LLMCallError`
+  """
+
+  message: str = f"Failed to retrieve response from OpenAI | {str(e)}"
+
+  if isinstance(e, openai.APITimeoutError):
+    return LLMCallError(type=LLMErrorTypes.TIMEOUT, message=message, retryable=True)
+  if isinstance(e, openai.APIConnectionError):
+    return LLMCallError(type=LLMErrorTypes.CONNECTION, message=message, retryable=True)
+  if isinstance(e, openai.APIStatusError):
+    retry_after: float | None = parse_retry_after(e.response.headers)
+    if e.status_code == 429:
+      return LLMCallError(type=LLMErrorTypes.RATE_LIMIT, message=message, retryable=True, retry_after=retry_after)
+    if e.status_code >= 500:
+      return LLMCallError(type=LLMErrorTypes.SERVER, message=message, retryable=True, retry_after=retry_after)
+    if e.status_code in [408, 409]:
+      return LLMCallError(type=LLMErrorTypes.TIMEOUT, message=message, retryable=True, retry_after=retry_after)
+    return LLMCallError(type=LLMErrorTypes.CLIENT, message=message, retryable=False)
+
+  return LLMCallError(type=LLMErrorTypes.CLIENT, message=message, retryable=False)
+
+
+class LLMBackend(ABC):
+  """
+  Sends chat completion requests on behalf of `AsyncOpenAIHelper`.
+  Backends return OpenAI `ChatCompletion`s, and raise an `LLMCallError` when a request fails.
+  """
+
+  @abstractmethod
+  async def create_chat_completion(
+    self,
+    model: str,
+    messages: list[dict[str, str]],
+    tools: list[dict[str]],
+    prompt_cache_key: str | None = None,
+  ) -> ChatCompletion:
+    ...
+
+  async def close(self) -> None:
+    """
+    Releases the backend's resources (ie: its connection pool). Backends that hold none need not override it.
+    """
+
+
+class OpenAIBackend(LLMBackend):
+  """
+  Sends requests to the OpenAI API, or to any server implementing its chat completions API (ie: vLLM, llama.cpp)
+  when `base_url` is set.
+  Holds a single `AsyncOpenAI` client whose HTTP connection pool is kept alive between calls.
+  The client's own retries are disabled, so that every attempt is accounted for by `ResilientCaller`.
+  """
+
+  def __init__(
+    self,
+    api_key: str | None,
+    organization_id: str | None,
+    base_url: str | None = None,
+    timeout_seconds: float = 60,
+    connect_timeout_seconds: float = 5,
+    max_connections: int = 32,
+    max_keepalive_connections: int = 16,
+    keepalive_expiry_seconds: float = 30,
+    supports_prompt_cache_key: bool = True,
+    transport: httpx.AsyncBaseTransport | None = None,
+  ):
+    """
+    Args:
+      - supports_prompt_cache_key: Whether the server accepts OpenAI's `prompt_cache_key`, which is not sent otherwise
+      - transport: Sends the HTTP requests instead of the network, ie: an `httpx.MockTransport` in tests
+    """
+
+    self.supports_prompt_cache_key = supports_prompt_cache_key
+    self.http_client = httpx.AsyncClient(
+      timeout=httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds),
+      limits=httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry_seconds,
+      ),
+      transport=transport,
+    )
+    self.client = AsyncOpenAI(
+      api_key=api_key,
+      organization=organization_id,
+      base_url=base_url,
+      http_client=self.http_client,
+      max_retries=0,
+    )
+
+  async def create_chat_completion(
+    self,
+    model: str,
+    messages: list[dict[str, str]],
+    tools: list[dict[str]],
+    prompt_cache_key: str | None = None,
+  ) -> ChatCompletion:
+    extra_args: dict = {}
+    if prompt_cache_key is not None and self.supports_prompt_cache_key:
+      extra_args["prompt_cache_key"] = prompt_cache_key
+
+    try:
+      return await self.client.chat.completions.create(
+        model=model,
+        messages=messages,
+        tools=tools,
+        **extra_args,
+      )
+    except Exception as e:
+      raise classify_openai_error(e)
+
+  async def close(self) -> None:
+    """
+    Closes the underlying HTTP connection pool
+    """
+
+    await self.client.close()
+
+
+# Resumes of a multi-resume prompt (see `build_multi_resume_prompt`)
+RESUME_ID_TAG = re.compile(r'<resume id="([^"]+)">')
+
+
+def build_stub_value(
+  schema: dict,
+  rng: random.Random,
+  user_msg: str,
+  name: str | None = None,
+):
+  """
+  Builds a value valid against a JSON schema, as found in the parameters of `TOOLS`.
+  Integers without bounds are drawn from 0-100, as tool scores are out of 100.
+  Arrays of items keyed by `resume_id` get one item per resume of the prompt, as a model would return.
+  """
+
+  type = schema.get("type")
+
+  if type == "object":
+    return {
+      property_name: build_stub_value(property_schema, rng, user_msg, property_name)
+      for property_name, property_schema in schema.get("properties", {}).items()
+    }
+  if type == "array":
+    items: dict = schema.get("items", {})
+    if "resume_id" in items.get("properties", {}):
+      return [
+        {**build_stub_value(items, rng, user_msg), "resume_id": resume_id}
+        for resume_id in RESUME_ID_TAG.findall(user_msg)
+      ]
+    return [build_stub_value(items, rng, user_msg)]
+  if type == "integer":
+    return rng.randint(schema.get("minimum", 0), schema.get("maximum", 100))
+  if type == "number":
+    return rng.uniform(schema.get("minimum", 0), schema.get("maximum", 100))
+  if type == "boolean":
+    return rng.random() < 0.5
+  if type == "string":
+    return f"Stub {name or 'value'} {rng.randint(0, 9999)}"
+
+  return None
+
+
+class StubBackend(LLMBackend):
+  """
+  In-process backend that answers every request with tool call arguments valid against the tool's schema,
+  after a simulated latency, without any network call. Used to load test scoring offline.
+
+  Arguments are derived from a hash of the request, so the same prompt always gets the same answer.
+  Latencies are drawn from `latency_distribution`:
+    - fixed: Always `latency_seconds`
+    - uniform: Between `latency_seconds - latency_spread` and `latency_seconds + latency_spread`
+    - normal: Mean `latency_seconds`, with a standard deviation of `latency_spread` seconds
+    - lognormal: Median `latency_seconds`, with a standard deviation of `latency_spread` in log space,
+      which gives the long tail of real providers
+
+  A share of `error_rate` requests fail with a retryable server error, to exercise the retry path.
+  """
+
+  def __init__(
+    self,
+    latency_distribution: StubLatencyDistributionTypes = StubLatencyDistributionTypes.FIXED,
+    latency_seconds: float = 0,
+    latency_spread: float = 0,
+    error_rate: float = 0,
+    seed: int | None = None,
+  ):
+    self.latency_distribution = latency_distribution
+    self.latency_seconds = latency_seconds
+    self.latency_spread = latency_spread
+    self.error_rate = error_rate
+    self.random = random.Random(seed)
+
+  def sample_latency(self) -> float:
+    if self.latency_distribution == StubLatencyDistributionTypes.UNIFORM:
+      latency = self.random.uniform(self.latency_seconds - self.latency_spread, self.latency_seconds + self.latency_spread)
+    elif self.latency_distribution == StubLatencyDistributionTypes.NORMAL:
+      latency = self.random.gauss(self.latency_seconds, self.latency_spread)
+    elif self.latency_distribution == StubLatencyDistributionTypes.LOGNORMAL:
+      latency = self.latency_seconds * self.random.lognormvariate(0, self.latency_spread)
+    else:
+      latency = self.latency_seconds
+
+    return max(0.0, latency)
+
+  async def create_chat_completion(
+    self,
+    model: str,
+    messages: list[dict[str, str]],
+    tools: list[dict[str]],
+    prompt_cache_key: str | None = None,
+  ) -> ChatCompletion:
+    await asyncio.sleep(self.sample_latency())
+
+    if self.random.random() < self.error_rate:
+      raise LLMCallError(type=LLMErrorTypes.SERVER, message="Simulated stub backend failure", retryable=True)
+
+    request: str = json.dumps({"messages": messages, "tools": tools}, sort_keys=True)
+    digest: bytes = hashlib.blake2b(request.encode(), digest_size=8).digest()
+    rng = random.Random(int.from_bytes(digest, "big"))
+
+    function: dict = tools[0]["function"]
+    user_msg: str = next((message["content"] for message in messages if message["role"] == "user"), "")
+    arguments: str = json.dumps(build_stub_value(function["parameters"], rng, user_msg))
+
+    prompt_tokens: int = estimate_tokens(request)
+    completion_tokens: int = estimate_tokens(arguments)
+
+    return ChatCompletion.model_validate({
+      "id": f"stub-{digest.hex()}",
+      "object": "chat.completion",
+      "created": int(time.time()),
+      "model": model,
+      "choices": [
+        {
+          "index": 0,
+          "finish_reason": "tool_calls",
+          "message": {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+              {
+                "id": f"call_{digest.hex()}",
+                "type": "function",
+                "function": {"name": function["name"], "arguments": arguments},
+              }
+            ],
+          },
+        }
+      ],
+      "usage": {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+      },
+    })
+
+
+def create_llm_backend() -> LLMBackend:
+  """
+  Creates the backend selected by `LLM_BACKEND`:
+    - openai: The OpenAI API
+    - openai_compatible: An OpenAI-compatible server at `OPEN_AI_BASE_URL` (ie: vLLM, llama.cpp)
+    - stub: An in-process `StubBackend`, configured by `LLM_STUB_*`
+  """
+
+  backend_type = LLMBackendTypes(llm_settings.BACKEND)
+
+  if backend_type == LLMBackendTypes.STUB:
+    return StubBackend(
+      latency_distribution=StubLatencyDistributionTypes(llm_settings.STUB_LATENCY_DISTRIBUTION),
+      latency_seconds=llm_settings.STUB_LATENCY_SECONDS,
+      latency_spread=llm_settings.STUB_LATENCY_SPREAD,
+      error_rate=llm_settings.STUB_ERROR_RATE,
+      seed=llm_settings.STUB_SEED,
+    )
+
+  if backend_type == LLMBackendTypes.OPENAI_COMPATIBLE and not open_api_settings.BASE_URL:
+    raise ValueError("OPEN_AI_BASE_URL must be set for the openai_compatible LLM backend")
+
+  return OpenAIBackend(
+    # Local servers usually need no API key, but the client requires one
+    api_key=open_api_settings.API_KEY or (
+      "EMPTY" if backend_type == LLMBackendTypes.OPENAI_COMPATIBLE else None
+    ),
+    organization_id=open_api_settings.ORGANIZATION_ID,
+    base_url=open_api_settings.BASE_URL,
+    timeout_seconds=open_api_settings.TIMEOUT_SECONDS,
+    connect_timeout_seconds=open_api_settings.CONNECT_TIMEOUT_SECONDS,
+    max_connections=open_api_settings.MAX_CONNECTIONS,
+    max_keepalive_connections=open_api_settings.MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry_seconds=open_api_settings.KEEPALIVE_EXPIRY_SECONDS,
+    supports_prompt_cache_key=backend_type == LLMBackendTypes.OPENAI,
+  )
@@ -1,14 +1,15 @@
 import markdown
 from bs4 import BeautifulSoup
 
-def extract_text_from_markdown(markdown_path: str) -> str:
+from lib.helpers.document import DocumentSource, read_document_source
+
+def extract_text_from_markdown(markdown_file: DocumentSource) -> str:
     """
-    Given the path to a Markdown file, extracts just the text from the file as a string.
+    Given a Markdown file (path, bytes, memoryview or binary file-like object), extracts just the text from the file as a string.
     """
 
     try:
-        with open(markdown_path, 'r', encoding='utf-8') as file:
-            markdown_content = file.read()
+        markdown_content = read_document_source(markdown_file).decode('utf-8')
 
         # Convert Markdown to HTML
         html_content = markdown.markdown(markdown_content)
@@ -1,12 +1,42 @@
 from openai import OpenAI
 import json
 
+from lib.helpers.llm_backends import LLMBackend, create_llm_backend
+from lib.helpers.rate_limit import RateLimiter
+from lib.helpers.resilience import CircuitBreaker, LLMCallError, LLMErrorTypes, ResilientCaller
+
+from settings import open_api_settings
+
+
+def parse_function_call_response(response) -> dict:
+  """
+  Parses the arguments of the first tool call in an OpenAI chat completion response
+  """
+
+  try:
+    # Parse JSON data from OpenAI's response
+    tool_call = response.choices[0].message.tool_calls[0]
+    arguments = tool_call.function.arguments
+    resume_data = json.loads(arguments)
+  except Exception as e:
+    raise LLMCallError(
+      type=LLMErrorTypes.PARSE,
+      message=f"Failed to parse resume JSON data from OpenAI's response | {str(e)}",
+      # Sending the same prompt again is unlikely to fix a malformed answer, callers decide how to re-ask
+      retryable=False,
+    )
+
+  return resume_data
+
+
 class OpenAIHelper:
   def __init__(
     self,
     api_key: str,
     organization_id: str,
+    model: str | None = None,
   ):
+    self.model = model or open_api_settings.MODEL
     self.client = OpenAI(
       api_key=api_key,
       organization=organization_id,
@@ -25,7 +55,7 @@ class OpenAIHelper:
     try:
       # Send function call prompt to OpenAPI
       response = self.client.chat.completions.create(
-        model="gpt-4o-mini", # TODO: Make configurable
+        model=self.model,
         messages=[
           {"role": "system", "content": system_msg},
           {"role": "user", "content": user_msg}
@@ -35,12 +65,167 @@ class OpenAIHelper:
     except Exception as e:
       raise Exception(f"Failed to retrieve response from OpenAI | {str(e)}")
 
-    try:
-      # Parse JSON data from OpenAI's response
-      tool_call = response.choices[0].message.tool_calls[0]
-      arguments = tool_call.function.arguments
-      resume_data = json.loads(arguments)
-    except Exception as e:
-      raise Exception(f"Failed to parse resume JSON data from OpenAI's response | {str(e)}")
+    return parse_function_call_response(response)
+
+
+class PromptUsageStats:
+  """
+  Token usage reported by OpenAI, accumulated over the requests of a helper.
+  cached_prompt_tokens: Prompt tokens served from OpenAI's prompt cache, billed at a discount and faster to process.
+  """
+
+  def __init__(self):
+    self.requests: int = 0
+    self.prompt_tokens: int = 0
+    self.cached_prompt_tokens: int = 0
+    self.completion_tokens: int = 0
+
+  @property
+  def cached_rate(self) -> float:
+    return self.cached_prompt_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+  def record(self, response) -> None:
+    self.requests += 1
+
+    usage = getattr(response, "usage", None)
+    if usage is None:
+      return
+
+    self.prompt_tokens += usage.prompt_tokens or 0
+    self.completion_tokens += usage.completion_tokens or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is not None:
+      self.cached_prompt_tokens += details.cached_tokens or 0
+
+  def __str__(self) -> str:
+    return (
+      f"requests={self.requests} prompt_tokens={self.prompt_tokens} "
+      f"cached_prompt_tokens={self.cached_prompt_tokens} cached_rate={self.cached_rate:.2%} "
+      f"completion_tokens={self.completion_tokens}"
+    )
+
+
+class AsyncOpenAIHelper:
+  """
+  Async counterpart of `OpenAIHelper`.
+  Requests are sent by an `LLMBackend` (ie: the OpenAI API, an OpenAI-compatible server, or an in-process stub),
+  which holds a connection pool that is kept alive between calls, so the helper should be created once
+  per process (see `get_async_openai_helper`) and shared.
+
+  Calls go through a `ResilientCaller`, which retries transient failures, stops calling the backend
+  while it keeps failing (circuit breaker), and optionally hedges slow requests.
+  """
+
+  def __init__(
+    self,
+    backend: LLMBackend,
+    model: str,
+    max_attempts: int = 4,
+    backoff_base_seconds: float = 1,
+    backoff_max_seconds: float = 30,
+    circuit_failure_threshold: int = 5,
+    circuit_reset_seconds: float = 30,
+    hedge_after_seconds: float = 0,
+  ):
+    self.model = model
+    self.usage_stats = PromptUsageStats()
+    self.circuit_breaker = CircuitBreaker(
+      failure_threshold=circuit_failure_threshold,
+      reset_seconds=circuit_reset_seconds,
+    )
+    self.caller = ResilientCaller(
+      max_attempts=max_attempts,
+      backoff_base_seconds=backoff_base_seconds,
+      backoff_max_seconds=backoff_max_seconds,
+      circuit_breaker=self.circuit_breaker,
+      hedge_after_seconds=hedge_after_seconds,
+    )
+    self.backend = backend
+
+  async def function_call_prompt(
+    self,
+    user_msg: str,
+    system_msg: str,
+    tools: list[dict[str]],
+    prompt_cache_key: str | None = None,
+    rate_limiter: RateLimiter | None = None,
+    estimated_tokens: int = 0,
+  ):
+    """
+    Sends a function call prompt to the LLM backend without blocking the event loop
+
+    Args:
+      - prompt_cache_key: Groups requests sharing a prompt prefix (ie: the same role), so that OpenAI routes them
+        to the same prompt cache. Ignored by backends that do not support it.
+      - rate_limiter: When given, one request and `estimated_tokens` are acquired from it before each request
+        that is sent, so that retries and hedged requests are within the budgets too.
+
+    Raises:
+      - LLMCallError: When the call failed for good, classified by type. Retryable errors (ie: the circuit is open)
+        may succeed when the call is made again later.
+    """
+
+    async def send() -> dict:
+      response = await self.backend.create_chat_completion(
+        model=self.model,
+        messages=[
+          {"role": "system", "content": system_msg},
+          {"role": "user", "content": user_msg}
+        ],
+        tools=tools,
+        prompt_cache_key=prompt_cache_key,
+      )
+
+      self.usage_stats.record(response)
+
+      return parse_function_call_response(response)
+
+    async def acquire() -> None:
+      await rate_limiter.acquire(tokens=estimated_tokens)
+
+    return await self.caller.call(send, before_send=acquire if rate_limiter is not None else None)
+
+  async def close(self) -> None:
+    """
+    Closes the backend, and its HTTP connection pool
+    """
+
+    await self.backend.close()
+
+
+_async_openai_helper: AsyncOpenAIHelper | None = None
+
+
+def get_async_openai_helper() -> AsyncOpenAIHelper:
+  """
+  Returns the process-wide `AsyncOpenAIHelper`, creating it and its backend (see `create_llm_backend`)
+  from settings on first use
+  """
+
+  global _async_openai_helper
+
+  if _async_openai_helper is None:
+    _async_openai_helper = AsyncOpenAIHelper(
+      backend=create_llm_backend(),
+      model=open_api_settings.MODEL,
+      max_attempts=open_api_settings.MAX_ATTEMPTS,
+      backoff_base_seconds=open_api_settings.BACKOFF_BASE_SECONDS,
+      backoff_max_seconds=open_api_settings.BACKOFF_MAX_SECONDS,
+      circuit_failure_threshold=open_api_settings.CIRCUIT_FAILURE_THRESHOLD,
+      circuit_reset_seconds=open_api_settings.CIRCUIT_RESET_SECONDS,
+      hedge_after_seconds=open_api_settings.HEDGE_AFTER_SECONDS,
+    )
+
+  return _async_openai_helper
+
+
+async def close_async_openai_helper() -> None:
+  """
+  Closes the process-wide `AsyncOpenAIHelper` if it was created
+  """
+
+  global _async_openai_helper
 
-    return resume_data
+  if _async_openai_helper is not None:
+    await _async_openai_helper.close()
+    _async_openai_helper = None
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import time
+
+from openai.types import Batch
+from openai.types.chat import ChatCompletion
+
+from lib.helpers.llm_backends import OpenAIBackend
+from lib.helpers.openai import AsyncOpenAIHelper, parse_function_call_response
+
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_MAX_REQUESTS = 50000
+# Batch input files are limited to 200 MB
+BATCH_MAX_INPUT_FILE_BYTES = 200 * 1024 * 1024
+BATCH_TERMINAL_STATUSES = ["completed", "failed", "expired", "cancelled"]
+
+
+class BatchResults:
+  """
+  successes: The parsed function call arguments, by custom ID
+  failures: The reason each failed request failed, by custom ID
+  """
+
+  def __init__(self):
+    self.successes: dict[str, dict] = {}
+    self.failures: dict[str, str] = {}
+
+
+def chunk_batch_requests(
+  requests: list[dict],
+  max_requests: int = BATCH_MAX_REQUESTS,
+  max_bytes: int = BATCH_MAX_INPUT_FILE_BYTES,
+) -> list[list[dict]]:
+  """
+  Splits requests into chunks that each fit in a single batch, by number of requests and by input file size.
+  """
+
+  chunks: list[list[dict]] = []
+  chunk: list[dict] = []
+  chunk_bytes: int = 0
+
+  for request in requests:
+    # Each JSONL line, and the line break joining it to the previous one
+    request_bytes: int = len(json.dumps(request).encode("utf-8")) + 1
+    if request_bytes > max_bytes:
+      raise ValueError(f"Batch request {request['custom_id']} alone exceeds the {max_bytes} bytes input file limit")
+
+    if chunk and (len(chunk) >= max_requests or chunk_bytes + request_bytes > max_bytes):
+      chunks.append(chunk)
+      chunk = []
+      chunk_bytes = 0
+
+    chunk.append(request)
+    chunk_bytes += request_bytes
+
+  if chunk:
+    chunks.append(chunk)
+
+  return chunks
+
+
+class OpenAIBatchHelper:
+  """
+  Submits function call prompts through the OpenAI Batch API.
+  Batch requests are billed at half the price of synchronous requests and complete within 24 hours.
+  """
+
+  def __init__(
+    self,
+    openai_helper: AsyncOpenAIHelper,
+  ):
+    if not isinstance(openai_helper.backend, OpenAIBackend):
+      raise ValueError("The OpenAI Batch API requires the openai LLM backend")
+
+    self.client = openai_helper.backend.client
+    self.model = openai_helper.model
+
+  def build_request(
+    self,
+    custom_id: str,
+    user_msg: str,
+    system_msg: str,
+    tools: list[dict[str]],
+  ) -> dict:
+    """
+    Builds a single line of a batch input file, equivalent to `AsyncOpenAIHelper.function_call_prompt`
+    """
+
+    return {
+      "custom_id": custom_id,
+      "method": "POST",
+      "url": BATCH_ENDPOINT,
+      "body": {
+        "model": self.model,
+        "messages": [
+          {"role": "system", "content": system_msg},
+          {"role": "user", "content": user_msg}
+        ],
+        "tools": tools,
+      },
+    }
+
+  async def submit(
+    self,
+    requests: list[dict],
+    metadata: dict[str, str] | None = None,
+  ) -> str:
+    """
+    Uploads the requests as a JSONL batch input file and creates a batch job for it.
+    The requests must fit in a single batch (see `chunk_batch_requests`).
+
+    Returns:
+      - The ID of the created batch
+    """
+
+    jsonl: bytes = "\n".join(json.dumps(request) for request in requests).encode("utf-8")
+    if len(requests) > BATCH_MAX_REQUESTS or len(jsonl) > BATCH_MAX_INPUT_FILE_BYTES:
+      raise ValueError(
+        f"Batch of {len(requests)} requests and {len(jsonl)} bytes exceeds the limits of a single batch"
+      )
+
+    try:
+      input_file = await self.client.files.create(
+        file=("batch_input.jsonl", jsonl),
+        purpose="batch",
+      )
+      batch = await self.client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+        metadata=metadata,
+      )
+    except Exception as e:
+      raise Exception(f"Failed to submit batch to OpenAI | {str(e)}")
+
+    return batch.id
+
+  async def wait(
+    self,
+    batch_id: str,
+    poll_interval_seconds: float,
+    timeout_seconds: float,
+  ) -> Batch:
+    """
+    Polls a batch until it reaches a terminal status.
+
+    Returns:
+      - The batch in its terminal status
+    """
+
+    deadline: float = time.monotonic() + timeout_seconds
+
+    while True:
+      try:
+        batch = await self.client.batches.retrieve(batch_id)
+      except Exception as e:
+        raise Exception(f"Failed to retrieve batch {batch_id} from OpenAI | {str(e)}")
+
+      if batch.status in BATCH_TERMINAL_STATUSES:
+        return batch
+
+      if time.monotonic() >= deadline:
+        raise TimeoutError(f"Batch {batch_id} did not complete within {timeout_seconds}s (status: {batch.status})")
+
+      await asyncio.sleep(poll_interval_seconds)
+
+  async def cancel(
+    self,
+    batch_id: str,
+  ) -> None:
+    """
+    Cancels a batch that has not reached a terminal status, so that its remaining requests are not run (nor billed)
+    """
+
+    try:
+      await self.client.batches.cancel(batch_id)
+    except Exception as e:
+      raise Exception(f"Failed to cancel batch {batch_id} on OpenAI | {str(e)}")
+
+  async def fetch_results(
+    self,
+    batch: Batch,
+  ) -> BatchResults:
+    """
+    Downloads and parses the output and error files of a finished batch.
+    Requests of the batch that appear in neither file are not included.
+    """
+
+    results = BatchResults()
+
+    if batch.output_file_id:
+      output = await self.client.files.content(batch.output_file_id)
+      for line in output.text.splitlines():
+        if not line.strip():
+          continue
+
+        record: dict = json.loads(line)
+        custom_id: str = record["custom_id"]
+        response: dict | None = record.get("response")
+
+        if record.get("error") or not response or response.get("status_code") != 200:
+          results.failures[custom_id] = str(record.get("error") or response)
+          continue
+
+        try:
+          completion = ChatCompletion.model_validate(response["body"])
+          results.successes[custom_id] = parse_function_call_response(completion)
+        except Exception as e:
+          results.failures[custom_id] = str(e)
+
+    if batch.error_file_id:
+      errors = await self.client.files.content(batch.error_file_id)
+      for line in errors.text.splitlines():
+        if not line.strip():
+          continue
+
+        record: dict = json.loads(line)
+        results.failures[record["custom_id"]] = str(record.get("error") or record.get("response"))
+
+    return results
@@ -1,13 +1,15 @@
 from pdfminer.high_level import extract_text
 
+from lib.helpers.document import DocumentSource, open_document_source
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+
+def extract_text_from_pdf(pdf: DocumentSource) -> str:
     """
-    Given the path to a PDF file, extracts just the text from the file as a string.
+    Given a PDF file (path, bytes, memoryview or binary file-like object), extracts just the text from the file as a string.
     """
 
     try:
-        text: str = extract_text(pdf_path)
+        text: str = extract_text(open_document_source(pdf))
         return text
     except Exception as e:
         raise ValueError(f"Error extracting text from PDF: {str(e)}")
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+
+def estimate_tokens(text: str) -> int:
+  """
+  Roughly estimates the number of tokens in the given text (~4 characters per token).
+  """
+
+  return len(text) // 4 + 1
+
+
+class RateLimiter:
+  """
+  Async token-bucket limiter enforcing both a requests-per-minute and a tokens-per-minute budget.
+  Both buckets start full and refill continuously, so bursts up to the per-minute budget are allowed.
+  """
+
+  def __init__(
+    self,
+    requests_per_minute: int,
+    tokens_per_minute: int,
+  ):
+    if requests_per_minute <= 0 or tokens_per_minute <= 0:
+      raise ValueError("Rate limits must be positive")
+
+    self.requests_per_minute = requests_per_minute
+    self.tokens_per_minute = tokens_per_minute
+
+    self._available_requests: float = requests_per_minute
+    self._available_tokens: float = tokens_per_minute
+    self._last_refill: float = time.monotonic()
+    self._lock = asyncio.Lock()
+
+  def _refill(self) -> None:
+    now = time.monotonic()
+    elapsed = now - self._last_refill
+    self._last_refill = now
+
+    self._available_requests = min(
+      self.requests_per_minute,
+      self._available_requests + elapsed * self.requests_per_minute / 60,
+    )
+    self._available_tokens = min(
+      self.tokens_per_minute,
+      self._available_tokens + elapsed * self.tokens_per_minute / 60,
+    )
+
+  async def acquire(self, tokens: int) -> None:
+    """
+    Waits until one request and the given number of tokens fit into the budgets, then consumes them.
+    Waiters are served in FIFO order.
+
+    Args:
+      - tokens: The estimated number of tokens the request will use.
+        NOTE: Requests larger than the per-minute token budget are clamped to it.
+    """
+
+    tokens = min(tokens, self.tokens_per_minute)
+
+    async with self._lock:
+      while True:
+        self._refill()
+
+        if self._available_requests >= 1 and self._available_tokens >= tokens:
+          self._available_requests -= 1
+          self._available_tokens -= tokens
+          return
+
+        request_wait = max(0, 1 - self._available_requests) * 60 / self.requests_per_minute
+        token_wait = max(0, tokens - self._available_tokens) * 60 / self.tokens_per_minute
+        await asyncio.sleep(max(request_wait, token_wait))
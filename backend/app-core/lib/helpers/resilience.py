@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import random
+import time
+from enum import StrEnum
+from typing import Awaitable, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class LLMErrorTypes(StrEnum):
+  RATE_LIMIT = "rate_limit"
+  TIMEOUT = "timeout"
+  CONNECTION = "connection"
+  SERVER = "server"
+  PARSE = "parse"
+  CLIENT = "client"
+  CIRCUIT_OPEN = "circuit_open"
+
+
+class LLMCallError(Exception):
+  """
+  A failed LLM call, classified by `type`.
+
+  retryable: Whether the same call may succeed later (ie: rate limits, timeouts and 5xx), as opposed to
+    a request the provider will always reject (ie: an invalid request or API key).
+  retry_after: Seconds the provider asked to wait before retrying (ie: the Retry-After header), if any.
+  """
+
+  def __init__(
+    self,
+    type: LLMErrorTypes,
+    message: str,
+    retryable: bool,
+    retry_after: float | None = None,
+  ):
+    super().__init__(message)
+    self.type = type
+    self.retryable = retryable
+    self.retry_after = retry_after
+
+
+# Errors returned by a provider that is up, so they do not trip the circuit breaker
+PROVIDER_UP_ERROR_TYPES = [LLMErrorTypes.PARSE, LLMErrorTypes.CLIENT]
+
+
+class CircuitBreaker:
+  """
+  Stops calls to a provider that keeps failing, so that workers back off instead of piling up failing requests.
+
+  The circuit opens after `failure_threshold` consecutive failures, and rejects calls for `reset_seconds`.
+  It then lets a single probe call through (half-open): the circuit closes when the probe succeeds,
+  and opens again when it fails. A probe that never reports back (ie: it was cancelled) is replaced
+  by another one after `reset_seconds`.
+  """
+
+  def __init__(
+    self,
+    failure_threshold: int,
+    reset_seconds: float,
+  ):
+    self.failure_threshold = failure_threshold
+    self.reset_seconds = reset_seconds
+    self.consecutive_failures: int = 0
+    self.opened_at: float | None = None
+    self._probe_started_at: float | None = None
+
+  def seconds_until_retry(self) -> float:
+    """
+    Returns how long calls are still rejected for, 0 when the circuit is closed or a probe may be sent
+    """
+
+    if self.opened_at is None:
+      return 0.0
+
+    return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+  def before_call(self) -> None:
+    """
+    Raises an `LLMCallError` of type CIRCUIT_OPEN when the call must not be sent
+    """
+
+    if self.opened_at is None:
+      return
+
+    now: float = time.monotonic()
+    is_probing: bool = self._probe_started_at is not None and now - self._probe_started_at < self.reset_seconds
+
+    seconds_until_retry: float = self.seconds_until_retry()
+    if seconds_until_retry > 0 or is_probing:
+      raise LLMCallError(
+        type=LLMErrorTypes.CIRCUIT_OPEN,
+        message=f"Circuit open after {self.consecutive_failures} consecutive failures",
+        retryable=True,
+        retry_after=seconds_until_retry or None,
+      )
+
+    self._probe_started_at = now
+
+  def record_success(self) -> None:
+    if self.opened_at is not None:
+      logging.info("Circuit closed, LLM calls succeed again")
+
+    self.consecutive_failures = 0
+    self.opened_at = None
+    self._probe_started_at = None
+
+  def record_failure(self) -> None:
+    self.consecutive_failures += 1
+
+    if self._probe_started_at is not None or self.consecutive_failures >= self.failure_threshold:
+      if self.opened_at is None:
+        logging.warning(
+          f"Circuit opened after {self.consecutive_failures} consecutive LLM call failures, "
+          f"rejecting calls for {self.reset_seconds}s"
+        )
+      self.opened_at = time.monotonic()
+      self._probe_started_at = None
+
+
+class LLMCallStats:
+  """
+  Counts of LLM call outcomes. Every attempt is counted, so retries show up in the failure counts.
+  hedges: Duplicate requests sent because the first one was slow, hedge_wins: Hedges that answered first.
+  """
+
+  def __init__(self):
+    self.calls: int = 0
+    self.successes: int = 0
+    self.retries: int = 0
+    self.hedges: int = 0
+    self.hedge_wins: int = 0
+    self.errors: dict[LLMErrorTypes, int] = {type: 0 for type in LLMErrorTypes}
+
+  def __str__(self) -> str:
+    return (
+      f"calls={self.calls} successes={self.successes} retries={self.retries} "
+      f"hedges={self.hedges} hedge_wins={self.hedge_wins} "
+      + " ".join(f"{type.value}={count}" for type, count in self.errors.items())
+    )
+
+
+class ResilientCaller:
+  """
+  Calls an LLM provider with retries, a circuit breaker and optional hedged requests.
+
+  - Retryable errors are retried up to `max_attempts` attempts in total, with full-jitter exponential backoff
+    (a random delay of up to `backoff_base_seconds * 2^attempt`, capped at `backoff_max_seconds`).
+    A Retry-After from the provider is waited out when it is within `backoff_max_seconds`,
+    otherwise the error is raised right away for the caller to retry later.
+  - When `hedge_after_seconds` is set, a duplicate request is sent when the first one has not answered
+    in that time, and the first answer wins. This cuts tail latency at the cost of extra requests.
+  """
+
+  def __init__(
+    self,
+    max_attempts: int,
+    backoff_base_seconds: float,
+    backoff_max_seconds: float,
+    circuit_breaker: CircuitBreaker,
+    hedge_after_seconds: float = 0,
+  ):
+    self.max_attempts = max(1, max_attempts)
+    self.backoff_base_seconds = backoff_base_seconds
+    self.backoff_max_seconds = backoff_max_seconds
+    self.circuit_breaker = circuit_breaker
+    self.hedge_after_seconds = hedge_after_seconds
+    self.stats = LLMCallStats()
+
+  async def call(
+    self,
+    send: Callable[[], Awaitable[T]],
+    before_send: Callable[[], Awaitable[None]] | None = None,
+  ) -> T:
+    """
+    Calls `send` until it succeeds, a non-retryable error is raised, or attempts run out.
+
+    Args:
+      - send: Sends the request and parses its response, raising an `LLMCallError` on failure.
+        Other exceptions are raised as is, without retrying.
+      - before_send: Awaited before each request that is sent, retries and hedges included
+        (ie: to acquire a rate limit). Time spent in it does not count towards `hedge_after_seconds`.
+    """
+
+    self.stats.calls += 1
+
+    for attempt in range(self.max_attempts):
+      try:
+        self.circuit_breaker.before_call()
+      except LLMCallError as e:
+        self.stats.errors[e.type] += 1
+        raise
+
+      try:
+        result: T = await self._send_hedged(send, before_send)
+      except LLMCallError as e:
+        self.stats.errors[e.type] += 1
+        if e.type in PROVIDER_UP_ERROR_TYPES:
+          self.circuit_breaker.record_success()
+        else:
+          self.circuit_breaker.record_failure()
+
+        if not e.retryable or attempt + 1 >= self.max_attempts:
+          raise
+        if e.retry_after is not None and e.retry_after > self.backoff_max_seconds:
+          raise
+
+        delay: float = random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt))
+        if e.retry_after is not None:
+          delay = max(delay, e.retry_after)
+
+        logging.warning(f"LLM call failed ({e.type.value}), retrying in {delay:.2f}s | {str(e)}")
+        self.stats.retries += 1
+        await asyncio.sleep(delay)
+        continue
+
+      self.circuit_breaker.record_success()
+      self.stats.successes += 1
+      return result
+
+  async def _send_hedged(
+    self,
+    send: Callable[[], Awaitable[T]],
+    before_send: Callable[[], Awaitable[None]] | None,
+  ) -> T:
+    async def send_hedge() -> T:
+      if before_send is not None:
+        await before_send()
+      return await send()
+
+    if before_send is not None:
+      await before_send()
+    if self.hedge_after_seconds <= 0:
+      return await send()
+
+    first: asyncio.Task = asyncio.ensure_future(send())
+    pending: set[asyncio.Task] = {first}
+    try:
+      done, pending = await asyncio.wait(pending, timeout=self.hedge_after_seconds)
+      if done:
+        return first.result()
+
+      self.stats.hedges += 1
+      hedge: asyncio.Task = asyncio.ensure_future(send_hedge())
+      pending.add(hedge)
+
+      # The first answer wins, a failed request only counts once the other one failed too
+      failed: asyncio.Task | None = None
+      while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+          if task.exception() is None:
+            if task is hedge:
+              self.stats.hedge_wins += 1
+            return task.result()
+          failed = task
+
+      return failed.result()
+    finally:
+      for task in pending:
+        task.cancel()
@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+
+from lib.helpers.cache_stats import CacheStats
+from lib.models.role import RoleDetails
+
+from settings import role_cache_settings
+
+
+class RoleCacheStats(CacheStats):
+  def __init__(self):
+    super().__init__()
+    self.invalidations: int = 0
+
+  def __str__(self) -> str:
+    return f"{super().__str__()} invalidations={self.invalidations}"
+
+
+class RoleCache:
+  """
+  In-process LRU cache of role details, so that scoring a backlog of resumes for a role loads the role once.
+
+  Entries are invalidated by `RoleDBHelper.update` in this process. Updates made by other processes
+  are picked up once entries expire after `ttl_seconds`.
+  """
+
+  def __init__(
+    self,
+    max_entries: int,
+    ttl_seconds: float,
+    enabled: bool = True,
+  ):
+    self.max_entries = max_entries
+    self.ttl_seconds = ttl_seconds
+    self.enabled = enabled
+    self.stats = RoleCacheStats()
+    # Role ID -> (role details, monotonic time at which the entry expires)
+    self._entries: OrderedDict[str, tuple[RoleDetails, float]] = OrderedDict()
+
+  def get(self, id: str) -> RoleDetails | None:
+    """
+    Returns the cached details of the role, or None on a miss
+    """
+
+    if not self.enabled:
+      return None
+
+    entry = self._entries.get(id)
+    if entry is None or entry[1] <= time.monotonic():
+      self._entries.pop(id, None)
+      self.stats.misses += 1
+      return None
+
+    self._entries.move_to_end(id)
+    self.stats.hits += 1
+    return entry[0]
+
+  def put(self, role: RoleDetails) -> None:
+    if not self.enabled:
+      return
+
+    self._entries[role.id] = (role, time.monotonic() + self.ttl_seconds)
+    self._entries.move_to_end(role.id)
+    while len(self._entries) > self.max_entries:
+      self._entries.popitem(last=False)
+
+  def invalidate(self, id: str) -> None:
+    if self._entries.pop(id, None) is not None:
+      self.stats.invalidations += 1
+
+
+_role_cache: RoleCache | None = None
+
+
+def get_role_cache() -> RoleCache:
+  """
+  Returns the process-wide `RoleCache`, creating it from settings on first use
+  """
+
+  global _role_cache
+
+  if _role_cache is None:
+    _role_cache = RoleCache(
+      max_entries=role_cache_settings.MAX_ENTRIES,
+      ttl_seconds=role_cache_settings.TTL_SECONDS,
+      enabled=role_cache_settings.ENABLED,
+    )
+
+  return _role_cache
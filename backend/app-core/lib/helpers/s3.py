@@ -1,13 +1,32 @@
 import io
+import os
 import asyncio
+import logging
+import random
+import tempfile
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, BinaryIO
 
 import aioboto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
 from fastapi import UploadFile
 from pydantic import BaseModel
 
+from lib.helpers.document import DocumentSource
+from lib.helpers.s3_presign import S3Presigner
 from lib.helpers.ulid import generate_ulid
 from lib.models.s3 import UploadResourceType
 
+from settings import s3_settings
+
 
 class UploadFileResult(BaseModel):
     file: UploadFile
@@ -25,6 +44,48 @@ class GeneratePresignedPOSTURLResponseModel(BaseModel):
     fields: dict
 
 
+class DownloadedDocument:
+    """
+    A document downloaded from the S3 bucket, ready to be passed to `DocumentExtractor.extract`.
+
+    source: The bytes of the document, or the path of a temporary file holding it when it is larger than the spool threshold
+    content_type: The content type the document was uploaded with, if any
+    size: The size of the document in bytes
+    """
+
+    def __init__(
+        self,
+        source: DocumentSource,
+        content_type: str | None,
+        size: int,
+    ):
+        self.source = source
+        self.content_type = content_type
+        self.size = size
+
+
+# S3 error codes worth retrying, as they indicate throttling or a temporary service issue
+TRANSIENT_S3_ERROR_CODES = [
+    "SlowDown",
+    "RequestTimeout",
+    "RequestTimeTooSkewed",
+    "InternalError",
+    "ServiceUnavailable",
+    "500",
+    "503",
+]
+
+
+def is_transient_s3_error(e: Exception) -> bool:
+    if isinstance(e, (ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError)):
+        return True
+
+    if isinstance(e, ClientError):
+        return e.response.get("Error", {}).get("Code") in TRANSIENT_S3_ERROR_CODES
+
+    return False
+
+
 class S3Handler:
     def __init__(
         self,
@@ -32,11 +93,47 @@ class S3Handler:
         aws_secret_access_key: str,
         aws_region_name: str,
         s3_bucket_name: str,
+        endpoint_url: str | None = None,
+        max_concurrency: int = 8,
+        max_attempts: int = 4,
+        multipart_threshold_bytes: int = 16 * 1024 * 1024,
+        multipart_chunksize_bytes: int = 8 * 1024 * 1024,
+        multipart_concurrency: int = 4,
+        presign_cache_enabled: bool = False,
+        presign_cache_margin_seconds: int = 300,
     ):
+        """
+        Args:
+          - endpoint_url: A custom S3 endpoint (ie: a local MinIO), defaults to AWS
+          - max_concurrency: The maximum number of concurrent S3 operations, which bounds the client's connection pool
+          - max_attempts: The maximum number of attempts for an operation failing with transient errors
+          - multipart_threshold_bytes: Files of at least this size are uploaded in parts
+          - multipart_chunksize_bytes: The size of each part of a multipart upload
+          - multipart_concurrency: The number of parts of a single file uploaded in parallel
+          - presign_cache_enabled: Whether presigned GET URLs are cached until shortly before they expire
+          - presign_cache_margin_seconds: How long before expiry a cached presigned URL stops being served
+        """
+
         self.aws_access_key_id = aws_access_key_id
         self.aws_secret_access_key = aws_secret_access_key
         self.aws_region_name = aws_region_name
         self.s3_bucket_name = s3_bucket_name
+        self.endpoint_url = endpoint_url
+        self.max_attempts = max_attempts
+        self.client_config = Config(
+            max_pool_connections=max_concurrency * multipart_concurrency,
+            # Retries are handled by `_call_with_retries`, with jitter
+            retries={"max_attempts": 0, "mode": "standard"},
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold_bytes,
+            multipart_chunksize=multipart_chunksize_bytes,
+            max_concurrency=multipart_concurrency,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = None
+        self._client_lock = asyncio.Lock()
+        self._exit_stack = AsyncExitStack()
         try:
             self.session = aioboto3.Session(
                 aws_access_key_id=aws_access_key_id,
@@ -46,6 +143,63 @@ class S3Handler:
         except Exception as e:
             raise Exception("Failed to create AWS S3 session") from e
 
+        self.presigner = S3Presigner(
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            aws_region_name=aws_region_name,
+            s3_bucket_name=s3_bucket_name,
+            endpoint_url=endpoint_url,
+            cache_enabled=presign_cache_enabled,
+            cache_margin_seconds=presign_cache_margin_seconds,
+        )
+
+    async def get_client(self):
+        """
+        Returns the long-lived S3 client of this handler, opening it on first use.
+        The client and its connection pool are shared by all operations until `close` is called.
+        """
+
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    self._client = await self._exit_stack.enter_async_context(
+                        self.session.client(
+                            "s3", endpoint_url=self.endpoint_url, config=self.client_config
+                        )
+                    )
+
+        return self._client
+
+    async def close(self) -> None:
+        """
+        Closes the S3 client and its connection pool
+        """
+
+        async with self._client_lock:
+            await self._exit_stack.aclose()
+            self._exit_stack = AsyncExitStack()
+            self._client = None
+
+    async def _call_with_retries(self, operation, *args, **kwargs):
+        """
+        Calls an S3 operation, bounded by the handler's concurrency limit, retrying transient errors
+        with exponential backoff and full jitter.
+        """
+
+        for attempt in range(self.max_attempts):
+            try:
+                async with self._semaphore:
+                    return await operation(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_attempts - 1 or not is_transient_s3_error(e):
+                    raise
+
+                delay = random.uniform(0, min(10, 0.2 * 2 ** attempt))
+                logging.warning(
+                    f"Transient S3 error, retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_attempts}) | {str(e)}"
+                )
+                await asyncio.sleep(delay)
+
     async def upload_file(
         self,
         upload_resource_type: UploadResourceType,
@@ -56,34 +210,78 @@ class S3Handler:
         Upload a file to the S3 bucket
         """
 
+        s3_object_key = await self.upload_fileobj(
+            upload_resource_type=upload_resource_type,
+            organization_id=organization_id,
+            fileobj=file.file,
+            filename=file.filename,
+            content_type=file.content_type,
+        )
+
+        return UploadFileResult(file=file, s3_object_key=s3_object_key)
+
+    async def upload_fileobj(
+        self,
+        upload_resource_type: UploadResourceType,
+        organization_id: str,
+        fileobj: BinaryIO,
+        filename: str | None = None,
+        content_type: str | None = None,
+    ) -> str:
+        """
+        Upload a binary file-like object to the S3 bucket.
+        The content type is stored with the object, so that it can be extracted again after download.
+
+        Returns:
+          - s3_object_key: The key the file was stored under
+        """
+
         ulid = generate_ulid()
 
         s3_object_key = f"{upload_resource_type}/{organization_id}/{ulid}"
 
-        async with self.session.client("s3") as s3:
-            try:
-                await s3.upload_fileobj(file.file, self.s3_bucket_name, s3_object_key)
-            except Exception as e:
-                raise Exception(
-                    f"Failed to upload the file {file.filename} to S3 bucket"
-                ) from e
+        s3 = await self.get_client()
 
-        return UploadFileResult(file=file, s3_object_key=s3_object_key)
+        async def upload() -> None:
+            # Rewind, in case of a retry after a partial upload
+            fileobj.seek(0)
+            await s3.upload_fileobj(
+                fileobj,
+                self.s3_bucket_name,
+                s3_object_key,
+                ExtraArgs={"ContentType": content_type} if content_type else None,
+                Config=self.transfer_config,
+            )
+
+        try:
+            await self._call_with_retries(upload)
+        except Exception as e:
+            raise Exception(
+                f"Failed to upload the file {filename} to S3 bucket"
+            ) from e
+
+        return s3_object_key
 
     async def batch_upload_files(
         self,
+        upload_resource_type: UploadResourceType,
         organization_id: str,
         files: list[UploadFile],
     ) -> list[UploadResult]:
         """
-        Upload a batch of files to the S3 bucket concurrently
+        Upload a batch of files to the S3 bucket concurrently.
+        Uploads share the handler's client, and at most `max_concurrency` of them run at once.
 
         Returns:
           - upload_results: A list of UploadResult showing the result of batch upload
         """
 
         tasks = [
-            self.upload_file(organization_id=organization_id, file=file)
+            self.upload_file(
+                upload_resource_type=upload_resource_type,
+                organization_id=organization_id,
+                file=file,
+            )
             for file in files
         ]
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -91,6 +289,7 @@ class S3Handler:
         upload_results = []
         for file, result in zip(files, results):
             if isinstance(result, Exception):
+                logging.error(f"Failed to upload {file.filename} in batch | {str(result)}")
                 upload_results.append(
                     UploadResult(s3_object_key=None, file=file, success=False)
                 )
@@ -109,39 +308,149 @@ class S3Handler:
 
         return upload_results
 
-    async def download_file(self, s3_object_key: str) -> io.BytesIO:
-        async with self.session.client("s3") as s3:
+    async def iter_file_chunks(
+        self,
+        s3_object_key: str,
+        chunk_size: int = 1024 * 1024,
+    ) -> AsyncIterator[bytes]:
+        """
+        Streams a file from the S3 bucket in chunks of up to `chunk_size` bytes, without buffering the whole file.
+        NOTE: The stream holds one of the handler's concurrency slots until it is exhausted or closed.
+        """
+
+        s3 = await self.get_client()
+
+        async with self._semaphore:
             try:
-                bytes_io = io.BytesIO()
-                await s3.download_fileobj(
-                    Bucket=self.s3_bucket_name, Key=s3_object_key, Fileobj=bytes_io
-                )
-                bytes_io.seek(0)
+                response = await s3.get_object(Bucket=self.s3_bucket_name, Key=s3_object_key)
             except Exception as e:
-                raise Exception("Failed to download a file from S3 bucket") from e
+                raise Exception(f"Failed to download {s3_object_key} from S3 bucket") from e
+
+            body = response["Body"]
+            try:
+                async for chunk in body.iter_chunks(chunk_size):
+                    yield chunk
+            finally:
+                body.close()
+
+    @asynccontextmanager
+    async def open_document(
+        self,
+        s3_object_key: str,
+        spool_threshold_bytes: int = 8 * 1024 * 1024,
+        chunk_size: int = 1024 * 1024,
+    ) -> AsyncIterator[DownloadedDocument]:
+        """
+        Streams a document from the S3 bucket into a `DownloadedDocument` for extraction.
+
+        Documents up to `spool_threshold_bytes` are kept in memory. Larger documents are spooled to a temporary file
+        as they stream in, and the path is handed to the extractor, so a single document never holds more than
+        `spool_threshold_bytes` of memory. The temporary file is removed when the context exits.
+        """
+
+        s3 = await self.get_client()
+
+        # Runs under the handler's concurrency limit, see `_call_with_retries`
+        async def download() -> DownloadedDocument:
+            response = await s3.get_object(Bucket=self.s3_bucket_name, Key=s3_object_key)
+
+            buffer = bytearray()
+            spool_file = None
+            size = 0
+            body = response["Body"]
+            try:
+                async for chunk in body.iter_chunks(chunk_size):
+                    size += len(chunk)
+                    if spool_file is None and size > spool_threshold_bytes:
+                        spool_file = tempfile.NamedTemporaryFile(delete=False)
+                        await asyncio.to_thread(spool_file.write, buffer)
+                        buffer = bytearray()
+
+                    if spool_file is None:
+                        buffer += chunk
+                    else:
+                        await asyncio.to_thread(spool_file.write, chunk)
+            except BaseException:
+                if spool_file is not None:
+                    spool_file.close()
+                    os.remove(spool_file.name)
+                raise
+            finally:
+                body.close()
+
+            if spool_file is not None:
+                spool_file.close()
+                source = spool_file.name
+            else:
+                source = bytes(buffer)
+
+            return DownloadedDocument(
+                source=source,
+                content_type=response.get("ContentType"),
+                size=size,
+            )
+
+        try:
+            document = await self._call_with_retries(download)
+        except Exception as e:
+            raise Exception(f"Failed to download {s3_object_key} from S3 bucket") from e
+
+        try:
+            yield document
+        finally:
+            if isinstance(document.source, str):
+                os.remove(document.source)
+
+    async def download_file(self, s3_object_key: str) -> io.BytesIO:
+        s3 = await self.get_client()
+
+        async def download() -> io.BytesIO:
+            bytes_io = io.BytesIO()
+            await s3.download_fileobj(
+                Bucket=self.s3_bucket_name, Key=s3_object_key, Fileobj=bytes_io
+            )
+            bytes_io.seek(0)
+            return bytes_io
+
+        try:
+            bytes_io = await self._call_with_retries(download)
+        except Exception as e:
+            raise Exception("Failed to download a file from S3 bucket") from e
 
         return bytes_io
 
+    async def delete_file(self, s3_object_key: str) -> None:
+        s3 = await self.get_client()
+
+        async def delete() -> None:
+            await s3.delete_object(Bucket=self.s3_bucket_name, Key=s3_object_key)
+
+        try:
+            await self._call_with_retries(delete)
+        except Exception as e:
+            raise Exception("Failed to delete a file from S3 bucket") from e
+
     async def generate_presigned_GET_URL(
         self, s3_object_key: str, expiration: int = 3600
     ) -> str:
         """
-        Generate a presigned GET URL to the S3 bucket
+        Generate a presigned GET URL to the S3 bucket.
+        The URL is signed locally, without any request to S3.
         """
 
-        async with self.session.client("s3") as s3:
-            try:
-                url = await s3.generate_presigned_url(
-                    "get_object",
-                    Params={"Bucket": self.s3_bucket_name, "Key": s3_object_key},
-                    ExpiresIn=expiration,
-                )
-            except Exception as e:
-                raise Exception(
-                    f"Failed to generate presigned GET URL for {s3_object_key}"
-                ) from e
+        return self.presigner.generate_presigned_GET_URL(s3_object_key, expiration)
+
+    async def generate_presigned_GET_URLs(
+        self, s3_object_keys: list[str], expiration: int = 3600
+    ) -> dict[str, str]:
+        """
+        Generate presigned GET URLs for a list of objects in the S3 bucket, in one call.
+
+        Returns:
+          - urls: The presigned GET URL of each object, by S3 object key
+        """
 
-        return url
+        return self.presigner.generate_presigned_GET_URLs(s3_object_keys, expiration)
 
     async def generate_presigned_POST_URL(
         self,
@@ -155,23 +464,54 @@ class S3Handler:
           - response: consists of "url" and "fields" for submitting a post request.
         """
 
-        async with self.session.client("s3") as s3:
-            try:
-                response = await s3.generate_presigned_post(
-                    self.s3_bucket_name,
-                    s3_object_key,
-                    ExpiresIn=expiration,
-                )
-            except Exception as e:
-                raise Exception(
-                    f"Failed to generated presigned POST URL for {s3_object_key}"
-                ) from e
+        response: dict = self.presigner.generate_presigned_POST(s3_object_key, expiration)
 
-            url = response.get("url")
-            fields = response.get("fields")
-            if url is None or fields is None:
-                raise Exception(
-                    "S3 generate presigned post does not contain all expected fields"
-                )
+        url = response.get("url")
+        fields = response.get("fields")
+        if url is None or fields is None:
+            raise Exception(
+                "S3 generate presigned post does not contain all expected fields"
+            )
 
         return GeneratePresignedPOSTURLResponseModel(url=url, fields=fields)
+
+
+_s3_handler: S3Handler | None = None
+
+
+def get_s3_handler() -> S3Handler:
+    """
+    Returns the process-wide `S3Handler`, creating it from settings on first use
+    """
+
+    global _s3_handler
+
+    if _s3_handler is None:
+        _s3_handler = S3Handler(
+            aws_access_key_id=s3_settings.ACCESS_KEY_ID,
+            aws_secret_access_key=s3_settings.SECRET_ACCESS_KEY,
+            aws_region_name=s3_settings.REGION_NAME,
+            s3_bucket_name=s3_settings.BUCKET_NAME,
+            endpoint_url=s3_settings.ENDPOINT_URL,
+            max_concurrency=s3_settings.MAX_CONCURRENCY,
+            max_attempts=s3_settings.MAX_ATTEMPTS,
+            multipart_threshold_bytes=s3_settings.MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            multipart_chunksize_bytes=s3_settings.MULTIPART_CHUNKSIZE_MB * 1024 * 1024,
+            multipart_concurrency=s3_settings.MULTIPART_CONCURRENCY,
+            presign_cache_enabled=s3_settings.PRESIGN_CACHE_ENABLED,
+            presign_cache_margin_seconds=s3_settings.PRESIGN_CACHE_MARGIN_SECONDS,
+        )
+
+    return _s3_handler
+
+
+async def close_s3_handler() -> None:
+    """
+    Closes the process-wide `S3Handler` if it was created
+    """
+
+    global _s3_handler
+
+    if _s3_handler is not None:
+        await _s3_handler.close()
+        _s3_handler = None
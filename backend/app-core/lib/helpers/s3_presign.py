@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+
+import botocore.session
+from botocore.config import Config
+
+
+class S3Presigner:
+    """
+    Signs S3 URLs locally, from the credentials it was created with.
+
+    Presigning is a pure computation (no request is sent to S3), so a single synchronous botocore client
+    is created once and reused for every signature, instead of setting up a client per URL.
+
+    Signed GET URLs can optionally be cached, and are served from the cache until `cache_margin_seconds`
+    before they expire, so that repeated listings of the same resumes return the same links.
+    """
+
+    def __init__(
+        self,
+        aws_access_key_id: str,
+        aws_secret_access_key: str,
+        aws_region_name: str,
+        s3_bucket_name: str,
+        endpoint_url: str | None = None,
+        cache_enabled: bool = False,
+        cache_margin_seconds: int = 300,
+        cache_max_entries: int = 10000,
+    ):
+        """
+        Args:
+          - endpoint_url: A custom S3 endpoint (ie: a local MinIO), defaults to AWS
+          - cache_enabled: Whether signed GET URLs are cached
+          - cache_margin_seconds: A cached URL is no longer served once it has less than this many seconds left
+          - cache_max_entries: The maximum number of cached URLs, least recently used URLs are evicted first
+        """
+
+        self.s3_bucket_name = s3_bucket_name
+        self.cache_enabled = cache_enabled
+        self.cache_margin_seconds = cache_margin_seconds
+        self.cache_max_entries = cache_max_entries
+        # (key, expiration) -> (url, monotonic time at which the URL expires)
+        self._cache: OrderedDict[tuple[str, int], tuple[str, float]] = OrderedDict()
+
+        try:
+            self.client = botocore.session.get_session().create_client(
+                "s3",
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                region_name=aws_region_name,
+                endpoint_url=endpoint_url,
+                config=Config(signature_version="s3v4"),
+            )
+        except Exception as e:
+            raise Exception("Failed to create S3 presigning client") from e
+
+    def generate_presigned_GET_URL(self, s3_object_key: str, expiration: int = 3600) -> str:
+        """
+        Generate a presigned GET URL to the S3 bucket
+        """
+
+        cache_key = (s3_object_key, expiration)
+        now = time.monotonic()
+
+        if self.cache_enabled:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                url, expires_at = cached
+                if expires_at - now > self.cache_margin_seconds:
+                    self._cache.move_to_end(cache_key)
+                    return url
+                del self._cache[cache_key]
+
+        try:
+            url: str = self.client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": self.s3_bucket_name, "Key": s3_object_key},
+                ExpiresIn=expiration,
+            )
+        except Exception as e:
+            raise Exception(
+                f"Failed to generate presigned GET URL for {s3_object_key}"
+            ) from e
+
+        if self.cache_enabled:
+            self._cache[cache_key] = (url, now + expiration)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+        return url
+
+    def generate_presigned_GET_URLs(
+        self,
+        s3_object_keys: list[str],
+        expiration: int = 3600,
+    ) -> dict[str, str]:
+        """
+        Generate presigned GET URLs for a list of objects in the S3 bucket
+
+        Returns:
+          - urls: The presigned GET URL of each object, by S3 object key
+        """
+
+        return {
+            s3_object_key: self.generate_presigned_GET_URL(s3_object_key, expiration)
+            for s3_object_key in dict.fromkeys(s3_object_keys)
+        }
+
+    def generate_presigned_POST(self, s3_object_key: str, expiration: int = 3600) -> dict:
+        """
+        Generate a presigned POST response to the S3 bucket, consisting of "url" and "fields"
+        """
+
+        try:
+            return self.client.generate_presigned_post(
+                self.s3_bucket_name,
+                s3_object_key,
+                ExpiresIn=expiration,
+            )
+        except Exception as e:
+            raise Exception(
+                f"Failed to generated presigned POST URL for {s3_object_key}"
+            ) from e
@@ -1,10 +1,12 @@
 from docx import Document
 
-def extract_text_from_word(file_path: str) -> str:
+from lib.helpers.document import DocumentSource, open_document_source
+
+def extract_text_from_word(file: DocumentSource) -> str:
   """
-  Given the path to a DOCX file, extracts just the text from the file as a string.
+  Given a DOCX file (path, bytes, memoryview or binary file-like object), extracts just the text from the file as a string.
   """
 
-  doc = Document(file_path)
+  doc = Document(open_document_source(file))
   full_text = [para.text for para in doc.paragraphs]
   return '\n'.join(full_text)
@@ -19,3 +19,25 @@ class DBInsertResponse(BaseModel):
     id: str
     message: str
     number: int
+
+
+class DBPoolStatusResponse(BaseModel):
+    """
+    size: The number of connections the pool keeps open.
+    checked_out: The number of connections currently in use.
+    checked_in: The number of idle connections in the pool.
+    overflow: The number of connections currently open beyond `size`.
+    max_overflow: The maximum number of connections allowed beyond `size`.
+    checkouts: The number of connections checked out since the process started.
+    average_wait_seconds: The average time a checkout waited for a connection.
+    max_wait_seconds: The longest time a checkout waited for a connection.
+    """
+
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    max_overflow: int
+    checkouts: int
+    average_wait_seconds: float
+    max_wait_seconds: float
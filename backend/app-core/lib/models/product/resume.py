@@ -20,6 +20,17 @@ class StatusTypes(StrEnum):
   ASSESSED_UNFIT = 'assessed_unfit'
 
 
+# Statuses set by a reviewer, which automated processing must not overwrite
+REVIEWER_STATUSES = [StatusTypes.ASSESSED_FIT, StatusTypes.ASSESSED_HOLD, StatusTypes.ASSESSED_UNFIT]
+
+
+class IngestionStatusTypes(StrEnum):
+  PENDING = 'pending'
+  IN_PROGRESS = 'in_progress'
+  COMPLETE = 'complete'
+  FAILED = 'failed'
+
+
 class RoleTypes(StrEnum):
   # WARNING: DEPRECATED, USE `role_id` INSTEAD
   SENIOR_PRODUCT_ENGINEER = 'senior_product_engineer'
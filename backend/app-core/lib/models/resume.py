@@ -1,8 +1,55 @@
 from pydantic import BaseModel
 
+from lib.models.product.resume import IngestionStatusTypes
+
+
+class RegisterFailure(BaseModel):
+  """
+  filename: The name of the file that could not be registered.
+  detail: Why the file could not be registered.
+  """
+
+  filename: str | None
+  detail: str
+
+
+class RegisterDuplicate(BaseModel):
+  """
+  filename: The name of the file that was registered.
+  id: The ID of the resume registered for the file.
+  duplicate_of: The ID of a resume of the same role registered earlier from an identical file.
+  """
+
+  filename: str | None
+  id: str
+  duplicate_of: str
+
 
 class RegisterResponse(BaseModel):
   ids: list[str]
+  failures: list[RegisterFailure] = []
+  duplicates: list[RegisterDuplicate] = []
+
+
+class RegisterJobResponse(BaseModel):
+  job_id: str
+
+
+class RegisterJobDetails(BaseModel):
+  """
+  status: The status of the registration job.
+  total: The number of files submitted.
+  ids: The ids of the resumes registered so far.
+  failures: The files that failed to register so far.
+  duplicates: The files registered so far that are identical to a resume already registered for the role.
+  """
+
+  id: str
+  status: IngestionStatusTypes
+  total: int
+  ids: list[str]
+  failures: list[RegisterFailure]
+  duplicates: list[RegisterDuplicate] = []
 
 
 class ResumeDetails(BaseModel):
@@ -10,21 +57,37 @@ class ResumeDetails(BaseModel):
   base_requirement_satisfaction_score: How much the candidate satisfies the base requirements out of 100.
   exceptional_considerations: Any exceptional stand outs that may put the candidate for particular consideration.
   fitness_score: How fit the candidate is for the role out of 100.
+  download_url: A presigned URL to download the original resume file, when requested and available.
   """
 
   id: str
-  base_requirement_satisfaction_score: int
-  exceptional_considerations: str
-  fitness_score: int
+  base_requirement_satisfaction_score: int | None
+  exceptional_considerations: str | None
+  fitness_score: int | None
+  download_url: str | None = None
+
+
+class ResumeDetailsPage(BaseModel):
+  """
+  items: The resume details of the page.
+  next_cursor: The cursor to pass to fetch the next page, or None on the last page.
+  """
+
+  items: list[ResumeDetails]
+  next_cursor: str | None = None
 
 
 class ListClassifiedResponse(BaseModel):
   """
-  very_fit: Fitness score >= 75, candidate is very fit for the role
-  fit: 75 > Fitness score >= 40, candidate is fit for the role
-  not_fit: 40 > Fitness score, candidate is not the most fit for the role
+  very_fit: Fitness score >= CLASSIFIER_VERY_FIT_MIN_SCORE, candidate is very fit for the role
+  fit: CLASSIFIER_VERY_FIT_MIN_SCORE > Fitness score >= CLASSIFIER_FIT_MIN_SCORE, candidate is fit for the role
+  not_fit: CLASSIFIER_FIT_MIN_SCORE > Fitness score, candidate is not the most fit for the role
+  *_count: The total number of resumes in each bucket, including those beyond the per-bucket limit
   """
 
   very_fit: list[ResumeDetails]
   fit: list[ResumeDetails]
   not_fit: list[ResumeDetails]
+  very_fit_count: int = 0
+  fit_count: int = 0
+  not_fit_count: int = 0
@@ -8,3 +8,36 @@ class RoleDetails(BaseModel):
 
 class RegisterResponse(BaseModel):
   id: str
+
+
+class FitnessScoreHistogramBucket(BaseModel):
+  """
+  lower: The lowest fitness score of the bucket (inclusive).
+  upper: The highest fitness score of the bucket (exclusive, except for the last bucket which includes 100).
+  count: The number of resumes whose fitness score falls in the bucket.
+  """
+
+  lower: float
+  upper: float
+  count: int
+
+
+class RoleStats(BaseModel):
+  """
+  total: The number of resumes registered for the role.
+  status_counts: The number of resumes of each status.
+  classifier_counts: The number of scored resumes in each classifier bucket.
+  scored: The number of resumes with a fitness score.
+  average_fitness_score: The average fitness score of scored resumes.
+  average_base_requirement_satisfaction_score: The average base requirement satisfaction score of scored resumes.
+  fitness_score_histogram: The distribution of fitness scores, in equal-width buckets over 0-100.
+  """
+
+  role_id: str
+  total: int
+  status_counts: dict[str, int]
+  classifier_counts: dict[str, int]
+  scored: int
+  average_fitness_score: float | None
+  average_base_requirement_satisfaction_score: float | None
+  fitness_score_histogram: list[FitnessScoreHistogramBucket]
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from lib.helpers.compaction import CompactionResult, TextCompactor
+from lib.helpers.extraction import (
+    DOCX_CONTENT_TYPE,
+    PDF_CONTENT_TYPE,
+    get_document_extractor,
+    shutdown_document_extractor,
+)
+
+from settings import compaction_settings
+
+
+CONTENT_TYPES_BY_EXTENSION = {
+    ".pdf": PDF_CONTENT_TYPE,
+    ".docx": DOCX_CONTENT_TYPE,
+    ".md": "text/markdown",
+    ".txt": "text/plain",
+}
+
+
+async def benchmark_compaction(
+    corpus_dir: str,
+    max_tokens: int,
+    encoding_name: str,
+) -> None:
+    """
+    Extracts every resume of a corpus directory, compacts its text, and prints the tokens before and after
+    compaction for each resume and over the whole corpus. Prompt tokens drive both the cost and the latency
+    of scoring, so the total saved rate is the expected saving on the resume part of scoring prompts.
+    """
+
+    compactor = TextCompactor(max_tokens=max_tokens, encoding_name=encoding_name)
+    if compactor.tokenizer.encoding is None:
+        print(f"WARNING: Encoding {encoding_name} is unavailable, token counts are estimated")
+
+    filenames = sorted(
+        filename
+        for filename in os.listdir(corpus_dir)
+        if os.path.splitext(filename)[1].lower() in CONTENT_TYPES_BY_EXTENSION
+    )
+    compaction_seconds: float = 0
+
+    print(f"{'file':<40} {'original':>10} {'compacted':>10} {'saved':>8}")
+    try:
+        for filename in filenames:
+            path = os.path.join(corpus_dir, filename)
+            content_type = CONTENT_TYPES_BY_EXTENSION[os.path.splitext(filename)[1].lower()]
+
+            try:
+                extraction_result = await get_document_extractor().extract(
+                    source=path, content_type=content_type, filename=filename
+                )
+            except Exception as e:
+                print(f"{filename:<40} failed to extract | {str(e)}")
+                continue
+
+            started_at = time.perf_counter()
+            result: CompactionResult = compactor.compact(extraction_result.text)
+            compaction_seconds += time.perf_counter() - started_at
+
+            saved_rate = result.tokens_saved / result.original_tokens if result.original_tokens else 0.0
+            print(
+                f"{filename[:40]:<40} {result.original_tokens:>10} {result.compacted_tokens:>10} {saved_rate:>8.1%}"
+                + (" (truncated)" if result.is_truncated else "")
+            )
+    finally:
+        shutdown_document_extractor()
+
+    stats = compactor.stats
+    average_ms = compaction_seconds / stats.texts * 1000 if stats.texts else 0.0
+    print(f"\nTotal | {stats} | compaction {average_ms:.2f}ms/resume")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Reports the prompt tokens saved by compacting the text of a corpus of resumes."
+    )
+    parser.add_argument("corpus_dir", help="A directory of PDF, DOCX, Markdown or text resumes")
+    parser.add_argument(
+        "--max-tokens", type=int, default=compaction_settings.MAX_TOKENS, help="Token ceiling per resume"
+    )
+    parser.add_argument(
+        "--encoding", default=compaction_settings.TOKENIZER_ENCODING, help="tiktoken encoding to count tokens with"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(
+        benchmark_compaction(
+            corpus_dir=args.corpus_dir,
+            max_tokens=args.max_tokens,
+            encoding_name=args.encoding,
+        )
+    )
@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from sqlalchemy import Select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lib.helpers.db.resume import ResumeDBHelper
+from lib.models.product.resume import ClassifierTypes, StatusTypes
+
+from db.db import get_context_managed_session
+
+
+BENCHMARK_ID_PREFIX = "BENCH"
+BENCHMARK_ROLE_ID_PREFIX = "BENCHROLE"
+SEED_CHUNK_SIZE = 100000
+
+
+async def seed(
+    session: AsyncSession,
+    num_resumes: int,
+    num_roles: int,
+    content_size: int,
+) -> None:
+    """
+    Seeds `num_resumes` resumes spread evenly over `num_roles` roles, generated server-side with `generate_series`.
+    IDs sort like ULIDs. The newest 1% of resumes are the scoring backlog, as the work queue is drained oldest first:
+    PENDING, and 1 in 100 IN_PROGRESS with an expired lease. The rest are COMPLETE with fitness scores spread over 0-100.
+    """
+
+    await session.execute(
+        text(
+            "INSERT INTO role (id, name, description) "
+            "SELECT :prefix || g, 'Benchmark role ' || g, 'Benchmark role' FROM generate_series(0, CAST(:num_roles AS integer) - 1) g"
+        ),
+        {"prefix": BENCHMARK_ROLE_ID_PREFIX, "num_roles": num_roles},
+    )
+
+    for start in range(1, num_resumes + 1, SEED_CHUNK_SIZE):
+        end = min(start + SEED_CHUNK_SIZE - 1, num_resumes)
+        await session.execute(
+            text(
+                "INSERT INTO resume (id, role_id, status, content, fitness_score, lease_expires_at) "
+                "SELECT "
+                "  :id_prefix || lpad(g::text, 21, '0'), "
+                "  :role_id_prefix || (g % CAST(:num_roles AS integer)), "
+                "  CASE WHEN g <= CAST(:num_complete AS integer) THEN :complete "
+                "    WHEN g % 100 = 1 THEN :in_progress ELSE :pending END, "
+                "  repeat('x', CAST(:content_size AS integer)), "
+                "  CASE WHEN g <= CAST(:num_complete AS integer) THEN (CAST(g AS bigint) * 7919) % 101 END, "
+                "  CASE WHEN g > CAST(:num_complete AS integer) AND g % 100 = 1 THEN now() - interval '1 hour' END "
+                "FROM generate_series(CAST(:start AS integer), CAST(:end AS integer)) g"
+            ),
+            {
+                "id_prefix": BENCHMARK_ID_PREFIX,
+                "role_id_prefix": BENCHMARK_ROLE_ID_PREFIX,
+                "num_roles": num_roles,
+                "num_complete": num_resumes - num_resumes // 100,
+                "pending": StatusTypes.PENDING.value,
+                "in_progress": StatusTypes.IN_PROGRESS.value,
+                "complete": StatusTypes.COMPLETE.value,
+                "content_size": content_size,
+                "start": start,
+                "end": end,
+            },
+        )
+        await session.commit()
+        logging.info(f"Seeded {end}/{num_resumes} resumes")
+
+    await session.execute(text("ANALYZE role"))
+    await session.execute(text("ANALYZE resume"))
+    await session.commit()
+
+
+async def cleanup(session: AsyncSession) -> None:
+    await session.execute(
+        text("DELETE FROM resume WHERE role_id LIKE :prefix || '%'"),
+        {"prefix": BENCHMARK_ROLE_ID_PREFIX},
+    )
+    await session.execute(
+        text("DELETE FROM role WHERE id LIKE :prefix || '%'"),
+        {"prefix": BENCHMARK_ROLE_ID_PREFIX},
+    )
+    await session.commit()
+
+
+async def benchmark_query(
+    session: AsyncSession,
+    name: str,
+    stmt: Select,
+    runs: int,
+) -> None:
+    """
+    Prints the plan of a statement (EXPLAIN ANALYZE, BUFFERS) and its p50/p95 latency over `runs` executions.
+    Every execution is rolled back, so that locking statements leave no trace.
+    """
+
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+    result = await session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))
+    plan = "\n".join(f"    {row[0]}" for row in result)
+    await session.rollback()
+
+    latencies_ms: list[float] = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        result = await session.execute(stmt)
+        result.all()
+        latencies_ms.append((time.perf_counter() - started_at) * 1000)
+        await session.rollback()
+
+    latencies_ms.sort()
+    p50 = statistics.median(latencies_ms)
+    p95 = latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.95))]
+
+    print(f"\n== {name} | p50={p50:.2f}ms p95={p95:.2f}ms ({runs} runs)\n  {sql}\n{plan}")
+
+
+async def benchmark_resume_queries(
+    num_resumes: int,
+    num_roles: int,
+    content_size: int,
+    runs: int,
+    page_size: int,
+    keep: bool,
+) -> None:
+    """
+    Seeds resumes, then benchmarks the resume queries the API and the scoring workers run:
+    listing by role and status (first page and a deep keyset page), listing by classifier, and claiming work.
+    """
+
+    role_id = f"{BENCHMARK_ROLE_ID_PREFIX}0"
+    # A cursor about half way through the role's resumes
+    deep_cursor = f"{BENCHMARK_ID_PREFIX}{num_resumes // 2:021d}"
+
+    queries: list[tuple[str, Select]] = [
+        (
+            "list_by_filters: role, first page",
+            ResumeDBHelper.build_select_by_filters(role_id=role_id, limit=page_size + 1),
+        ),
+        (
+            "list_by_filters: role + status, deep page",
+            ResumeDBHelper.build_select_by_filters(
+                role_id=role_id, status=StatusTypes.COMPLETE, after_id=deep_cursor, limit=page_size + 1
+            ),
+        ),
+        (
+            "list_by_filters: role + classifier very_fit",
+            ResumeDBHelper.build_select_by_filters(
+                role_id=role_id, classifier=ClassifierTypes.VERY_FIT, limit=page_size + 1
+            ),
+        ),
+        (
+            "claim_pending: claimable IDs",
+            ResumeDBHelper.build_select_claimable_ids(limit=10),
+        ),
+    ]
+
+    async with get_context_managed_session() as session:
+        await cleanup(session)
+
+        started_at = time.perf_counter()
+        await seed(session, num_resumes=num_resumes, num_roles=num_roles, content_size=content_size)
+        print(f"Seeded {num_resumes} resumes over {num_roles} roles in {time.perf_counter() - started_at:.1f}s")
+
+        try:
+            for name, stmt in queries:
+                await benchmark_query(session, name=name, stmt=stmt, runs=runs)
+        finally:
+            if not keep:
+                await cleanup(session)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmarks resume listing and work queue queries against seeded data. "
+        "Run against a disposable database, as seeding takes a while and bloats the resume table."
+    )
+    parser.add_argument("--num-resumes", type=int, default=1000000, help="Number of resumes to seed")
+    parser.add_argument("--num-roles", type=int, default=10, help="Number of roles the resumes are spread over")
+    parser.add_argument("--content-size", type=int, default=2000, help="Characters of content per resume")
+    parser.add_argument("--runs", type=int, default=20, help="Executions per query")
+    parser.add_argument("--page-size", type=int, default=50, help="Page size of listing queries")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded data")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(
+        benchmark_resume_queries(
+            num_resumes=args.num_resumes,
+            num_roles=args.num_roles,
+            content_size=args.content_size,
+            runs=args.runs,
+            page_size=args.page_size,
+            keep=args.keep,
+        )
+    )
@@ -1,139 +1,840 @@
-# import logging
-
-# from lib.helpers.openai import OpenAIHelper
-# from lib.helpers.db.resume import ResumeDBHelper
-# from lib.helpers.db.role import RoleDBHelper
-# from lib.data.openai import TOOLS
-# from lib.models.product.resume import RoleTypes, StatusTypes
-
-# from db.db import get_context_managed_session
-# from db.models import Resume, Role
-
-# from settings import open_api_settings
-
-
-# async def process_resumes() -> list[str]:
-#     """
-#     Processes resumes of status PENDING by using OpenAI for
-#     assessment based on preset data in `app-core/lib/data/openai.py`.
-
-#     TODO: Add `created_at` in `Resume` model and process from oldest resume
-#     TODO: Make `max_num_resumes` controllable
-
-#     Returns:
-#       - list[str]: The IDs of resumes that were processed
-#     """
-
-#     processed_resume_ids: list[str] = []
-
-#     async with get_context_managed_session() as session:
-#         resumes: list[Resume] = await ResumeDBHelper.select_by_filters(
-#             session=session,
-#             status=StatusTypes.PENDING,
-#         )
-
-#         resume_ids: list[str] = [resume.id for resume in resumes]
-
-#         try:
-#             await ResumeDBHelper.bulk_update_status(
-#                 session=session, ids=resume_ids, status=StatusTypes.IN_PROGRESS
-#             )
-#         except Exception as e:
-#             await ResumeDBHelper.bulk_update_status(
-#                 session=session, ids=resume_ids, status=StatusTypes.FAILED
-#             )
-#             raise Exception(
-#                 f"Failed to set target resumes in status IN_PROGRESS | {str(e)}"
-#             )
-
-#         for resume in resumes:
-#             resume_id: str = resume.id
-#             resume_content: str = resume.content
-#             resume_role_id: str = resume.role_id
-
-#             try:
-#                 resume_role: Role = await RoleDBHelper.get_role(
-#                     session=session, id=resume_role_id
-#                 )
-#             except Exception as e:
-#                 await ResumeDBHelper.update_status(
-#                     session=session, id=resume_id, status=StatusTypes.FAILED
-#                 )
-#                 logging.error(
-#                     f"Could not find associated role for the resume | {str(e)}"
-#                 )
-#                 continue
-
-#             role_description: str = resume_role.description
-
-#             try:
-#                 openai_helper: OpenAIHelper = OpenAIHelper(
-#                     api_key=open_api_settings.API_KEY,
-#                     organization_id=open_api_settings.ORGANIZATION_ID,
-#                 )
-
-#                 # Process resume through OpenAI
-#                 resume_data = openai_helper.function_call_prompt(
-#                     user_msg=f"Here is the resume text: {str(resume_content)}",
-#                     system_msg=f"""
-#             You are a copilot assisting a hiring manager review resumes.
-#             Here is the job description:
-#             {role_description}
-#           """,
-#                     tools=[TOOLS[RoleTypes.SENIOR_PRODUCT_ENGINEER]],
-#                 )
-#             except Exception as e:
-#                 await ResumeDBHelper.update_status(
-#                     session=session, id=resume_id, status=StatusTypes.FAILED
-#                 )
-#                 logging.error(f"Failed to assess resume using OpenAI | {str(e)}")
-#                 continue
-
-#             try:
-#                 base_requirement_satisfaction_score: int = resume_data[
-#                     "base_requirement_satisfaction_score"
-#                 ]
-#                 exceptionals: str = resume_data["exceptionals"]
-#                 fitness_score: int = resume_data["fitness_score"]
-#             except Exception as e:
-#                 await ResumeDBHelper.update_status(
-#                     session=session, id=resume_id, status=StatusTypes.FAILED
-#                 )
-#                 logging.error(
-#                     f"Failed to parse assessment data from OpenAI response | {str(e)}"
-#                 )
-#                 continue
-
-#             try:
-#                 await ResumeDBHelper.update(
-#                     session=session,
-#                     id=resume_id,
-#                     base_requirement_satisfaction_score=base_requirement_satisfaction_score,
-#                     exceptional_considerations=exceptionals,
-#                     fitness_score=fitness_score,
-#                 )
-#             except Exception as e:
-#                 await ResumeDBHelper.update_status(
-#                     session=session, id=resume_id, status=StatusTypes.FAILED
-#                 )
-#                 logging.error(
-#                     f"Failed to update resume information using OpenAI response | {str(e)}"
-#                 )
-#                 continue
-
-#             try:
-#                 await ResumeDBHelper.update_status(
-#                     session=session, id=resume_id, status=StatusTypes.COMPLETE
-#                 )
-#             except Exception as e:
-#                 await ResumeDBHelper.update_status(
-#                     session=session, id=resume_id, status=StatusTypes.FAILED
-#                 )
-#                 logging.error(
-#                     f"Failed to update status of new resume to COMPLETE | {str(e)}"
-#                 )
-#                 continue
-
-#             processed_resume_ids.append(resume_id)
-
-#         return processed_resume_ids
+import asyncio
+import logging
+import os
+import socket
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lib.helpers.openai import AsyncOpenAIHelper, get_async_openai_helper
+from lib.helpers.assessment_cache import (
+    AssessmentCache,
+    build_assessment_cache_key,
+    get_assessment_cache,
+)
+from lib.helpers.compaction import CompactionResult, get_text_compactor
+from lib.helpers.db.resume import ResumeDBHelper
+from lib.helpers.db.role import RoleDBHelper
+from lib.helpers.rate_limit import RateLimiter, estimate_tokens
+from lib.helpers.resilience import LLMCallError, LLMErrorTypes
+from lib.helpers.role_cache import get_role_cache
+from lib.helpers.ulid import generate_ulid
+from lib.data.openai import MULTI_RESUME_TOOLS, TOOLS
+from lib.models.product.resume import RoleTypes, StatusTypes
+from lib.models.role import RoleDetails
+
+from db.db import get_context_managed_session
+from db.models import Resume
+
+from settings import scoring_settings
+
+
+async def process_resumes(
+    concurrency: int | None = None,
+    requests_per_minute: int | None = None,
+    tokens_per_minute: int | None = None,
+    max_num_resumes: int | None = None,
+    stop_event: asyncio.Event | None = None,
+) -> list[str]:
+    """
+    Processes resumes of status PENDING by using OpenAI for
+    assessment based on preset data in `app-core/lib/data/openai.py`.
+
+    Resumes are claimed from the DB work queue in batches, oldest first, under a lease that is
+    kept alive by a heartbeat while they are processed. Any number of runners can therefore
+    process resumes side by side, and resumes of a runner that dies are reclaimed once their lease expires.
+
+    Resumes are scored by a pool of `concurrency` workers that share a rate limiter,
+    so the OpenAI requests-per-minute and tokens-per-minute budgets are never exceeded.
+    Assessments already in the assessment cache are applied without calling OpenAI.
+    Resume text is compacted before scoring (see `TextCompactor`), and the tokens saved are logged.
+
+    Each claimed batch is scored grouped by role, and roles are loaded through the process-wide `RoleCache`,
+    so a backlog for one role loads the role once. Prompts start with the role, so that consecutive requests
+    for a role share a prompt prefix that OpenAI serves from its prompt cache.
+
+    OpenAI calls are retried on transient failures. Resumes whose assessment still fails transiently are deferred
+    and reclaimed after `SCORING_RETRY_DELAY_SECONDS` instead of FAILED, and no more resumes are claimed
+    while the OpenAI circuit breaker is open.
+
+    When `SCORING_MULTI_RESUME_ENABLED` is set, consecutive short resumes of a role are packed into a single
+    request (see `process_resume_pack`), so the role's prompt and a round trip are paid once per pack.
+
+    Args:
+      - concurrency: The number of resumes scored in parallel. Defaults to `SCORING_CONCURRENCY`.
+      - requests_per_minute: The OpenAI request budget. Defaults to `SCORING_REQUESTS_PER_MINUTE`.
+      - tokens_per_minute: The OpenAI token budget. Defaults to `SCORING_TOKENS_PER_MINUTE`.
+      - max_num_resumes: The maximum number of resumes to claim. Defaults to all claimable resumes.
+      - stop_event: When set, no more resumes are claimed or started, and claimed resumes
+        that were not started yet are released back to PENDING. Used for graceful shutdown.
+
+    Returns:
+      - list[str]: The IDs of resumes that were processed
+    """
+
+    concurrency = concurrency or scoring_settings.CONCURRENCY
+    rate_limiter: RateLimiter = RateLimiter(
+        requests_per_minute=requests_per_minute or scoring_settings.REQUESTS_PER_MINUTE,
+        tokens_per_minute=tokens_per_minute or scoring_settings.TOKENS_PER_MINUTE,
+    )
+    openai_helper: AsyncOpenAIHelper = get_async_openai_helper()
+    assessment_cache: AssessmentCache = get_assessment_cache()
+
+    worker_id: str = generate_worker_id()
+    claim_batch_size: int = scoring_settings.CLAIM_BATCH_SIZE
+    lease_seconds: int = scoring_settings.LEASE_SECONDS
+
+    # Bounded, so that resumes are only claimed shortly before a worker is free to process them
+    queue: asyncio.Queue[list[Resume] | None] = asyncio.Queue(maxsize=claim_batch_size)
+    pack_stats: ResumePackStats = ResumePackStats()
+    in_flight_resume_ids: set[str] = set()
+    processed_resume_ids: list[str] = []
+    released_resume_ids: list[str] = []
+    num_claimed: int = 0
+    started_at: float = time.monotonic()
+
+    async def claim() -> None:
+        nonlocal num_claimed
+
+        async with get_context_managed_session() as claim_session:
+            while max_num_resumes is None or num_claimed < max_num_resumes:
+                if stop_event is not None and stop_event.is_set():
+                    return
+
+                # Leave resumes in the queue while OpenAI is failing, rather than claiming them only to defer them
+                seconds_until_retry: float = openai_helper.circuit_breaker.seconds_until_retry()
+                if seconds_until_retry > 0:
+                    logging.warning(f"OpenAI circuit is open, pausing claims for {seconds_until_retry:.1f}s")
+                    await sleep_unless_stopped(seconds_until_retry, stop_event)
+                    continue
+
+                limit: int = claim_batch_size
+                if max_num_resumes is not None:
+                    limit = min(limit, max_num_resumes - num_claimed)
+
+                resumes: list[Resume] = await claim_pending_resumes(
+                    session=claim_session,
+                    worker_id=worker_id,
+                    limit=limit,
+                    lease_seconds=lease_seconds,
+                )
+                if not resumes:
+                    return
+
+                num_claimed += len(resumes)
+                # Group by role, so that requests sharing a prompt prefix are sent back to back
+                resumes.sort(key=lambda resume: (resume.role_id, resume.id))
+                in_flight_resume_ids.update(resume.id for resume in resumes)
+                for pack in build_resume_packs(resumes):
+                    await queue.put(pack)
+
+    async def producer() -> None:
+        await claim()
+
+        # Not sent when claiming fails, as the workers are then cancelled rather than drained
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker() -> None:
+        # AsyncSession is not safe for concurrent use, so each worker holds its own
+        async with get_context_managed_session() as worker_session:
+            while True:
+                pack: list[Resume] | None = await queue.get()
+                if pack is None:
+                    return
+
+                pack_ids: list[str] = [resume.id for resume in pack]
+                if stop_event is not None and stop_event.is_set():
+                    released_resume_ids.extend(pack_ids)
+                    in_flight_resume_ids.difference_update(pack_ids)
+                    continue
+
+                try:
+                    if len(pack) == 1:
+                        if await process_resume(
+                            session=worker_session,
+                            resume=pack[0],
+                            openai_helper=openai_helper,
+                            rate_limiter=rate_limiter,
+                            assessment_cache=assessment_cache,
+                            worker_id=worker_id,
+                        ):
+                            processed_resume_ids.append(pack[0].id)
+                    else:
+                        processed_resume_ids.extend(
+                            await process_resume_pack(
+                                session=worker_session,
+                                resumes=pack,
+                                openai_helper=openai_helper,
+                                rate_limiter=rate_limiter,
+                                assessment_cache=assessment_cache,
+                                pack_stats=pack_stats,
+                                worker_id=worker_id,
+                            )
+                        )
+                except Exception as e:
+                    # Only resumes of the pack that are still IN_PROGRESS under this worker's lease are released
+                    await worker_session.rollback()
+                    released_resume_ids.extend(pack_ids)
+                    logging.error(f"Failed to process {len(pack)} resume(s), releasing them | {str(e)}")
+
+                # Not in a `finally`, so that a pack whose worker is cancelled stays in flight and is released
+                in_flight_resume_ids.difference_update(pack_ids)
+
+    heartbeat_task: asyncio.Task = asyncio.create_task(
+        heartbeat_leases(resume_ids=in_flight_resume_ids, worker_id=worker_id, lease_seconds=lease_seconds)
+    )
+    try:
+        # A stage that fails cancels the others, rather than leaving them running unattended
+        async with asyncio.TaskGroup() as stages:
+            stages.create_task(producer())
+            for _ in range(concurrency):
+                stages.create_task(worker())
+    finally:
+        heartbeat_task.cancel()
+
+        # Resumes still in flight when a stage failed were neither processed nor given up
+        released_resume_ids.extend(in_flight_resume_ids)
+        if released_resume_ids:
+            async with get_context_managed_session() as session:
+                await ResumeDBHelper.release(
+                    session=session, ids=released_resume_ids, worker_id=worker_id
+                )
+            logging.info(f"Released {len(released_resume_ids)} claimed resumes back to PENDING")
+
+    elapsed: float = time.monotonic() - started_at
+    throughput: float = len(processed_resume_ids) / elapsed * 60 if elapsed > 0 else 0
+    logging.info(
+        f"Processed {len(processed_resume_ids)}/{num_claimed} resumes in {elapsed:.1f}s "
+        f"with {concurrency} workers | {throughput:.1f} resumes/min"
+    )
+    logging.info(f"Assessment cache | {assessment_cache.stats}")
+    logging.info(f"Role cache | {get_role_cache().stats}")
+    logging.info(f"Compaction | {get_text_compactor().stats}")
+    if pack_stats.packs:
+        logging.info(f"Multi-resume packs | {pack_stats}")
+    logging.info(f"OpenAI usage | {openai_helper.usage_stats}")
+    logging.info(f"OpenAI calls | {openai_helper.caller.stats}")
+
+    return processed_resume_ids
+
+
+async def sleep_unless_stopped(seconds: float, stop_event: asyncio.Event | None) -> None:
+    """
+    Sleeps for `seconds`, waking up early when `stop_event` is set.
+    """
+
+    if stop_event is None:
+        await asyncio.sleep(seconds)
+        return
+
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout=seconds)
+    except (TimeoutError, asyncio.TimeoutError):
+        pass
+
+
+def generate_worker_id() -> str:
+    """
+    Generates an ID identifying this runner as the owner of the leases it claims.
+    """
+
+    return f"{socket.gethostname()}:{os.getpid()}:{generate_ulid()}"
+
+
+async def claim_pending_resumes(
+    session: AsyncSession,
+    worker_id: str,
+    limit: int,
+    lease_seconds: int,
+) -> list[Resume]:
+    """
+    Claims a bounded batch of resumes from the work queue, setting them to IN_PROGRESS
+    under a lease owned by `worker_id`.
+
+    Returns:
+      - list[Resume]: The claimed resumes
+    """
+
+    try:
+        resumes: list[Resume] = await ResumeDBHelper.claim_pending(
+            session=session,
+            worker_id=worker_id,
+            limit=limit,
+            lease_seconds=lease_seconds,
+            max_attempts=scoring_settings.MAX_ATTEMPTS,
+        )
+    except Exception as e:
+        await session.rollback()
+        raise Exception(
+            f"Failed to claim pending resumes | {str(e)}"
+        )
+
+    return resumes
+
+
+ASSESSMENT_SYSTEM_MSG_TEMPLATE = """You are a copilot assisting a hiring manager review resumes.
+Here is the job description:
+{role_description}"""
+
+
+async def heartbeat_leases(
+    resume_ids: set[str],
+    worker_id: str,
+    lease_seconds: int,
+) -> None:
+    """
+    Extends the leases of claimed resumes every third of `lease_seconds`, until cancelled,
+    so that they are only reclaimed by another worker once this one stopped.
+
+    Args:
+      - resume_ids: The resumes to keep leased, read on each beat. Resumes removed from it are left to expire.
+    """
+
+    async with get_context_managed_session() as session:
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            try:
+                await ResumeDBHelper.extend_leases(
+                    session=session,
+                    ids=list(resume_ids),
+                    worker_id=worker_id,
+                    lease_seconds=lease_seconds,
+                )
+            except Exception as e:
+                await session.rollback()
+                logging.error(f"Failed to extend leases of claimed resumes | {str(e)}")
+
+
+def build_assessment_prompt(
+    resume_content: str,
+    role_description: str,
+) -> tuple[str, str]:
+    """
+    Builds the prompt used to assess a resume against a role.
+
+    The system message depends on the role only, and the resume comes last, so that every prompt for a role
+    starts with the same prefix (tools, then system message) and is eligible for OpenAI's prompt caching.
+
+    Returns:
+      - tuple[str, str]: The system message and the user message
+    """
+
+    system_msg: str = ASSESSMENT_SYSTEM_MSG_TEMPLATE.format(role_description=role_description)
+    user_msg: str = f"Here is the resume text: {str(resume_content)}"
+
+    return system_msg, user_msg
+
+
+class ResumePackStats:
+    """
+    Counts of multi-resume requests over a run.
+    fallbacks: Resumes of a pack that were assessed on their own, as their assessment was missing or invalid.
+    """
+
+    def __init__(self):
+        self.packs: int = 0
+        self.packed_resumes: int = 0
+        self.fallbacks: int = 0
+
+    def __str__(self) -> str:
+        return f"packs={self.packs} packed_resumes={self.packed_resumes} fallbacks={self.fallbacks}"
+
+
+def build_resume_packs(
+    resumes: list[Resume],
+    enabled: bool | None = None,
+    max_resumes: int | None = None,
+    max_resume_tokens: int | None = None,
+) -> list[list[Resume]]:
+    """
+    Splits resumes sorted by role into the units scored by a single request.
+    Consecutive resumes of a role under `max_resume_tokens` are packed together, up to `max_resumes` per pack.
+    Longer resumes, and every resume when packing is disabled, are scored on their own.
+
+    Args:
+      - enabled: Whether resumes are packed. Defaults to `SCORING_MULTI_RESUME_ENABLED`.
+      - max_resumes: Defaults to `SCORING_MULTI_RESUME_MAX_RESUMES`.
+      - max_resume_tokens: Defaults to `SCORING_MULTI_RESUME_MAX_RESUME_TOKENS`.
+        Checked against the uncompacted text, which is never shorter than the text that is sent.
+    """
+
+    enabled = scoring_settings.MULTI_RESUME_ENABLED if enabled is None else enabled
+    max_resumes = max_resumes or scoring_settings.MULTI_RESUME_MAX_RESUMES
+    max_resume_tokens = max_resume_tokens or scoring_settings.MULTI_RESUME_MAX_RESUME_TOKENS
+
+    if not enabled or max_resumes <= 1:
+        return [[resume] for resume in resumes]
+
+    packs: list[list[Resume]] = []
+    pack: list[Resume] = []
+    for resume in resumes:
+        if estimate_tokens(resume.content) > max_resume_tokens:
+            packs.append([resume])
+            continue
+
+        if pack and (pack[0].role_id != resume.role_id or len(pack) >= max_resumes):
+            packs.append(pack)
+            pack = []
+        pack.append(resume)
+
+    if pack:
+        packs.append(pack)
+
+    return packs
+
+
+def compact_resume_content(resume: Resume) -> CompactionResult:
+    """
+    Compacts the text of a resume before it is scored, and logs the tokens saved.
+    """
+
+    compaction_result: CompactionResult = get_text_compactor().compact(resume.content)
+    logging.info(
+        f"Compacted resume {resume.id} from {compaction_result.original_tokens} "
+        f"to {compaction_result.compacted_tokens} tokens ({compaction_result.tokens_saved} saved"
+        + (", truncated)" if compaction_result.is_truncated else ")")
+    )
+
+    return compaction_result
+
+
+def build_multi_resume_prompt(
+    resumes: dict[str, str],
+    role_description: str,
+) -> tuple[str, str]:
+    """
+    Builds the prompt used to assess several resumes against a role in a single request.
+    The system message is the same as for a single resume, so both share the role's prompt prefix.
+
+    Args:
+      - resumes: The (compacted) content of each resume, by resume ID
+
+    Returns:
+      - tuple[str, str]: The system message and the user message
+    """
+
+    system_msg: str = ASSESSMENT_SYSTEM_MSG_TEMPLATE.format(role_description=role_description)
+    user_msg: str = "Here are the resumes to assess, each one separately:\n\n" + "\n\n".join(
+        f'<resume id="{resume_id}">\n{resume_content}\n</resume>'
+        for resume_id, resume_content in resumes.items()
+    )
+
+    return system_msg, user_msg
+
+
+def is_valid_score(score) -> bool:
+    """
+    Whether a score of an assessment is an integer out of 100, as the assessment tools require.
+    """
+
+    return isinstance(score, int) and not isinstance(score, bool) and 0 <= score <= 100
+
+
+def parse_multi_resume_assessments(resume_data: dict, resume_ids: list[str]) -> dict[str, dict]:
+    """
+    Picks the assessment of each resume out of a multi-resume response.
+    Assessments with a missing field, an invalid score or an unknown resume ID are left out,
+    as are duplicate assessments of a resume.
+
+    Returns:
+      - dict[str, dict]: The assessment of each resume that has a valid one, by resume ID
+    """
+
+    assessments: dict[str, dict] = {}
+
+    items = resume_data.get("assessments") if isinstance(resume_data, dict) else None
+    if not isinstance(items, list):
+        return assessments
+
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+
+        resume_id = item.get("resume_id")
+        if resume_id not in resume_ids or resume_id in assessments:
+            continue
+
+        if not (
+            is_valid_score(item.get("base_requirement_satisfaction_score"))
+            and isinstance(item.get("exceptionals"), str)
+            and is_valid_score(item.get("fitness_score"))
+        ):
+            continue
+
+        assessments[resume_id] = {
+            "base_requirement_satisfaction_score": item["base_requirement_satisfaction_score"],
+            "exceptionals": item["exceptionals"],
+            "fitness_score": item["fitness_score"],
+        }
+
+    return assessments
+
+
+async def process_resume(
+    session: AsyncSession,
+    resume: Resume,
+    openai_helper: AsyncOpenAIHelper,
+    rate_limiter: RateLimiter,
+    assessment_cache: AssessmentCache,
+    worker_id: str,
+) -> bool:
+    """
+    Assesses a single IN_PROGRESS resume using OpenAI and stores the result.
+    On failure the resume is set to FAILED, or deferred when the failure is transient, and the error is logged.
+
+    Returns:
+      - bool: Whether the resume was processed successfully
+    """
+
+    resume_id: str = resume.id
+    resume_role_id: str = resume.role_id
+
+    try:
+        resume_role: RoleDetails = await RoleDBHelper.get_role_details(
+            session=session, id=resume_role_id
+        )
+    except Exception as e:
+        await session.rollback()
+        await fail_resumes(session=session, ids=[resume_id], worker_id=worker_id)
+        logging.error(
+            f"Could not find associated role for the resume | {str(e)}"
+        )
+        return False
+
+    return await assess_resume(
+        session=session,
+        resume_id=resume_id,
+        resume_role_id=resume_role_id,
+        role_description=resume_role.description,
+        compaction_result=compact_resume_content(resume),
+        openai_helper=openai_helper,
+        rate_limiter=rate_limiter,
+        assessment_cache=assessment_cache,
+        worker_id=worker_id,
+    )
+
+
+async def process_resume_pack(
+    session: AsyncSession,
+    resumes: list[Resume],
+    openai_helper: AsyncOpenAIHelper,
+    rate_limiter: RateLimiter,
+    assessment_cache: AssessmentCache,
+    pack_stats: ResumePackStats,
+    worker_id: str,
+) -> list[str]:
+    """
+    Assesses several IN_PROGRESS resumes of the same role with a single OpenAI request, and stores the results.
+    Assessments already in the assessment cache are applied first, and are not sent.
+    Resumes whose assessment is missing or invalid in the response, or every resume sent when the response
+    cannot be parsed, are assessed on their own (see `assess_resume`).
+    When the request fails, every resume sent is set to FAILED, or deferred when the failure is transient,
+    and the error is logged.
+
+    Returns:
+      - list[str]: The IDs of resumes that were processed successfully
+    """
+
+    resume_role_id: str = resumes[0].role_id
+    processed_resume_ids: list[str] = []
+
+    try:
+        resume_role: RoleDetails = await RoleDBHelper.get_role_details(
+            session=session, id=resume_role_id
+        )
+    except Exception as e:
+        await session.rollback()
+        await fail_resumes(session=session, ids=[resume.id for resume in resumes], worker_id=worker_id)
+        logging.error(
+            f"Could not find associated role for the resumes | {str(e)}"
+        )
+        return processed_resume_ids
+
+    role_description: str = resume_role.description
+    tools: list[dict[str]] = [TOOLS[RoleTypes.SENIOR_PRODUCT_ENGINEER]]
+
+    compaction_results: dict[str, CompactionResult] = {}
+    cache_keys: dict[str, str] = {}
+    for resume in resumes:
+        compaction_result: CompactionResult = compact_resume_content(resume)
+        cache_key: str = build_assessment_cache_key(
+            resume_text=compaction_result.text,
+            role_description=role_description,
+            model=openai_helper.model,
+            tools=tools,
+        )
+
+        resume_data = await assessment_cache.get(session=session, key=cache_key)
+        if resume_data is not None:
+            if await apply_assessment(
+                session=session, resume_id=resume.id, resume_data=resume_data, worker_id=worker_id
+            ):
+                processed_resume_ids.append(resume.id)
+            continue
+
+        compaction_results[resume.id] = compaction_result
+        cache_keys[resume.id] = cache_key
+
+    assessments: dict[str, dict] = {}
+    if len(compaction_results) > 1:
+        system_msg, user_msg = build_multi_resume_prompt(
+            resumes={resume_id: result.text for resume_id, result in compaction_results.items()},
+            role_description=role_description,
+        )
+
+        try:
+            resume_data = await openai_helper.function_call_prompt(
+                user_msg=user_msg,
+                system_msg=system_msg,
+                tools=[MULTI_RESUME_TOOLS[RoleTypes.SENIOR_PRODUCT_ENGINEER]],
+                prompt_cache_key=f"role:{resume_role_id}:multi",
+                rate_limiter=rate_limiter,
+                estimated_tokens=estimate_tokens(system_msg) + estimate_tokens(user_msg),
+            )
+        except LLMCallError as e:
+            # A malformed pack answer is not retried as a whole, each of its resumes is re-asked alone below
+            if e.type != LLMErrorTypes.PARSE:
+                await handle_assessment_failure(
+                    session=session, ids=list(compaction_results), worker_id=worker_id, error=e
+                )
+                return processed_resume_ids
+            resume_data = {}
+        except Exception as e:
+            await handle_assessment_failure(
+                session=session, ids=list(compaction_results), worker_id=worker_id, error=e
+            )
+            return processed_resume_ids
+
+        pack_stats.packs += 1
+        pack_stats.packed_resumes += len(compaction_results)
+        assessments = parse_multi_resume_assessments(resume_data, list(compaction_results))
+
+    for resume_id, compaction_result in compaction_results.items():
+        resume_data: dict | None = assessments.get(resume_id)
+
+        if resume_data is None:
+            if len(compaction_results) > 1:
+                pack_stats.fallbacks += 1
+                logging.warning(f"No valid assessment for resume {resume_id} in multi-resume response, assessing it alone")
+
+            is_processed: bool = await assess_resume(
+                session=session,
+                resume_id=resume_id,
+                resume_role_id=resume_role_id,
+                role_description=role_description,
+                compaction_result=compaction_result,
+                openai_helper=openai_helper,
+                rate_limiter=rate_limiter,
+                assessment_cache=assessment_cache,
+                worker_id=worker_id,
+            )
+        else:
+            is_processed = await apply_assessment(
+                session=session,
+                resume_id=resume_id,
+                resume_data=resume_data,
+                assessment_cache=assessment_cache,
+                cache_key=cache_keys[resume_id],
+                worker_id=worker_id,
+            )
+
+        if is_processed:
+            processed_resume_ids.append(resume_id)
+
+    return processed_resume_ids
+
+
+async def assess_resume(
+    session: AsyncSession,
+    resume_id: str,
+    resume_role_id: str,
+    role_description: str,
+    compaction_result: CompactionResult,
+    openai_helper: AsyncOpenAIHelper,
+    rate_limiter: RateLimiter,
+    assessment_cache: AssessmentCache,
+    worker_id: str,
+) -> bool:
+    """
+    Assesses the compacted text of a single IN_PROGRESS resume using OpenAI, unless its assessment is cached,
+    and stores the result.
+    On failure the resume is set to FAILED, or deferred when the failure is transient, and the error is logged.
+
+    Returns:
+      - bool: Whether the resume was processed successfully
+    """
+
+    system_msg, user_msg = build_assessment_prompt(
+        resume_content=compaction_result.text,
+        role_description=role_description,
+    )
+
+    tools: list[dict[str]] = [TOOLS[RoleTypes.SENIOR_PRODUCT_ENGINEER]]
+
+    cache_key: str = build_assessment_cache_key(
+        resume_text=compaction_result.text,
+        role_description=role_description,
+        model=openai_helper.model,
+        tools=tools,
+    )
+    resume_data = await assessment_cache.get(session=session, key=cache_key)
+    if resume_data is not None:
+        return await apply_assessment(
+            session=session, resume_id=resume_id, resume_data=resume_data, worker_id=worker_id
+        )
+
+    try:
+        # Process resume through OpenAI
+        resume_data = await openai_helper.function_call_prompt(
+            user_msg=user_msg,
+            system_msg=system_msg,
+            tools=tools,
+            prompt_cache_key=f"role:{resume_role_id}",
+            rate_limiter=rate_limiter,
+            estimated_tokens=estimate_tokens(system_msg) + compaction_result.compacted_tokens,
+        )
+    except Exception as e:
+        await handle_assessment_failure(
+            session=session, ids=[resume_id], worker_id=worker_id, error=e
+        )
+        return False
+
+    return await apply_assessment(
+        session=session,
+        resume_id=resume_id,
+        resume_data=resume_data,
+        assessment_cache=assessment_cache,
+        cache_key=cache_key,
+        worker_id=worker_id,
+    )
+
+
+async def handle_assessment_failure(
+    session: AsyncSession,
+    ids: list[str],
+    worker_id: str,
+    error: Exception,
+) -> None:
+    """
+    Defers resumes whose OpenAI call failed transiently (ie: OpenAI was down or rate limited throughout the retries),
+    so that they are reclaimed later (see `ResumeDBHelper.defer`), and sets the others to FAILED,
+    including resumes whose response could not be parsed.
+    """
+
+    if isinstance(error, LLMCallError) and error.retryable:
+        delay_seconds: float = max(error.retry_after or 0, scoring_settings.RETRY_DELAY_SECONDS)
+        try:
+            await ResumeDBHelper.defer(
+                session=session, ids=ids, worker_id=worker_id, delay_seconds=delay_seconds
+            )
+        except Exception as e:
+            # Their lease expires and they are reclaimed anyway, only later
+            await session.rollback()
+            logging.error(f"Failed to defer {len(ids)} resume(s) | {str(e)}")
+        logging.warning(
+            f"Failed to assess {len(ids)} resume(s) using OpenAI ({error.type.value}), "
+            f"retrying in {delay_seconds:.0f}s | {str(error)}"
+        )
+        return
+
+    await fail_resumes(session=session, ids=ids, worker_id=worker_id)
+    logging.error(f"Failed to assess {len(ids)} resume(s) using OpenAI | {str(error)}")
+
+
+async def fail_resumes(
+    session: AsyncSession,
+    ids: list[str],
+    worker_id: str,
+) -> None:
+    """
+    Sets IN_PROGRESS resumes leased by the worker to FAILED.
+    Resumes whose lease expired and was taken over by another worker are left alone, and logged.
+    A failure to set them is logged rather than raised, as their lease expires and they are reclaimed anyway.
+    """
+
+    try:
+        updated: int = await ResumeDBHelper.bulk_update_status(
+            session=session, ids=ids, status=StatusTypes.FAILED, worker_id=worker_id
+        )
+    except Exception as e:
+        await session.rollback()
+        logging.error(f"Failed to set {len(ids)} resume(s) to FAILED | {str(e)}")
+        return
+
+    if updated < len(ids):
+        logging.warning(
+            f"Lease lost on {len(ids) - updated}/{len(ids)} resume(s) before they could be set to FAILED, leaving them"
+        )
+
+
+async def apply_assessment(
+    session: AsyncSession,
+    resume_id: str,
+    resume_data: dict,
+    worker_id: str,
+    assessment_cache: AssessmentCache | None = None,
+    cache_key: str | None = None,
+) -> bool:
+    """
+    Stores an assessment on an IN_PROGRESS resume leased by the worker and sets it to COMPLETE.
+    A new assessment is also put into the assessment cache under `cache_key`.
+    On failure the resume is set to FAILED and the error is logged.
+    When the worker's lease expired and was taken over by another worker, nothing is written, and this is logged.
+
+    Returns:
+      - bool: Whether the resume was processed successfully
+    """
+
+    try:
+        base_requirement_satisfaction_score: int = resume_data[
+            "base_requirement_satisfaction_score"
+        ]
+        exceptionals: str = resume_data["exceptionals"]
+        fitness_score: int = resume_data["fitness_score"]
+    except Exception as e:
+        await session.rollback()
+        await fail_resumes(session=session, ids=[resume_id], worker_id=worker_id)
+        logging.error(
+            f"Failed to parse assessment data from OpenAI response | {str(e)}"
+        )
+        return False
+
+    if assessment_cache is not None and cache_key is not None:
+        await assessment_cache.put(session=session, key=cache_key, value=resume_data)
+
+    try:
+        is_updated: bool = await ResumeDBHelper.update(
+            session=session,
+            id=resume_id,
+            base_requirement_satisfaction_score=base_requirement_satisfaction_score,
+            exceptional_considerations=exceptionals,
+            fitness_score=fitness_score,
+            worker_id=worker_id,
+        )
+    except Exception as e:
+        await session.rollback()
+        await fail_resumes(session=session, ids=[resume_id], worker_id=worker_id)
+        logging.error(
+            f"Failed to update resume information using OpenAI response | {str(e)}"
+        )
+        return False
+
+    if is_updated:
+        try:
+            is_updated = await ResumeDBHelper.update_status(
+                session=session, id=resume_id, status=StatusTypes.COMPLETE, worker_id=worker_id
+            )
+        except Exception as e:
+            await session.rollback()
+            await fail_resumes(session=session, ids=[resume_id], worker_id=worker_id)
+            logging.error(
+                f"Failed to update status of new resume to COMPLETE | {str(e)}"
+            )
+            return False
+
+    if not is_updated:
+        logging.warning(f"Lease lost on resume {resume_id} before its assessment was stored, dropping it")
+        return False
+
+    return True
@@ -0,0 +1,326 @@
+import asyncio
+import logging
+
+from lib.helpers.openai import AsyncOpenAIHelper, get_async_openai_helper
+from lib.helpers.openai_batch import (
+    BATCH_MAX_REQUESTS,
+    BatchResults,
+    OpenAIBatchHelper,
+    chunk_batch_requests,
+)
+from lib.helpers.assessment_cache import (
+    AssessmentCache,
+    build_assessment_cache_key,
+    get_assessment_cache,
+)
+from lib.helpers.compaction import TextCompactor, get_text_compactor
+from lib.helpers.db.resume import ResumeDBHelper
+from lib.helpers.db.role import RoleDBHelper
+from lib.data.openai import TOOLS
+from lib.models.product.resume import RoleTypes, StatusTypes
+from lib.scripts.process_resumes import (
+    build_assessment_prompt,
+    claim_pending_resumes,
+    generate_worker_id,
+    heartbeat_leases,
+)
+
+from db.db import get_context_managed_session
+from db.models import Resume, Role
+
+from settings import scoring_settings
+
+
+def build_assessment_row(resume_id: str, resume_data: dict) -> dict:
+    """
+    Maps assessment data from OpenAI onto the columns of a COMPLETE resume.
+    """
+
+    return {
+        "id": resume_id,
+        "base_requirement_satisfaction_score": resume_data["base_requirement_satisfaction_score"],
+        "exceptional_considerations": resume_data["exceptionals"],
+        "fitness_score": resume_data["fitness_score"],
+        "status": StatusTypes.COMPLETE,
+        "lease_owner": None,
+        "lease_expires_at": None,
+    }
+
+
+async def run_batch(
+    batch_helper: OpenAIBatchHelper,
+    requests: list[dict],
+    worker_id: str,
+    poll_interval_seconds: float,
+    timeout_seconds: float,
+    leased_resume_ids: set[str] | None = None,
+) -> BatchResults | None:
+    """
+    Submits requests as a single batch job, waits for it to finish and fetches its results.
+    When the batch fails or times out, it is cancelled and its resumes are deferred (see `ResumeDBHelper.defer`),
+    so that they are claimed again later rather than failed for a transient provider issue.
+
+    Args:
+      - leased_resume_ids: The resumes kept leased by the heartbeat (see `heartbeat_leases`).
+        Deferred resumes are removed from it, so that their lease is not extended again.
+
+    Returns:
+      - BatchResults | None: The results of the batch, None when its resumes were deferred
+    """
+
+    batch_id: str | None = None
+    try:
+        batch_id = await batch_helper.submit(requests=requests)
+        logging.info(f"Submitted {len(requests)} resumes as OpenAI batch {batch_id}")
+
+        batch = await batch_helper.wait(
+            batch_id=batch_id,
+            poll_interval_seconds=poll_interval_seconds,
+            timeout_seconds=timeout_seconds,
+        )
+        return await batch_helper.fetch_results(batch=batch)
+    except Exception as e:
+        if batch_id is not None:
+            try:
+                await batch_helper.cancel(batch_id=batch_id)
+            except Exception as cancel_error:
+                logging.error(str(cancel_error))
+
+        resume_ids: list[str] = [request["custom_id"] for request in requests]
+        if leased_resume_ids is not None:
+            leased_resume_ids.difference_update(resume_ids)
+
+        async with get_context_managed_session() as session:
+            try:
+                await ResumeDBHelper.defer(
+                    session=session,
+                    ids=resume_ids,
+                    worker_id=worker_id,
+                    delay_seconds=scoring_settings.RETRY_DELAY_SECONDS,
+                )
+            except Exception as defer_error:
+                # Their lease is no longer extended, so they are reclaimed anyway once it expires
+                await session.rollback()
+                logging.error(f"Failed to defer {len(resume_ids)} resume(s) | {str(defer_error)}")
+        logging.error(
+            f"Failed to assess {len(requests)} resumes using OpenAI batch, "
+            f"retrying in {scoring_settings.RETRY_DELAY_SECONDS}s | {str(e)}"
+        )
+        return None
+
+
+async def process_resumes_batch(
+    poll_interval_seconds: float | None = None,
+    timeout_seconds: float | None = None,
+) -> list[str]:
+    """
+    Processes up to `BATCH_MAX_REQUESTS` resumes of status PENDING through the OpenAI Batch API,
+    split into as many batch jobs as needed to fit the limits of a batch input file (see `chunk_batch_requests`).
+    Intended for large backlogs with no latency requirement, as batch requests cost half as much.
+
+    Assessments already in the assessment cache are applied without being submitted.
+    Resume text is compacted before it is submitted (see `TextCompactor`).
+    Results are applied to the DB in bulk once the batches finish.
+    Resumes of a batch that fails or times out are deferred, to be retried later (see `run_batch`).
+    Claimed resumes are kept leased by a heartbeat while their batch runs, so a runner that dies
+    leaves them to be reclaimed after `SCORING_LEASE_SECONDS` rather than after the whole batch window.
+
+    Args:
+      - poll_interval_seconds: How often to poll the batch. Defaults to `SCORING_BATCH_POLL_INTERVAL_SECONDS`.
+      - timeout_seconds: How long to wait for the batch. Defaults to `SCORING_BATCH_TIMEOUT_SECONDS`.
+
+    Returns:
+      - list[str]: The IDs of resumes that were processed
+    """
+
+    openai_helper: AsyncOpenAIHelper = get_async_openai_helper()
+    batch_helper: OpenAIBatchHelper = OpenAIBatchHelper(openai_helper=openai_helper)
+    assessment_cache: AssessmentCache = get_assessment_cache()
+    compactor: TextCompactor = get_text_compactor()
+
+    poll_interval_seconds = poll_interval_seconds or scoring_settings.BATCH_POLL_INTERVAL_SECONDS
+    timeout_seconds = timeout_seconds or scoring_settings.BATCH_TIMEOUT_SECONDS
+
+    worker_id: str = generate_worker_id()
+    lease_seconds: int = scoring_settings.LEASE_SECONDS
+
+    async with get_context_managed_session() as session:
+        resumes: list[Resume] = await claim_pending_resumes(
+            session=session,
+            worker_id=worker_id,
+            limit=BATCH_MAX_REQUESTS,
+            lease_seconds=lease_seconds,
+        )
+
+    leased_resume_ids: set[str] = {resume.id for resume in resumes}
+    heartbeat_task: asyncio.Task = asyncio.create_task(
+        heartbeat_leases(resume_ids=leased_resume_ids, worker_id=worker_id, lease_seconds=lease_seconds)
+    )
+    try:
+        processed_resume_ids: list[str] = await assess_claimed_resumes(
+            resumes=resumes,
+            batch_helper=batch_helper,
+            assessment_cache=assessment_cache,
+            compactor=compactor,
+            worker_id=worker_id,
+            leased_resume_ids=leased_resume_ids,
+            poll_interval_seconds=poll_interval_seconds,
+            timeout_seconds=timeout_seconds,
+        )
+    finally:
+        heartbeat_task.cancel()
+
+    logging.info(
+        f"Processed {len(processed_resume_ids)}/{len(resumes)} resumes through OpenAI batch | "
+        f"Assessment cache | {assessment_cache.stats} | Compaction | {compactor.stats}"
+    )
+
+    return processed_resume_ids
+
+
+async def assess_claimed_resumes(
+    resumes: list[Resume],
+    batch_helper: OpenAIBatchHelper,
+    assessment_cache: AssessmentCache,
+    compactor: TextCompactor,
+    worker_id: str,
+    leased_resume_ids: set[str],
+    poll_interval_seconds: float,
+    timeout_seconds: float,
+) -> list[str]:
+    """
+    Assesses claimed resumes through the OpenAI Batch API, unless their assessment is cached, and stores the results.
+
+    Returns:
+      - list[str]: The IDs of resumes that were processed
+    """
+
+    tools: list[dict[str]] = [TOOLS[RoleTypes.SENIOR_PRODUCT_ENGINEER]]
+    assessment_rows: list[dict] = []
+    failed_resume_ids: list[str] = []
+    requests: list[dict] = []
+    cache_keys: dict[str, str] = {}
+
+    async with get_context_managed_session() as session:
+        roles: dict[str, Role] = {}
+
+        for resume in resumes:
+            if resume.role_id not in roles:
+                try:
+                    roles[resume.role_id] = await RoleDBHelper.get_role(
+                        session=session, id=resume.role_id
+                    )
+                except Exception as e:
+                    failed_resume_ids.append(resume.id)
+                    logging.error(
+                        f"Could not find associated role for the resume | {str(e)}"
+                    )
+                    continue
+
+            role_description: str = roles[resume.role_id].description
+            resume_content: str = compactor.compact(resume.content).text
+            system_msg, user_msg = build_assessment_prompt(
+                resume_content=resume_content,
+                role_description=role_description,
+            )
+
+            cache_key: str = build_assessment_cache_key(
+                resume_text=resume_content,
+                role_description=role_description,
+                model=batch_helper.model,
+                tools=tools,
+            )
+            resume_data = await assessment_cache.get(session=session, key=cache_key)
+            if resume_data is not None:
+                assessment_rows.append(build_assessment_row(resume.id, resume_data))
+                continue
+
+            cache_keys[resume.id] = cache_key
+            requests.append(
+                batch_helper.build_request(
+                    custom_id=resume.id,
+                    user_msg=user_msg,
+                    system_msg=system_msg,
+                    tools=tools,
+                )
+            )
+
+    if requests:
+        chunks: list[list[dict]] = chunk_batch_requests(requests)
+        chunk_results: list[BatchResults | None] = await asyncio.gather(*(
+            run_batch(
+                batch_helper=batch_helper,
+                requests=chunk,
+                worker_id=worker_id,
+                poll_interval_seconds=poll_interval_seconds,
+                timeout_seconds=timeout_seconds,
+                leased_resume_ids=leased_resume_ids,
+            )
+            for chunk in chunks
+        ))
+
+        results = BatchResults()
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            # Deferred resumes are claimed again later, leave them out of this run's results
+            if chunk_result is None:
+                for request in chunk:
+                    cache_keys.pop(request["custom_id"])
+                continue
+            results.successes.update(chunk_result.successes)
+            results.failures.update(chunk_result.failures)
+
+        async with get_context_managed_session() as session:
+            for resume_id, cache_key in cache_keys.items():
+                resume_data = results.successes.get(resume_id)
+                if resume_data is None:
+                    failed_resume_ids.append(resume_id)
+                    logging.error(
+                        f"Failed to assess resume using OpenAI batch | {results.failures.get(resume_id, 'Missing from batch output')}"
+                    )
+                    continue
+
+                try:
+                    assessment_rows.append(build_assessment_row(resume_id, resume_data))
+                except Exception as e:
+                    failed_resume_ids.append(resume_id)
+                    logging.error(
+                        f"Failed to parse assessment data from OpenAI response | {str(e)}"
+                    )
+                    continue
+
+                await assessment_cache.put(session=session, key=cache_key, value=resume_data)
+
+    # Resumes whose lease expired and was taken over by another worker are left alone
+    processed_resume_ids: list[str] = []
+    async with get_context_managed_session() as session:
+        try:
+            processed_resume_ids = await ResumeDBHelper.bulk_update(
+                session=session, assessments=assessment_rows, worker_id=worker_id
+            )
+        except Exception as e:
+            await session.rollback()
+            failed_resume_ids += [row["id"] for row in assessment_rows]
+            logging.error(
+                f"Failed to update resume information using OpenAI batch response | {str(e)}"
+            )
+        else:
+            if len(processed_resume_ids) < len(assessment_rows):
+                logging.warning(
+                    f"Lease lost on {len(assessment_rows) - len(processed_resume_ids)} resume(s) "
+                    f"before their assessment was stored, dropping them"
+                )
+
+        failed: int = await ResumeDBHelper.bulk_update_status(
+            session=session, ids=failed_resume_ids, status=StatusTypes.FAILED, worker_id=worker_id
+        )
+        if failed < len(failed_resume_ids):
+            logging.warning(
+                f"Lease lost on {len(failed_resume_ids) - failed} resume(s) before they could be set to FAILED, leaving them"
+            )
+
+    return processed_resume_ids
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(process_resumes_batch())
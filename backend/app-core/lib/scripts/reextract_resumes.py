@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import logging
+
+from lib.helpers.db.resume import ResumeDBHelper
+from lib.helpers.document import DocumentSource
+from lib.helpers.extraction import (
+    DOCX_CONTENT_TYPE,
+    PDF_CONTENT_TYPE,
+    detect_content_type,
+    get_document_extractor,
+    shutdown_document_extractor,
+)
+from lib.helpers.s3 import close_s3_handler, get_s3_handler
+
+from db.db import get_context_managed_session
+
+from settings import ingestion_settings, s3_settings
+
+
+REEXTRACT_UPDATE_BATCH_SIZE = 100
+
+
+def read_head(source: DocumentSource, size: int = 8) -> bytes:
+    """
+    Reads the first bytes of a downloaded document, without loading a spooled document into memory
+    """
+
+    if isinstance(source, str):
+        with open(source, "rb") as file:
+            return file.read(size)
+
+    return bytes(source[:size])
+
+
+async def reextract_resumes(
+    role_id: str,
+    concurrency: int | None = None,
+    rescore: bool = False,
+) -> list[str]:
+    """
+    Re-extracts the text of every resume of a role from its original file in S3, and updates the resume's content
+    when it changed.
+
+    Files are streamed from S3 by `concurrency` workers, each handling one file at a time. Small files are kept
+    in memory and larger ones are spooled to disk (see `S3Handler.open_document`), so peak memory is bounded by
+    `concurrency` files no matter how many resumes the role has.
+
+    Args:
+      - role_id: The role whose resumes should be re-extracted
+      - concurrency: The number of files downloaded and extracted at once. Defaults to `INGESTION_CONCURRENCY`.
+      - rescore: Whether to set resumes whose content changed back to PENDING, so that scoring workers assess them
+        again. Resumes already assessed by a reviewer keep their status.
+
+    Returns:
+      - list[str]: The IDs of resumes whose content changed
+    """
+
+    concurrency = concurrency or ingestion_settings.CONCURRENCY
+    spool_threshold_bytes = s3_settings.DOWNLOAD_SPOOL_THRESHOLD_MB * 1024 * 1024
+
+    async with get_context_managed_session() as session:
+        object_keys: list[tuple[str, str]] = await ResumeDBHelper.select_object_keys(
+            session=session, role_id=role_id
+        )
+
+        queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
+        for item in object_keys:
+            queue.put_nowait(item)
+
+        updated_ids: list[str] = []
+        extracted_ids: list[str] = []
+        pending_contents: dict[str, str] = {}
+        # The session is shared by all workers, so writes are serialized
+        session_lock = asyncio.Lock()
+
+        async def flush() -> None:
+            contents = dict(pending_contents)
+            pending_contents.clear()
+            if not contents:
+                return
+
+            try:
+                updated_ids.extend(
+                    await ResumeDBHelper.bulk_update_content(session=session, contents=contents, rescore=rescore)
+                )
+                extracted_ids.extend(contents)
+            except Exception as e:
+                await session.rollback()
+                logging.error(f"Failed to save {len(contents)} re-extracted resumes | {str(e)}")
+
+        async def work() -> None:
+            while not queue.empty():
+                id, s3_object_key = queue.get_nowait()
+
+                try:
+                    async with get_s3_handler().open_document(
+                        s3_object_key, spool_threshold_bytes=spool_threshold_bytes
+                    ) as document:
+                        content_type = document.content_type
+                        if content_type not in [PDF_CONTENT_TYPE, DOCX_CONTENT_TYPE]:
+                            # Objects uploaded without a content type
+                            content_type = detect_content_type(read_head(document.source))
+
+                        extraction_result = await get_document_extractor().extract(
+                            source=document.source,
+                            content_type=content_type,
+                            filename=s3_object_key,
+                        )
+                except Exception as e:
+                    logging.error(f"Failed to re-extract resume {id} | {str(e)}")
+                    continue
+
+                async with session_lock:
+                    pending_contents[id] = extraction_result.text
+                    if len(pending_contents) >= REEXTRACT_UPDATE_BATCH_SIZE:
+                        await flush()
+
+        await asyncio.gather(*[work() for _ in range(concurrency)])
+        await flush()
+
+    logging.info(
+        f"Re-extracted {len(extracted_ids)}/{len(object_keys)} resumes of role {role_id}, "
+        f"{len(updated_ids)} with changed content"
+    )
+
+    return updated_ids
+
+
+async def main(role_id: str, concurrency: int | None, rescore: bool) -> None:
+    try:
+        await reextract_resumes(role_id=role_id, concurrency=concurrency, rescore=rescore)
+    finally:
+        await close_s3_handler()
+        shutdown_document_extractor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-extracts the text of all resumes of a role from their files in S3.")
+    parser.add_argument("role_id", help="The role whose resumes should be re-extracted")
+    parser.add_argument("--concurrency", type=int, default=None, help="Number of files downloaded and extracted at once")
+    parser.add_argument("--rescore", action="store_true", help="Set resumes whose content changed back to PENDING for scoring, unless assessed by a reviewer")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(role_id=args.role_id, concurrency=args.concurrency, rescore=args.rescore))
@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import contextlib
+import logging
+import random
+import signal
+from collections.abc import Awaitable, Callable
+
+import asyncpg
+
+from lib.helpers.db.resume import RESUME_PENDING_CHANNEL
+from lib.helpers.openai import close_async_openai_helper
+from lib.scripts.process_resumes import process_resumes
+
+from db.db import get_db_url
+
+from settings import scoring_settings
+
+
+class PendingResumeListener:
+    """
+    Keeps a connection LISTENing on `RESUME_PENDING_CHANNEL`, and sets `wakeup_event` on every notification.
+
+    A lost connection is noticed through its termination listener, or by a periodic health check (`SELECT 1`)
+    when it was dropped silently (ie: by a NAT or a failover), and is re-established with full-jitter exponential
+    backoff. Notifications sent while disconnected are lost, so `wakeup_event` is also set on every reconnection.
+    """
+
+    def __init__(
+        self,
+        wakeup_event: asyncio.Event,
+        health_check_seconds: float | None = None,
+        backoff_base_seconds: float | None = None,
+        backoff_max_seconds: float | None = None,
+        connect: Callable[[], Awaitable[asyncpg.Connection]] | None = None,
+    ):
+        """
+        Args:
+          - health_check_seconds: Defaults to `SCORING_LISTEN_HEALTH_CHECK_SECONDS`.
+          - backoff_base_seconds: Defaults to `SCORING_LISTEN_RECONNECT_BACKOFF_BASE_SECONDS`.
+          - backoff_max_seconds: Defaults to `SCORING_LISTEN_RECONNECT_BACKOFF_MAX_SECONDS`.
+          - connect: Opens the connection, defaults to a new connection to the primary
+        """
+
+        self.wakeup_event = wakeup_event
+        self.health_check_seconds = health_check_seconds or scoring_settings.LISTEN_HEALTH_CHECK_SECONDS
+        self.backoff_base_seconds = backoff_base_seconds or scoring_settings.LISTEN_RECONNECT_BACKOFF_BASE_SECONDS
+        self.backoff_max_seconds = backoff_max_seconds or scoring_settings.LISTEN_RECONNECT_BACKOFF_MAX_SECONDS
+        self.connect = connect or (lambda: asyncpg.connect(get_db_url()))
+        self.connection: asyncpg.Connection | None = None
+        self.reconnects: int = 0
+
+    def on_notify(self, *args) -> None:
+        self.wakeup_event.set()
+
+    async def listen(self) -> asyncpg.Connection:
+        connection: asyncpg.Connection = await self.connect()
+        try:
+            await connection.add_listener(RESUME_PENDING_CHANNEL, self.on_notify)
+        except BaseException:
+            connection.terminate()
+            raise
+
+        return connection
+
+    async def wait_until_lost(self, connection: asyncpg.Connection) -> None:
+        """
+        Returns once the connection is terminated or fails a health check.
+        """
+
+        terminated: asyncio.Event = asyncio.Event()
+        connection.add_termination_listener(lambda connection: terminated.set())
+
+        while not terminated.is_set():
+            try:
+                await asyncio.wait_for(terminated.wait(), timeout=self.health_check_seconds)
+            except (TimeoutError, asyncio.TimeoutError):
+                try:
+                    await asyncio.wait_for(connection.execute("SELECT 1"), timeout=self.health_check_seconds)
+                except Exception as e:
+                    logging.error(f"Health check of the connection listening for pending resumes failed | {str(e)}")
+                    return
+
+        logging.error("Connection listening for pending resumes was terminated")
+
+    async def run(self) -> None:
+        """
+        Listens until cancelled, reconnecting whenever the connection is lost.
+        The worker keeps polling while disconnected.
+        """
+
+        failures: int = 0
+        while True:
+            if failures > 0:
+                delay: float = random.uniform(
+                    0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (failures - 1))
+                )
+                logging.info(f"Listening for pending resumes again in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+            try:
+                self.connection = await self.listen()
+            except Exception as e:
+                failures += 1
+                # Not mission critical, the worker falls back to polling
+                logging.error(f"Failed to listen for pending resumes, polling instead | {str(e)}")
+                continue
+
+            if failures > 0:
+                self.reconnects += 1
+                logging.info("Listening for pending resumes again")
+                self.wakeup_event.set()
+            failures = 0
+
+            await self.wait_until_lost(self.connection)
+            self.connection.terminate()
+            self.connection = None
+            failures = 1
+
+    async def close(self) -> None:
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            try:
+                await connection.close(timeout=5)
+            except Exception as e:
+                connection.terminate()
+                logging.error(f"Failed to close the connection listening for pending resumes | {str(e)}")
+
+
+async def run_scoring_worker(
+    concurrency: int | None = None,
+    poll_interval_seconds: float | None = None,
+) -> None:
+    """
+    Continuously processes PENDING resumes until SIGTERM/SIGINT is received.
+
+    The worker drains the work queue, then sleeps until it is woken up by a Postgres NOTIFY
+    on `RESUME_PENDING_CHANNEL` (sent when resumes are registered) or until `poll_interval_seconds`
+    elapses, whichever comes first. Polling also picks up resumes whose lease expired.
+    The LISTEN connection is re-established whenever it is lost (see `PendingResumeListener`).
+
+    On shutdown, in-flight resumes are finished and claimed resumes that were not started yet
+    are released back to PENDING, so that other workers can pick them up.
+
+    Any number of workers can run side by side, across processes and nodes.
+
+    Args:
+      - concurrency: The number of resumes scored in parallel. Defaults to `SCORING_CONCURRENCY`.
+      - poll_interval_seconds: The maximum time to sleep between queue checks. Defaults to `SCORING_POLL_INTERVAL_SECONDS`.
+    """
+
+    poll_interval_seconds = poll_interval_seconds or scoring_settings.POLL_INTERVAL_SECONDS
+
+    stop_event: asyncio.Event = asyncio.Event()
+    wakeup_event: asyncio.Event = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    listener: PendingResumeListener = PendingResumeListener(wakeup_event=wakeup_event)
+    listener_task: asyncio.Task = asyncio.create_task(listener.run())
+
+    logging.info("Scoring worker started")
+
+    try:
+        while not stop_event.is_set():
+            wakeup_event.clear()
+
+            try:
+                # Returns once the work queue is drained
+                await process_resumes(
+                    concurrency=concurrency,
+                    stop_event=stop_event,
+                )
+            except Exception as e:
+                logging.error(f"Failed to process resumes | {str(e)}")
+
+            stop_task = asyncio.create_task(stop_event.wait())
+            wakeup_task = asyncio.create_task(wakeup_event.wait())
+            await asyncio.wait(
+                [stop_task, wakeup_task],
+                timeout=poll_interval_seconds,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            stop_task.cancel()
+            wakeup_task.cancel()
+    finally:
+        listener_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await listener_task
+        await listener.close()
+        await close_async_openai_helper()
+
+    logging.info("Scoring worker stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Continuously scores PENDING resumes.")
+    parser.add_argument("--concurrency", type=int, default=None, help="Number of resumes scored in parallel")
+    parser.add_argument("--poll-interval", type=float, default=None, help="Maximum seconds between queue checks")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(
+        run_scoring_worker(
+            concurrency=args.concurrency,
+            poll_interval_seconds=args.poll_interval,
+        )
+    )
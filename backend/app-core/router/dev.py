@@ -6,8 +6,9 @@ from lib.models.dev import (
     HealthResponse,
     DbInsertRequest,
     DBInsertResponse,
+    DBPoolStatusResponse,
 )
-from db.db import get_db
+from db.db import get_db, get_pool_status
 from db.models import Test
 
 router = APIRouter()
@@ -40,3 +41,8 @@ async def db_insert(
         message=new_test.message,
         number=new_test.number,
     )
+
+
+@router.get("/db_pool")
+async def db_pool() -> DBPoolStatusResponse:
+    return DBPoolStatusResponse(**get_pool_status())
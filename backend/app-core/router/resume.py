@@ -1,210 +1,318 @@
-# import os
-# import logging
-# import tempfile
-# from pathlib import Path
-
-# from fastapi import (
-#   APIRouter,
-#   File,
-#   UploadFile,
-#   HTTPException,
-#   Depends,
-#   Form,
-# )
-# from sqlalchemy.ext.asyncio import AsyncSession
-
-# from lib.models.product.resume import StatusTypes, ClassifierTypes
-# from lib.models.resume import (
-#   RegisterResponse,
-#   ResumeDetails,
-# )
-# from lib.helpers.pdf import (
-#    extract_text_from_pdf
-# )
-# from lib.helpers.worddoc import (
-#   extract_text_from_word
-# )
-# from lib.helpers.db.resume import ResumeDBHelper
-# from lib.scripts.process_resumes import process_resumes
-
-# from db.db import get_db
-# from db.models import Resume
-
-
-# router = APIRouter()
-
-
-# @router.post("/register")
-# async def register(
-#   role_id: str = Form(...),
-#   files: list[UploadFile] = File(...),
-#   db: AsyncSession = Depends(get_db),
-# ) -> RegisterResponse:
-#   """
-#   Registers resume files into the DB into PENDING mode, for the given role.
-
-#   Registered resume files should be picked up by the script `lib/scripts/process_resumes.py` and processed
-#   according to the description of the role specified.
-
-#   Args:
-#     - role_id: The ID of the role that the resume files are for
-#     - files: The resume files to register into the DB
-#   Returns:
-#     - RegisterResponse: The ids of the resumes uploaded to the DB
-#   """
-
-#   registered_resume_ids: list[str] = []
-
-#   # TODO: SECURITY - sanitization, file size check (unless enforced on nginx level), harmful content, etc.
-#   for file in files:
-#     if file.content_type not in [
-#       "application/pdf",
-#       "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-#     ]:
-#       raise HTTPException(status_code=400, detail="Invalid file type. Please upload a PDF of DOCX file.")
-
-#     try:
-#       # Read file
-#       contents = await file.read()
-#     except Exception as e:
-#       raise HTTPException(status_code=500, detail=f"Failed to read file | {str(e)}")
-
-#     try:
-#       # Save the uploaded file to a temporary file
-#       file_extension = Path(file.filename).suffix
-#       with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-#           tmp_file.write(contents)
-#           tmp_file_path = tmp_file.name
-
-#       # Extract text based on file type
-#       if file.content_type == "application/pdf":
-#         resume_text: str = extract_text_from_pdf(tmp_file_path)
-#       elif file.content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-#         resume_text: str = extract_text_from_word(tmp_file_path)
-#       else:
-#         raise Exception("Failed to recognize content type of file.")
-#     except Exception as e:
-#       raise HTTPException(status_code=500, detail=f"Failed to extract text from provided file | {str(e)}")
-#     finally:
-#       # Delete the temporary file if it exists
-#       if tmp_file_path and os.path.exists(tmp_file_path):
-#           try:
-#             os.unlink(tmp_file_path)
-#           except Exception as e:
-#             # Not mission critical, log error and continue
-#             logging.error(f"Failed to delete temporary file | {str(e)}")
-
-#     try:
-#       # Insert resume into DB in pending status
-#       inserted_resume_id: str = await ResumeDBHelper.insert(
-#         session=db,
-#         role_id=role_id,
-#         status=StatusTypes.PENDING,
-#         content=resume_text,
-#       )
-#     except Exception as e:
-#       raise HTTPException(status_code=500, detail=f"Failed to save processed resumes into the DB | {str(e)}")
-#     try:
-#       registered_resume_ids.append(inserted_resume_id)
-#     except Exception as e:
-#       logging.error(f"Failed to parse ID from DB inserted resume | {str(e)}")
-
-#   return RegisterResponse(ids=registered_resume_ids)
-
-
-# @router.post("/process")
-# async def process() -> list[str]:
-#   """
-#   Triggers the `process_resumes` script.
-#   This endpoint is strictly for testing purposes, and should be disabled in staging/prod environments
-#   TODO: Disable in development mode (ie: IS_DEV flag)
-
-#   The `process_resumes` script processes 5 pending resumes using OpenAI
-
-#   Returns:
-#     - list[str]: The IDs of resumes that were processed using the `process_resumes` script
-#   """
-
-#   try:
-#       result: list[str] = await process_resumes()
-#       return result
-#   except Exception as e:
-#       raise HTTPException(status_code=500, detail=str(e))
-
-
-# @router.get("/list_by_filters")
-# async def list_by_filters(
-#   role_id: str,
-#   status: StatusTypes = None,
-#   classifier: ClassifierTypes = None,
-#   db: AsyncSession = Depends(get_db),
-# ) -> list[ResumeDetails]:
-#   """
-#   Lists resumes by given filters.
-
-#   NOTE: Optional filters that are not provided are ignored.
-
-#   TODO: Security - limit max num of resumes returned
-
-#   Args:
-#     - role_id: The role that the resumes are for
-#     - status: The status to filter resumes by
-#     - The minimum fitness score to filter resumes by
-
-#   Returns:
-#     - list[ResumeDetails]: The list of resume details requested
-#   """
-
-#   try:
-#     # Fetch resumes from the DB
-#     resumes: list[Resume] = await ResumeDBHelper.select_by_filters(
-#       session=db,
-#       role_id=role_id,
-#       status=status,
-#       classifier=classifier,
-#     )
-#   except Exception as e:
-#     raise HTTPException(status_code=500, detail=f"Failed to fetch resumes from DB | {str(e)}")
-
-#   for resume in resumes:
-#     print('asdf', resume.id, resume.status)
-
-#   try:
-#     resume_details: list[ResumeDetails] = [
-#       ResumeDetails(
-#         id=resume.id,
-#         base_requirement_satisfaction_score=resume.base_requirement_satisfaction_score,
-#         exceptional_considerations=resume.exceptional_considerations,
-#         fitness_score=resume.fitness_score
-#       )
-#       for resume in resumes
-#     ]
-#   except Exception as e:
-#     raise HTTPException(status_code=500, detail=f"Failed to process resumes fetched from DB | {str(e)}")
-
-#   return resume_details
-
-
-# @router.post("/update_status")
-# async def update_status(
-#   id: str = Form(...),
-#   status: StatusTypes = Form(...),
-#   db: AsyncSession = Depends(get_db),
-# ) -> bool:
-#   """
-#   Updates the status of a resume.
-
-#   Args:
-#     - id: The ID of the resume to update
-#     - status: The status that the resume should update to
-#   """
-
-#   if status not in [StatusTypes.ASSESSED_FIT, StatusTypes.ASSESSED_HOLD, StatusTypes.ASSESSED_UNFIT]:
-#     raise HTTPException(status_code=400, detail="Invalid status type. Please enter a human processing status.")
-
-#   try:
-#     await ResumeDBHelper.update_status(session=db, id=id, status=status)
-#   except Exception as e:
-#     raise HTTPException(status_code=500, detail=f"Failed to update status of given resume | {str(e)}")
-
-#   return True
+from fastapi import (
+  APIRouter,
+  File,
+  UploadFile,
+  HTTPException,
+  Depends,
+  Form,
+  Query,
+  Response,
+)
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lib.models.product.resume import StatusTypes, ClassifierTypes, IngestionStatusTypes, REVIEWER_STATUSES
+from lib.models.resume import (
+  RegisterResponse,
+  RegisterJobResponse,
+  RegisterJobDetails,
+  ResumeDetails,
+  ResumeDetailsPage,
+  ListClassifiedResponse,
+)
+from lib.helpers.ingestion import (
+  IngestionFile,
+  IngestionJob,
+  ingest_resumes,
+  ingestion_job_registry,
+)
+from lib.helpers.db.resume import ResumeDBHelper
+from lib.helpers.s3 import get_s3_handler
+
+from db.db import get_db, get_read_db
+
+from settings import listing_settings
+
+
+router = APIRouter()
+
+
+async def build_resume_details(
+  resumes: list[Row],
+  include_download_urls: bool,
+) -> list[ResumeDetails]:
+  """
+  Builds the resume details of resumes selected with `RESUME_DETAILS_COLUMNS`.
+  Download URLs are signed locally in one call, without a request to S3 per resume.
+  """
+
+  download_urls: dict[str, str] = {}
+  if include_download_urls:
+    try:
+      download_urls = await get_s3_handler().generate_presigned_GET_URLs(
+        [resume.s3_object_key for resume in resumes if resume.s3_object_key]
+      )
+    except Exception as e:
+      raise HTTPException(status_code=500, detail=f"Failed to generate download URLs | {str(e)}")
+
+  try:
+    return [
+      ResumeDetails(
+        id=resume.id,
+        base_requirement_satisfaction_score=resume.base_requirement_satisfaction_score,
+        exceptional_considerations=resume.exceptional_considerations,
+        fitness_score=resume.fitness_score,
+        download_url=download_urls.get(resume.s3_object_key),
+      )
+      for resume in resumes
+    ]
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f"Failed to process resumes fetched from DB | {str(e)}")
+
+
+@router.post("/register", responses={207: {"model": RegisterResponse}})
+async def register(
+  response: Response,
+  role_id: str = Form(...),
+  files: list[UploadFile] = File(...),
+) -> RegisterResponse:
+  """
+  Registers resume files into the DB into PENDING mode, for the given role.
+
+  Registered resume files should be picked up by the script `lib/scripts/process_resumes.py` and processed
+  according to the description of the role specified.
+
+  Files are read, uploaded, extracted and inserted by the pipelined `ingest_resumes`.
+  Files that cannot be registered are reported in `failures` and do not prevent the other files
+  from being registered.
+
+  When the registration fails part way, the resumes already inserted stay registered and the response is
+  a 207 Multi-Status, with every other file reported in `failures`. It is a 500 only when no resume was inserted.
+
+  Args:
+    - role_id: The ID of the role that the resume files are for
+    - files: The resume files to register into the DB
+  Returns:
+    - RegisterResponse: The ids of the resumes uploaded to the DB, the files that failed,
+      and the files identical to a resume already registered for the role
+  """
+
+  # TODO: SECURITY - sanitization, file size check (unless enforced on nginx level), harmful content, etc.
+  job: IngestionJob = ingestion_job_registry.create(total=len(files))
+  await ingest_resumes(
+    job=job,
+    role_id=role_id,
+    files=[
+      IngestionFile(filename=file.filename, content_type=file.content_type, file=file.file)
+      for file in files
+    ],
+  )
+
+  if job.status == IngestionStatusTypes.FAILED:
+    if not job.ids:
+      raise HTTPException(status_code=500, detail="Failed to register resumes")
+    response.status_code = 207
+
+  return RegisterResponse(ids=job.ids, failures=job.failures, duplicates=job.duplicates)
+
+
+@router.post("/register_async")
+async def register_async(
+  role_id: str = Form(...),
+  files: list[UploadFile] = File(...),
+) -> RegisterJobResponse:
+  """
+  Starts registering resume files into the DB into PENDING mode, for the given role, and returns right away.
+  The progress of the registration can be polled with `/register_jobs/{job_id}`.
+
+  Args:
+    - role_id: The ID of the role that the resume files are for
+    - files: The resume files to register into the DB
+  Returns:
+    - RegisterJobResponse: The ID of the registration job
+  """
+
+  # Uploads are closed once the request finishes, so they are buffered in memory for the background job
+  ingestion_files: list[IngestionFile] = []
+  for file in files:
+    try:
+      contents = await file.read()
+    except Exception as e:
+      raise HTTPException(status_code=500, detail=f"Failed to read file | {str(e)}")
+
+    ingestion_files.append(
+      IngestionFile.from_bytes(filename=file.filename, content_type=file.content_type, contents=contents)
+    )
+
+  job: IngestionJob = ingestion_job_registry.create(total=len(files))
+  ingestion_job_registry.run_in_background(
+    ingest_resumes(job=job, role_id=role_id, files=ingestion_files)
+  )
+
+  return RegisterJobResponse(job_id=job.id)
+
+
+@router.get("/register_jobs/{job_id}")
+async def get_register_job(
+  job_id: str,
+) -> RegisterJobDetails:
+  """
+  Fetches the progress of a registration job started with `/register_async`.
+
+  Args:
+    - job_id: The ID of the registration job
+  Returns:
+    - RegisterJobDetails: The status of the job, and the resumes registered and failed so far
+  """
+
+  job: IngestionJob | None = ingestion_job_registry.get(job_id)
+  if job is None:
+    raise HTTPException(status_code=404, detail="Registration job not found")
+
+  return job.to_details()
+
+
+@router.post("/process", status_code=202)
+async def process(
+  db: AsyncSession = Depends(get_db),
+) -> None:
+  """
+  Wakes up the scoring workers (see `lib/scripts/scoring_worker.py`), so that they claim PENDING resumes now
+  instead of at their next poll. Resumes are scored by the workers, never within the request.
+  """
+
+  try:
+    await ResumeDBHelper.notify_pending(session=db)
+    await db.commit()
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f"Failed to notify scoring workers | {str(e)}")
+
+
+@router.get("/list_by_filters")
+async def list_by_filters(
+  role_id: str,
+  status: StatusTypes = None,
+  classifier: ClassifierTypes = None,
+  cursor: str | None = None,
+  page_size: int = Query(default=listing_settings.DEFAULT_PAGE_SIZE, ge=1, le=listing_settings.MAX_PAGE_SIZE),
+  include_download_urls: bool = False,
+  db: AsyncSession = Depends(get_read_db),
+) -> ResumeDetailsPage:
+  """
+  Lists resumes by given filters, one page at a time, ordered by ID.
+
+  NOTE: Optional filters that are not provided are ignored.
+
+  Args:
+    - role_id: The role that the resumes are for
+    - status: The status to filter resumes by
+    - classifier: The fitness bucket to filter resumes by
+    - cursor: The `next_cursor` of the previous page, omitted for the first page
+    - page_size: The maximum number of resumes in the page
+    - include_download_urls: Whether to include a presigned download URL for each resume's original file
+
+  Returns:
+    - ResumeDetailsPage: The resume details of the page, and the cursor of the next page
+  """
+
+  try:
+    # Fetch one extra resume to know whether there is a next page
+    resumes: list[Row] = await ResumeDBHelper.select_by_filters(
+      session=db,
+      role_id=role_id,
+      status=status,
+      classifier=classifier,
+      after_id=cursor,
+      limit=page_size + 1,
+    )
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f"Failed to fetch resumes from DB | {str(e)}")
+
+  has_next_page: bool = len(resumes) > page_size
+  resumes = resumes[:page_size]
+
+  resume_details: list[ResumeDetails] = await build_resume_details(
+    resumes=resumes,
+    include_download_urls=include_download_urls,
+  )
+
+  return ResumeDetailsPage(
+    items=resume_details,
+    next_cursor=resumes[-1].id if has_next_page else None,
+  )
+
+
+@router.get("/list_classified")
+async def list_classified(
+  role_id: str,
+  status: StatusTypes = None,
+  limit_per_bucket: int = Query(default=listing_settings.DEFAULT_PAGE_SIZE, ge=1, le=listing_settings.MAX_PAGE_SIZE),
+  include_download_urls: bool = False,
+  db: AsyncSession = Depends(get_read_db),
+) -> ListClassifiedResponse:
+  """
+  Lists the scored resumes of a role grouped into classifier buckets (very fit, fit, not fit), in a single query.
+  The thresholds of the buckets are set by `CLASSIFIER_VERY_FIT_MIN_SCORE` and `CLASSIFIER_FIT_MIN_SCORE`.
+
+  Args:
+    - role_id: The role that the resumes are for
+    - status: The status to filter resumes by
+    - limit_per_bucket: The maximum number of resumes listed in each bucket, highest fitness score first
+    - include_download_urls: Whether to include a presigned download URL for each resume's original file
+
+  Returns:
+    - ListClassifiedResponse: The top resumes of each bucket, and the total number of resumes in each bucket
+  """
+
+  try:
+    resumes, counts = await ResumeDBHelper.select_classified(
+      session=db,
+      role_id=role_id,
+      status=status,
+      limit_per_bucket=limit_per_bucket,
+    )
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f"Failed to fetch resumes from DB | {str(e)}")
+
+  resume_details: list[ResumeDetails] = await build_resume_details(
+    resumes=[resume for bucket in resumes.values() for resume in bucket],
+    include_download_urls=include_download_urls,
+  )
+  resume_details_by_id: dict[str, ResumeDetails] = {details.id: details for details in resume_details}
+
+  def bucket_details(classifier: ClassifierTypes) -> list[ResumeDetails]:
+    return [resume_details_by_id[resume.id] for resume in resumes[classifier]]
+
+  return ListClassifiedResponse(
+    very_fit=bucket_details(ClassifierTypes.VERY_FIT),
+    fit=bucket_details(ClassifierTypes.FIT),
+    not_fit=bucket_details(ClassifierTypes.UNFIT),
+    very_fit_count=counts[ClassifierTypes.VERY_FIT],
+    fit_count=counts[ClassifierTypes.FIT],
+    not_fit_count=counts[ClassifierTypes.UNFIT],
+  )
+
+
+@router.post("/update_status")
+async def update_status(
+  id: str = Form(...),
+  status: StatusTypes = Form(...),
+  db: AsyncSession = Depends(get_db),
+) -> bool:
+  """
+  Updates the status of a resume.
+
+  Args:
+    - id: The ID of the resume to update
+    - status: The status that the resume should update to
+  """
+
+  if status not in REVIEWER_STATUSES:
+    raise HTTPException(status_code=400, detail="Invalid status type. Please enter a human processing status.")
+
+  try:
+    await ResumeDBHelper.update_status(session=db, id=id, status=status)
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f"Failed to update status of given resume | {str(e)}")
+
+  return True
@@ -12,10 +12,155 @@ class PostgresSettings:
   HOST: str = os.getenv("POSTGRES_HOST")
   PORT: int = int(os.getenv("POSTGRES_PORT"))
 
+  # Connection pool of the async engine, per process
+  POOL_SIZE: int = int(os.getenv("POSTGRES_POOL_SIZE", "10"))
+  MAX_OVERFLOW: int = int(os.getenv("POSTGRES_MAX_OVERFLOW", "10"))
+  POOL_TIMEOUT_SECONDS: float = float(os.getenv("POSTGRES_POOL_TIMEOUT_SECONDS", "30"))
+  POOL_RECYCLE_SECONDS: int = int(os.getenv("POSTGRES_POOL_RECYCLE_SECONDS", "1800"))
+  POOL_PRE_PING: bool = os.getenv("POSTGRES_POOL_PRE_PING", "true").lower() == "true"
+  CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("POSTGRES_CONNECT_TIMEOUT_SECONDS", "10"))
+  # Prepared statements cached per connection by asyncpg, and by SQLAlchemy's asyncpg dialect
+  STATEMENT_CACHE_SIZE: int = int(os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "100"))
+  # Set when connecting through PgBouncer in transaction pooling mode, which cannot keep prepared statements.
+  # NOTE: LISTEN (used by scoring workers) does not work through PgBouncer in transaction mode, workers fall back to polling.
+  PGBOUNCER_TRANSACTION_MODE: bool = os.getenv("POSTGRES_PGBOUNCER_TRANSACTION_MODE", "false").lower() == "true"
+
+  # Optional read replica for read-only endpoints, with the same credentials and database as the primary
+  REPLICA_HOST: str | None = os.getenv("POSTGRES_REPLICA_HOST") or None
+  REPLICA_PORT: int = int(os.getenv("POSTGRES_REPLICA_PORT") or os.getenv("POSTGRES_PORT"))
+  # Reads go to the primary while the replica lags further behind than this
+  REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("POSTGRES_REPLICA_MAX_LAG_SECONDS", "5"))
+  REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = float(os.getenv("POSTGRES_REPLICA_LAG_CHECK_INTERVAL_SECONDS", "1"))
+
 
 class OpenApiSettings:
   API_KEY: str = os.getenv("OPEN_AI_API_KEY")
   ORGANIZATION_ID: str = os.getenv("OPEN_AI_ORGANIZATION_ID")
+  BASE_URL: str | None = os.getenv("OPEN_AI_BASE_URL")
+  TIMEOUT_SECONDS: float = float(os.getenv("OPEN_AI_TIMEOUT_SECONDS", "60"))
+  CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("OPEN_AI_CONNECT_TIMEOUT_SECONDS", "5"))
+  MAX_CONNECTIONS: int = int(os.getenv("OPEN_AI_MAX_CONNECTIONS", "32"))
+  MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("OPEN_AI_MAX_KEEPALIVE_CONNECTIONS", "16"))
+  MODEL: str = os.getenv("OPEN_AI_MODEL", "gpt-4o-mini")
+  KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("OPEN_AI_KEEPALIVE_EXPIRY_SECONDS", "30"))
+  MAX_ATTEMPTS: int = int(os.getenv("OPEN_AI_MAX_ATTEMPTS", "4"))
+  BACKOFF_BASE_SECONDS: float = float(os.getenv("OPEN_AI_BACKOFF_BASE_SECONDS", "1"))
+  BACKOFF_MAX_SECONDS: float = float(os.getenv("OPEN_AI_BACKOFF_MAX_SECONDS", "30"))
+  CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("OPEN_AI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+  CIRCUIT_RESET_SECONDS: float = float(os.getenv("OPEN_AI_CIRCUIT_RESET_SECONDS", "30"))
+  # A duplicate request is sent when a request has not answered after this many seconds, 0 disables hedging
+  HEDGE_AFTER_SECONDS: float = float(os.getenv("OPEN_AI_HEDGE_AFTER_SECONDS", "0"))
+
+
+class LLMSettings:
+  # openai, openai_compatible (a server at OPEN_AI_BASE_URL, ie: vLLM) or stub (in-process, for load testing)
+  BACKEND: str = os.getenv("LLM_BACKEND", "openai")
+  # fixed, uniform, normal or lognormal
+  STUB_LATENCY_DISTRIBUTION: str = os.getenv("LLM_STUB_LATENCY_DISTRIBUTION", "lognormal")
+  STUB_LATENCY_SECONDS: float = float(os.getenv("LLM_STUB_LATENCY_SECONDS", "1.5"))
+  STUB_LATENCY_SPREAD: float = float(os.getenv("LLM_STUB_LATENCY_SPREAD", "0.5"))
+  STUB_ERROR_RATE: float = float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
+  STUB_SEED: int | None = int(os.getenv("LLM_STUB_SEED")) if os.getenv("LLM_STUB_SEED") else None
+
+
+class ScoringSettings:
+  CONCURRENCY: int = int(os.getenv("SCORING_CONCURRENCY", "8"))
+  REQUESTS_PER_MINUTE: int = int(os.getenv("SCORING_REQUESTS_PER_MINUTE", "500"))
+  TOKENS_PER_MINUTE: int = int(os.getenv("SCORING_TOKENS_PER_MINUTE", "200000"))
+  CLAIM_BATCH_SIZE: int = int(os.getenv("SCORING_CLAIM_BATCH_SIZE", "50"))
+  LEASE_SECONDS: int = int(os.getenv("SCORING_LEASE_SECONDS", "300"))
+  MAX_ATTEMPTS: int = int(os.getenv("SCORING_MAX_ATTEMPTS", "3"))
+  POLL_INTERVAL_SECONDS: float = float(os.getenv("SCORING_POLL_INTERVAL_SECONDS", "30"))
+  BATCH_POLL_INTERVAL_SECONDS: float = float(os.getenv("SCORING_BATCH_POLL_INTERVAL_SECONDS", "60"))
+  BATCH_TIMEOUT_SECONDS: float = float(os.getenv("SCORING_BATCH_TIMEOUT_SECONDS", str(25 * 60 * 60)))
+  MULTI_RESUME_ENABLED: bool = os.getenv("SCORING_MULTI_RESUME_ENABLED", "false").lower() == "true"
+  MULTI_RESUME_MAX_RESUMES: int = int(os.getenv("SCORING_MULTI_RESUME_MAX_RESUMES", "8"))
+  MULTI_RESUME_MAX_RESUME_TOKENS: int = int(os.getenv("SCORING_MULTI_RESUME_MAX_RESUME_TOKENS", "1000"))
+  # Resumes whose assessment failed transiently (ie: the provider was down) are retried after this many seconds
+  RETRY_DELAY_SECONDS: int = int(os.getenv("SCORING_RETRY_DELAY_SECONDS", "60"))
+  # The LISTEN connection of scoring workers is health checked this often, and re-established when lost,
+  # with full-jitter exponential backoff between attempts
+  LISTEN_HEALTH_CHECK_SECONDS: float = float(os.getenv("SCORING_LISTEN_HEALTH_CHECK_SECONDS", "30"))
+  LISTEN_RECONNECT_BACKOFF_BASE_SECONDS: float = float(os.getenv("SCORING_LISTEN_RECONNECT_BACKOFF_BASE_SECONDS", "1"))
+  LISTEN_RECONNECT_BACKOFF_MAX_SECONDS: float = float(os.getenv("SCORING_LISTEN_RECONNECT_BACKOFF_MAX_SECONDS", "60"))
+
+
+class AssessmentCacheSettings:
+  ENABLED: bool = os.getenv("ASSESSMENT_CACHE_ENABLED", "true").lower() == "true"
+  TTL_SECONDS: int = int(os.getenv("ASSESSMENT_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+  MAX_ENTRIES: int = int(os.getenv("ASSESSMENT_CACHE_MAX_ENTRIES", "100000"))
+
+
+class RoleCacheSettings:
+  ENABLED: bool = os.getenv("ROLE_CACHE_ENABLED", "true").lower() == "true"
+  MAX_ENTRIES: int = int(os.getenv("ROLE_CACHE_MAX_ENTRIES", "1000"))
+  TTL_SECONDS: float = float(os.getenv("ROLE_CACHE_TTL_SECONDS", "60"))
+
+
+class ExtractedTextCacheSettings:
+  ENABLED: bool = os.getenv("EXTRACTED_TEXT_CACHE_ENABLED", "true").lower() == "true"
+  MAX_ENTRIES: int = int(os.getenv("EXTRACTED_TEXT_CACHE_MAX_ENTRIES", "100000"))
+
+
+class CompactionSettings:
+  ENABLED: bool = os.getenv("COMPACTION_ENABLED", "true").lower() == "true"
+  MAX_TOKENS: int = int(os.getenv("COMPACTION_MAX_TOKENS", "6000"))
+  TOKENIZER_ENCODING: str = os.getenv("COMPACTION_TOKENIZER_ENCODING", "o200k_base")
+
+
+class ExtractionSettings:
+  MAX_WORKERS: int = int(os.getenv("EXTRACTION_MAX_WORKERS", str(os.cpu_count() or 1)))
+  TIMEOUT_SECONDS: int = int(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "30"))
+  MEMORY_LIMIT_MB: int = int(os.getenv("EXTRACTION_MEMORY_LIMIT_MB", "1024"))
+
+
+class S3Settings:
+  ACCESS_KEY_ID: str = os.getenv("AWS_ACCESS_KEY_ID")
+  SECRET_ACCESS_KEY: str = os.getenv("AWS_SECRET_ACCESS_KEY")
+  REGION_NAME: str = os.getenv("AWS_REGION_NAME", "us-east-1")
+  BUCKET_NAME: str | None = os.getenv("S3_BUCKET_NAME")
+  # A custom S3 endpoint (ie: http://localhost:9000 for a local MinIO), defaults to AWS
+  ENDPOINT_URL: str | None = os.getenv("S3_ENDPOINT_URL") or None
+  ORGANIZATION_ID: str = os.getenv("S3_ORGANIZATION_ID", "default")
+  MAX_CONCURRENCY: int = int(os.getenv("S3_MAX_CONCURRENCY", "8"))
+  MAX_ATTEMPTS: int = int(os.getenv("S3_MAX_ATTEMPTS", "4"))
+  MULTIPART_THRESHOLD_MB: int = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16"))
+  MULTIPART_CHUNKSIZE_MB: int = int(os.getenv("S3_MULTIPART_CHUNKSIZE_MB", "8"))
+  MULTIPART_CONCURRENCY: int = int(os.getenv("S3_MULTIPART_CONCURRENCY", "4"))
+  # Downloaded documents larger than this are spooled to a temporary file instead of memory
+  DOWNLOAD_SPOOL_THRESHOLD_MB: int = int(os.getenv("S3_DOWNLOAD_SPOOL_THRESHOLD_MB", "8"))
+  PRESIGN_CACHE_ENABLED: bool = os.getenv("S3_PRESIGN_CACHE_ENABLED", "true").lower() == "true"
+  PRESIGN_CACHE_MARGIN_SECONDS: int = int(os.getenv("S3_PRESIGN_CACHE_MARGIN_SECONDS", "300"))
+
+
+class ClassifierSettings:
+  # Fitness score thresholds of the classifier buckets: very fit >= VERY_FIT_MIN_SCORE > fit >= FIT_MIN_SCORE > unfit
+  VERY_FIT_MIN_SCORE: int = int(os.getenv("CLASSIFIER_VERY_FIT_MIN_SCORE", "85"))
+  FIT_MIN_SCORE: int = int(os.getenv("CLASSIFIER_FIT_MIN_SCORE", "50"))
+
+
+class ListingSettings:
+  DEFAULT_PAGE_SIZE: int = int(os.getenv("LISTING_DEFAULT_PAGE_SIZE", "50"))
+  MAX_PAGE_SIZE: int = int(os.getenv("LISTING_MAX_PAGE_SIZE", "500"))
+
+
+class IngestionSettings:
+  CONCURRENCY: int = int(os.getenv("INGESTION_CONCURRENCY", str(2 * (os.cpu_count() or 1))))
+  QUEUE_SIZE: int = int(os.getenv("INGESTION_QUEUE_SIZE", "32"))
+  INSERT_BATCH_SIZE: int = int(os.getenv("INGESTION_INSERT_BATCH_SIZE", "100"))
+  INSERT_FLUSH_SECONDS: float = float(os.getenv("INGESTION_INSERT_FLUSH_SECONDS", "0.5"))
+  JOB_TTL_SECONDS: int = int(os.getenv("INGESTION_JOB_TTL_SECONDS", "3600"))
 
 postgres_settings = PostgresSettings()
 open_api_settings = OpenApiSettings()
+llm_settings = LLMSettings()
+scoring_settings = ScoringSettings()
+assessment_cache_settings = AssessmentCacheSettings()
+extracted_text_cache_settings = ExtractedTextCacheSettings()
+role_cache_settings = RoleCacheSettings()
+compaction_settings = CompactionSettings()
+extraction_settings = ExtractionSettings()
+s3_settings = S3Settings()
+ingestion_settings = IngestionSettings()
+listing_settings = ListingSettings()
+classifier_settings = ClassifierSettings()
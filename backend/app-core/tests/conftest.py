@@ -0,0 +1,10 @@
+import os
+
+
+# settings.py reads its configuration from the environment on import, tests never connect to these
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_DB", "test")
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_PORT", "5432")
+os.environ.setdefault("OPEN_AI_API_KEY", "test")
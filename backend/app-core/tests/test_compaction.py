@@ -0,0 +1,78 @@
+import pytest
+
+from lib.helpers import compaction
+from lib.helpers.compaction import TextCompactor, normalize_extracted_text
+
+
+@pytest.fixture
+def compactor(monkeypatch) -> TextCompactor:
+  # Tokens are estimated from text length, rather than with an encoding that may have to be downloaded
+  monkeypatch.setattr(compaction, "tiktoken", None)
+  return TextCompactor(max_tokens=50, encoding_name="o200k_base")
+
+
+def test_hyphenated_line_breaks_are_joined_keeping_the_hyphen():
+  text = "Full-\nstack engineer\nBuilt an e-\ncommerce platform"
+
+  assert normalize_extracted_text(text) == "Full-stack engineer\nBuilt an e-commerce platform"
+
+
+def test_hyphens_within_a_line_are_left_alone():
+  assert normalize_extracted_text("State-of-the-art front-end - 2019") == "State-of-the-art front-end - 2019"
+
+
+def test_page_numbers_are_dropped_but_years_and_dates_are_kept():
+  text = "\x0c".join([
+    "Experience\nAcme, 2019 - 2021\n06/2019\nPage 1 of 2",
+    "2\nEducation\nMSc, 2018\n- 2 -",
+  ])
+
+  assert normalize_extracted_text(text) == "Experience\nAcme, 2019 - 2021\n06/2019\n\nEducation\nMSc, 2018"
+
+
+def test_bare_numbers_are_only_page_numbers_at_the_edge_of_a_page():
+  text = "Skills\nTeam size\n12\nPython\n3"
+
+  assert normalize_extracted_text(text) == "Skills\nTeam size\n12\nPython"
+
+
+def test_repeated_headers_and_footers_are_dropped():
+  text = "\x0c".join([
+    "Jane Doe - Resume\nExperience\nAcme\njane@example.com",
+    "Jane Doe - Resume\nEducation\nMIT\njane@example.com",
+  ])
+
+  assert normalize_extracted_text(text) == "Jane Doe - Resume\nExperience\nAcme\njane@example.com\n\nEducation\nMIT"
+
+
+def test_whitespace_control_characters_and_duplicate_lines_are_collapsed():
+  text = "Skills\x00\n\n\n\nPython  \t Go\nPython \t Go\nﬁnance"
+
+  assert normalize_extracted_text(text) == "Skills\n\nPython Go\nfinance"
+
+
+def test_compaction_truncates_to_the_token_budget(compactor):
+  text = "\n".join(f"Line {i} of the resume" for i in range(100))
+
+  result = compactor.compact(text)
+
+  assert result.is_truncated
+  assert result.compacted_tokens <= compactor.max_tokens
+  # Cut at a line break
+  assert text.startswith(result.text + "\n")
+  assert compactor.stats.truncated == 1
+
+
+def test_compaction_within_the_token_budget_is_not_truncated(compactor):
+  result = compactor.compact("Page 1\nPython engineer")
+
+  assert result.text == "Python engineer"
+  assert not result.is_truncated
+  assert result.tokens_saved > 0
+
+
+def test_disabled_compaction_returns_the_text_as_is(compactor):
+  compactor.enabled = False
+  text = "Page 1\nPython engineer"
+
+  assert compactor.compact(text).text == text
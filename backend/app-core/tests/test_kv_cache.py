@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from lib.helpers.assessment_cache import AssessmentCache
+from lib.helpers.extracted_text_cache import ExtractedTextCache
+
+
+class RecordingResult:
+  rowcount: int = 0
+
+  def scalars(self):
+    return self
+
+  def first(self):
+    return None
+
+
+class RecordingSession:
+  """
+  Stands in for an AsyncSession, recording the SQL of executed statements, or failing them when `error` is set
+  """
+
+  def __init__(self, error: Exception | None = None):
+    self.error = error
+    self.statements: list[str] = []
+    self.rollbacks: int = 0
+
+  async def execute(self, stmt):
+    if self.error is not None:
+      raise self.error
+    self.statements.append(str(stmt.compile(dialect=postgresql.dialect())))
+    return RecordingResult()
+
+  async def commit(self) -> None:
+    pass
+
+  async def rollback(self) -> None:
+    self.rollbacks += 1
+
+
+@pytest.mark.asyncio
+async def test_assessment_cache_queries_its_table_with_a_ttl():
+  cache = AssessmentCache(ttl_seconds=60, max_entries=10, eviction_interval=1)
+  session = RecordingSession()
+
+  assert await cache.get(session=session, key="key") is None
+  await cache.put(session=session, key="key", value={"fitness_score": 80})
+
+  get, upsert, evict_expired, evict_overflow = session.statements
+  assert "UPDATE assessment_cache" in get and "RETURNING assessment_cache.assessment" in get
+  assert "assessment_cache.created_at >" in get
+  assert "INSERT INTO assessment_cache (key, assessment" in upsert and "ON CONFLICT (key)" in upsert
+  assert "DELETE FROM assessment_cache WHERE assessment_cache.created_at <=" in evict_expired
+  assert "OFFSET" in evict_overflow
+  assert str(cache.stats) == "hits=0 misses=1 hit_rate=0.00% writes=1 evictions=0"
+
+
+@pytest.mark.asyncio
+async def test_extracted_text_cache_queries_its_table_without_a_ttl():
+  cache = ExtractedTextCache(max_entries=10, eviction_interval=1)
+  session = RecordingSession()
+
+  await cache.get(session=session, key="hash")
+  await cache.put(session=session, key="hash", value="text")
+
+  get, upsert, evict_overflow = session.statements
+  assert "RETURNING extracted_text_cache.text" in get and "created_at" not in get
+  assert "INSERT INTO extracted_text_cache (content_hash, text" in upsert
+  assert "ON CONFLICT (content_hash)" in upsert
+  assert "DELETE FROM extracted_text_cache" in evict_overflow
+
+
+@pytest.mark.asyncio
+async def test_cache_errors_are_rolled_back_and_treated_as_misses():
+  cache = ExtractedTextCache(max_entries=10)
+  session = RecordingSession(error=RuntimeError("connection reset"))
+
+  assert await cache.get(session=session, key="hash") is None
+  await cache.put(session=session, key="hash", value="text")
+
+  assert session.rollbacks == 2
+  assert cache.stats.misses == 1
+  assert cache.stats.writes == 0
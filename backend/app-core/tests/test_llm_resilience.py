@@ -0,0 +1,330 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from lib.helpers.llm_backends import LLMBackend, OpenAIBackend, StubBackend
+from lib.helpers.openai import AsyncOpenAIHelper
+from lib.helpers.rate_limit import RateLimiter
+from lib.helpers.resilience import LLMCallError, LLMErrorTypes
+from lib.models.product.resume import StatusTypes
+from lib.scripts import process_resumes
+
+
+TOOL = {
+  "type": "function",
+  "function": {
+    "name": "get_resume_assessment",
+    "parameters": {
+      "type": "object",
+      "properties": {"fitness_score": {"type": "integer"}},
+    },
+  },
+}
+
+
+def build_completion(arguments: str) -> dict:
+  return {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "test-model",
+    "choices": [
+      {
+        "index": 0,
+        "finish_reason": "tool_calls",
+        "message": {
+          "role": "assistant",
+          "content": None,
+          "tool_calls": [
+            {
+              "id": "call_test",
+              "type": "function",
+              "function": {"name": "get_resume_assessment", "arguments": arguments},
+            }
+          ],
+        },
+      }
+    ],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+  }
+
+
+class ScriptedTransport(httpx.MockTransport):
+  """
+  Answers each request with the next response of `responses`, and counts the requests
+  """
+
+  def __init__(self, responses: list[httpx.Response]):
+    self.responses = list(responses)
+    self.requests: int = 0
+    super().__init__(self.handle)
+
+  def handle(self, request: httpx.Request) -> httpx.Response:
+    self.requests += 1
+    return self.responses.pop(0)
+
+
+def build_helper(transport: httpx.MockTransport, **kwargs) -> AsyncOpenAIHelper:
+  backend = OpenAIBackend(
+    api_key="test",
+    organization_id=None,
+    base_url="http://llm.test/v1",
+    transport=transport,
+  )
+  return AsyncOpenAIHelper(backend=backend, model="test-model", backoff_base_seconds=0.01, **kwargs)
+
+
+async def prompt(helper: AsyncOpenAIHelper) -> dict:
+  return await helper.function_call_prompt(user_msg="resume", system_msg="role", tools=[TOOL])
+
+
+def success() -> httpx.Response:
+  return httpx.Response(200, json=build_completion(json.dumps({"fitness_score": 80})))
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_waits_out_retry_after():
+  transport = ScriptedTransport([
+    httpx.Response(429, headers={"retry-after": "0.3"}, json={"error": {"message": "Rate limited"}}),
+    success(),
+  ])
+  helper = build_helper(transport)
+
+  started_at = time.monotonic()
+  assert await prompt(helper) == {"fitness_score": 80}
+
+  assert time.monotonic() - started_at >= 0.3
+  assert transport.requests == 2
+  assert helper.caller.stats.retries == 1
+  assert helper.caller.stats.errors[LLMErrorTypes.RATE_LIMIT] == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_beyond_backoff_max_is_raised_with_retry_after():
+  transport = ScriptedTransport([
+    httpx.Response(429, headers={"retry-after": "120"}, json={"error": {"message": "Rate limited"}}),
+  ])
+  helper = build_helper(transport, backoff_max_seconds=30)
+
+  with pytest.raises(LLMCallError) as e:
+    await prompt(helper)
+
+  assert e.value.type == LLMErrorTypes.RATE_LIMIT
+  assert e.value.retryable
+  assert e.value.retry_after == 120
+  assert transport.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_server_error_then_success():
+  transport = ScriptedTransport([
+    httpx.Response(503, json={"error": {"message": "Unavailable"}}),
+    httpx.Response(500, json={"error": {"message": "Internal error"}}),
+    success(),
+  ])
+  helper = build_helper(transport)
+
+  assert await prompt(helper) == {"fitness_score": 80}
+  assert transport.requests == 3
+  assert helper.caller.stats.errors[LLMErrorTypes.SERVER] == 2
+  assert helper.circuit_breaker.consecutive_failures == 0
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_then_closes_after_half_open_probe():
+  transport = ScriptedTransport([
+    httpx.Response(500, json={"error": {"message": "Internal error"}}),
+    httpx.Response(500, json={"error": {"message": "Internal error"}}),
+    httpx.Response(500, json={"error": {"message": "Internal error"}}),
+    success(),
+  ])
+  helper = build_helper(transport, max_attempts=1, circuit_failure_threshold=2, circuit_reset_seconds=0.2)
+
+  for _ in range(2):
+    with pytest.raises(LLMCallError) as e:
+      await prompt(helper)
+    assert e.value.type == LLMErrorTypes.SERVER
+
+  # Open: calls are rejected without reaching the provider
+  with pytest.raises(LLMCallError) as e:
+    await prompt(helper)
+  assert e.value.type == LLMErrorTypes.CIRCUIT_OPEN
+  assert transport.requests == 2
+
+  # Half-open: a failed probe opens the circuit again
+  await asyncio.sleep(0.2)
+  with pytest.raises(LLMCallError) as e:
+    await prompt(helper)
+  assert e.value.type == LLMErrorTypes.SERVER
+  assert helper.circuit_breaker.seconds_until_retry() > 0
+
+  # Half-open: a successful probe closes the circuit
+  await asyncio.sleep(0.2)
+  assert await prompt(helper) == {"fitness_score": 80}
+  assert helper.circuit_breaker.opened_at is None
+  assert transport.requests == 4
+
+
+@pytest.mark.asyncio
+async def test_circuit_lets_a_single_probe_through():
+  release_probe = asyncio.Event()
+
+  async def handler(request: httpx.Request) -> httpx.Response:
+    await release_probe.wait()
+    return success()
+
+  helper = build_helper(httpx.MockTransport(handler), max_attempts=1, circuit_reset_seconds=0.05)
+  for _ in range(helper.circuit_breaker.failure_threshold):
+    helper.circuit_breaker.record_failure()
+  await asyncio.sleep(0.05)
+
+  probe = asyncio.ensure_future(prompt(helper))
+  await asyncio.sleep(0.01)
+
+  with pytest.raises(LLMCallError) as e:
+    await prompt(helper)
+  assert e.value.type == LLMErrorTypes.CIRCUIT_OPEN
+
+  release_probe.set()
+  assert await probe == {"fitness_score": 80}
+  assert helper.circuit_breaker.opened_at is None
+
+
+def test_backend_must_implement_create_chat_completion():
+  class IncompleteBackend(LLMBackend):
+    pass
+
+  with pytest.raises(TypeError):
+    IncompleteBackend()
+
+
+class SlowFirstBackend(LLMBackend):
+  """
+  Stub backend whose first request hangs, so that it gets hedged
+  """
+
+  def __init__(self):
+    self.stub = StubBackend()
+    self.requests: int = 0
+    self.cancelled: int = 0
+
+  async def create_chat_completion(self, model, messages, tools, prompt_cache_key=None):
+    self.requests += 1
+    if self.requests == 1:
+      try:
+        await asyncio.sleep(10)
+      except asyncio.CancelledError:
+        self.cancelled += 1
+        raise
+
+    return await self.stub.create_chat_completion(model, messages, tools, prompt_cache_key)
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_and_cancels_the_slow_request():
+  backend = SlowFirstBackend()
+  helper = AsyncOpenAIHelper(backend=backend, model="test-model", hedge_after_seconds=0.05)
+
+  started_at = time.monotonic()
+  resume_data = await prompt(helper)
+  await asyncio.sleep(0)
+
+  assert isinstance(resume_data["fitness_score"], int)
+  assert time.monotonic() - started_at < 1
+  assert backend.requests == 2
+  assert backend.cancelled == 1
+  assert helper.caller.stats.hedges == 1
+  assert helper.caller.stats.hedge_wins == 1
+
+
+class CountingRateLimiter(RateLimiter):
+  """
+  Rate limiter with budgets that are never exhausted, counting its acquisitions
+  """
+
+  def __init__(self):
+    super().__init__(requests_per_minute=10_000, tokens_per_minute=10_000_000)
+    self.acquired_tokens: list[int] = []
+
+  async def acquire(self, tokens: int) -> None:
+    self.acquired_tokens.append(tokens)
+    await super().acquire(tokens)
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_is_acquired_for_each_retry():
+  transport = ScriptedTransport([
+    httpx.Response(503, json={"error": {"message": "Unavailable"}}),
+    httpx.Response(500, json={"error": {"message": "Internal error"}}),
+    success(),
+  ])
+  helper = build_helper(transport)
+  rate_limiter = CountingRateLimiter()
+
+  resume_data = await helper.function_call_prompt(
+    user_msg="resume", system_msg="role", tools=[TOOL], rate_limiter=rate_limiter, estimated_tokens=100
+  )
+
+  assert resume_data == {"fitness_score": 80}
+  assert transport.requests == 3
+  assert rate_limiter.acquired_tokens == [100, 100, 100]
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_is_acquired_for_the_hedge():
+  backend = SlowFirstBackend()
+  helper = AsyncOpenAIHelper(backend=backend, model="test-model", hedge_after_seconds=0.05)
+  rate_limiter = CountingRateLimiter()
+
+  await helper.function_call_prompt(
+    user_msg="resume", system_msg="role", tools=[TOOL], rate_limiter=rate_limiter, estimated_tokens=100
+  )
+
+  assert backend.requests == 2
+  assert rate_limiter.acquired_tokens == [100, 100]
+
+
+@pytest.mark.asyncio
+async def test_parse_failure_is_not_retried():
+  transport = ScriptedTransport([
+    httpx.Response(200, json=build_completion("not json")),
+    success(),
+  ])
+  helper = build_helper(transport)
+
+  with pytest.raises(LLMCallError) as e:
+    await prompt(helper)
+
+  assert e.value.type == LLMErrorTypes.PARSE
+  assert not e.value.retryable
+  assert transport.requests == 1
+  assert helper.caller.stats.retries == 0
+  # A malformed answer comes from a provider that is up
+  assert helper.circuit_breaker.consecutive_failures == 0
+
+
+@pytest.mark.asyncio
+async def test_parse_failure_sets_resumes_to_failed(monkeypatch):
+  calls: list[tuple] = []
+
+  async def bulk_update_status(session, ids, status, worker_id=None):
+    calls.append(("bulk_update_status", ids, status))
+    return len(ids)
+
+  async def defer(session, ids, worker_id, delay_seconds):
+    calls.append(("defer", ids, delay_seconds))
+
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "bulk_update_status", bulk_update_status)
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "defer", defer)
+
+  await process_resumes.handle_assessment_failure(
+    session=None,
+    ids=["resume-1"],
+    worker_id="worker-1",
+    error=LLMCallError(type=LLMErrorTypes.PARSE, message="Malformed", retryable=False),
+  )
+
+  assert calls == [("bulk_update_status", ["resume-1"], StatusTypes.FAILED)]
@@ -0,0 +1,260 @@
+import asyncio
+import contextlib
+import json
+
+import httpx
+import pytest
+
+from lib.helpers.llm_backends import OpenAIBackend
+from lib.helpers.openai import AsyncOpenAIHelper
+from lib.helpers.openai_batch import OpenAIBatchHelper, chunk_batch_requests
+from lib.scripts import process_resumes, process_resumes_batch
+
+
+TOOL = {"type": "function", "function": {"name": "get_resume_assessment", "parameters": {"type": "object"}}}
+ASSESSMENT = {"base_requirement_satisfaction_score": 70, "exceptionals": "None", "fitness_score": 80}
+
+
+def build_batch(status: str, output_file_id: str | None = None, error_file_id: str | None = None) -> dict:
+  return {
+    "id": "batch-1",
+    "object": "batch",
+    "endpoint": "/v1/chat/completions",
+    "input_file_id": "file-input",
+    "completion_window": "24h",
+    "created_at": 0,
+    "status": status,
+    "output_file_id": output_file_id,
+    "error_file_id": error_file_id,
+  }
+
+
+def build_output_line(custom_id: str, arguments: str, status_code: int = 200) -> str:
+  body = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "test-model",
+    "choices": [
+      {
+        "index": 0,
+        "finish_reason": "tool_calls",
+        "message": {
+          "role": "assistant",
+          "content": None,
+          "tool_calls": [
+            {"id": "call_test", "type": "function", "function": {"name": "get_resume_assessment", "arguments": arguments}}
+          ],
+        },
+      }
+    ],
+  }
+  return json.dumps({"custom_id": custom_id, "response": {"status_code": status_code, "body": body}, "error": None})
+
+
+class BatchAPI:
+  """
+  Fake OpenAI files and batches endpoints, for an `httpx.MockTransport`.
+  The batch reports each status of `statuses` on successive polls, and stays in the last one.
+  """
+
+  def __init__(self, statuses: list[str], output: str = "", errors: str = ""):
+    self.statuses = list(statuses)
+    self.output = output
+    self.errors = errors
+    self.uploads: list[str] = []
+    self.polls: int = 0
+    self.cancelled: bool = False
+
+  def status(self) -> str:
+    return self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+
+  def handle(self, request: httpx.Request) -> httpx.Response:
+    path: str = request.url.path
+
+    if path == "/v1/files" and request.method == "POST":
+      self.uploads.append(request.content.decode("utf-8"))
+      return httpx.Response(200, json={
+        "id": "file-input", "object": "file", "bytes": 0, "created_at": 0,
+        "filename": "batch_input.jsonl", "purpose": "batch", "status": "processed",
+      })
+    if path == "/v1/batches" and request.method == "POST":
+      return httpx.Response(200, json=build_batch("validating"))
+    if path == "/v1/batches/batch-1":
+      self.polls += 1
+      status: str = self.status()
+      return httpx.Response(200, json=build_batch(
+        status,
+        output_file_id="file-output" if status == "completed" and self.output else None,
+        error_file_id="file-errors" if status == "completed" and self.errors else None,
+      ))
+    if path == "/v1/batches/batch-1/cancel":
+      self.cancelled = True
+      return httpx.Response(200, json=build_batch("cancelling"))
+    if path == "/v1/files/file-output/content":
+      return httpx.Response(200, text=self.output)
+    if path == "/v1/files/file-errors/content":
+      return httpx.Response(200, text=self.errors)
+
+    return httpx.Response(404, json={"error": {"message": f"Unexpected request {request.method} {path}"}})
+
+
+def build_batch_helper(api: BatchAPI) -> OpenAIBatchHelper:
+  backend = OpenAIBackend(
+    api_key="test",
+    organization_id=None,
+    base_url="http://llm.test/v1",
+    transport=httpx.MockTransport(api.handle),
+  )
+  return OpenAIBatchHelper(openai_helper=AsyncOpenAIHelper(backend=backend, model="test-model"))
+
+
+def build_requests(batch_helper: OpenAIBatchHelper, ids: list[str]) -> list[dict]:
+  return [
+    batch_helper.build_request(custom_id=id, user_msg="resume", system_msg="role", tools=[TOOL])
+    for id in ids
+  ]
+
+
+def patch_defer(monkeypatch) -> list[list[str]]:
+  deferred: list[list[str]] = []
+
+  @contextlib.asynccontextmanager
+  async def get_session():
+    yield None
+
+  async def defer(session, ids, worker_id, delay_seconds):
+    deferred.append(ids)
+
+  monkeypatch.setattr(process_resumes_batch, "get_context_managed_session", get_session)
+  monkeypatch.setattr(process_resumes_batch.ResumeDBHelper, "defer", defer)
+
+  return deferred
+
+
+def test_chunk_batch_requests_by_count():
+  requests = [{"custom_id": str(i)} for i in range(5)]
+
+  chunks = chunk_batch_requests(requests, max_requests=2)
+
+  assert [[request["custom_id"] for request in chunk] for chunk in chunks] == [["0", "1"], ["2", "3"], ["4"]]
+
+
+def test_chunk_batch_requests_by_input_file_size():
+  requests = [{"custom_id": str(i), "body": "x" * 100} for i in range(4)]
+  request_bytes = len(json.dumps(requests[0]).encode("utf-8")) + 1
+
+  chunks = chunk_batch_requests(requests, max_bytes=request_bytes * 3)
+
+  assert [len(chunk) for chunk in chunks] == [3, 1]
+
+
+def test_chunk_batch_requests_rejects_a_request_over_the_input_file_size():
+  with pytest.raises(ValueError):
+    chunk_batch_requests([{"custom_id": "0", "body": "x" * 100}], max_bytes=50)
+
+
+@pytest.mark.asyncio
+async def test_run_batch_maps_results_and_errors(monkeypatch):
+  deferred = patch_defer(monkeypatch)
+  api = BatchAPI(
+    statuses=["validating", "in_progress", "completed"],
+    output="\n".join([
+      build_output_line("resume-1", json.dumps(ASSESSMENT)),
+      build_output_line("resume-2", "not json"),
+      build_output_line("resume-3", json.dumps(ASSESSMENT), status_code=500),
+    ]),
+    errors=json.dumps({"custom_id": "resume-4", "error": {"message": "Invalid request"}}),
+  )
+  batch_helper = build_batch_helper(api)
+  requests = build_requests(batch_helper, ["resume-1", "resume-2", "resume-3", "resume-4"])
+
+  results = await process_resumes_batch.run_batch(
+    batch_helper=batch_helper,
+    requests=requests,
+    worker_id="worker-1",
+    poll_interval_seconds=0,
+    timeout_seconds=5,
+  )
+
+  assert results.successes == {"resume-1": ASSESSMENT}
+  assert sorted(results.failures) == ["resume-2", "resume-3", "resume-4"]
+  assert [json.loads(line)["custom_id"] for line in api.uploads[0].split("\n") if line.startswith("{")] == [
+    "resume-1", "resume-2", "resume-3", "resume-4"
+  ]
+  assert api.polls == 3
+  assert not api.cancelled
+  assert deferred == []
+
+
+@pytest.mark.asyncio
+async def test_run_batch_cancels_and_defers_on_timeout(monkeypatch):
+  deferred = patch_defer(monkeypatch)
+  api = BatchAPI(statuses=["in_progress"])
+  batch_helper = build_batch_helper(api)
+  requests = build_requests(batch_helper, ["resume-1", "resume-2"])
+  leased_resume_ids = {"resume-1", "resume-2", "resume-3"}
+
+  results = await process_resumes_batch.run_batch(
+    batch_helper=batch_helper,
+    requests=requests,
+    worker_id="worker-1",
+    poll_interval_seconds=0.01,
+    timeout_seconds=0.05,
+    leased_resume_ids=leased_resume_ids,
+  )
+
+  assert results is None
+  assert api.cancelled
+  assert deferred == [["resume-1", "resume-2"]]
+  # The heartbeat no longer extends the leases of deferred resumes
+  assert leased_resume_ids == {"resume-3"}
+
+
+class FailingBatchAPI(BatchAPI):
+  def handle(self, request: httpx.Request) -> httpx.Response:
+    return httpx.Response(400, json={"error": {"message": "Invalid request"}})
+
+
+@pytest.mark.asyncio
+async def test_run_batch_defers_when_submit_fails(monkeypatch):
+  deferred = patch_defer(monkeypatch)
+  batch_helper = build_batch_helper(FailingBatchAPI(statuses=["failed"]))
+
+  results = await process_resumes_batch.run_batch(
+    batch_helper=batch_helper,
+    requests=build_requests(batch_helper, ["resume-1"]),
+    worker_id="worker-1",
+    poll_interval_seconds=0,
+    timeout_seconds=5,
+  )
+
+  assert results is None
+  assert deferred == [["resume-1"]]
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_extends_leases_of_claimed_resumes(monkeypatch):
+  extended: list[list[str]] = []
+
+  @contextlib.asynccontextmanager
+  async def get_session():
+    yield None
+
+  async def extend_leases(session, ids, worker_id, lease_seconds):
+    extended.append(sorted(ids))
+
+  monkeypatch.setattr(process_resumes, "get_context_managed_session", get_session)
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "extend_leases", extend_leases)
+
+  resume_ids = {"resume-1", "resume-2"}
+  heartbeat = asyncio.create_task(
+    process_resumes.heartbeat_leases(resume_ids=resume_ids, worker_id="worker-1", lease_seconds=0.15)
+  )
+  await asyncio.sleep(0.075)
+  resume_ids.discard("resume-2")
+  await asyncio.sleep(0.075)
+  heartbeat.cancel()
+
+  assert extended[0] == ["resume-1", "resume-2"]
+  assert extended[-1] == ["resume-1"]
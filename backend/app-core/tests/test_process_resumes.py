@@ -0,0 +1,358 @@
+import asyncio
+import contextlib
+import json
+
+import pytest
+
+from lib.helpers.assessment_cache import AssessmentCache
+from lib.helpers.llm_backends import LLMBackend, StubBackend
+from lib.helpers.openai import AsyncOpenAIHelper
+from lib.helpers.rate_limit import RateLimiter
+from lib.models.product.resume import StatusTypes
+from lib.models.role import RoleDetails
+from lib.scripts import process_resumes
+
+
+class FakeSession:
+  """
+  Stands in for an AsyncSession, failing like one that is left in a failed transaction until it is rolled back
+  """
+
+  def __init__(self):
+    self.is_failed: bool = False
+    self.rollbacks: int = 0
+
+  async def rollback(self) -> None:
+    self.is_failed = False
+    self.rollbacks += 1
+
+
+ASSESSMENT = {"base_requirement_satisfaction_score": 70, "exceptionals": "None", "fitness_score": 80}
+
+
+@pytest.mark.asyncio
+async def test_apply_assessment_rolls_back_before_failing_the_resume(monkeypatch):
+  session = FakeSession()
+  failed: list[list[str]] = []
+
+  async def update(session, **kwargs):
+    session.is_failed = True
+    raise RuntimeError("connection reset")
+
+  async def bulk_update_status(session, ids, status, worker_id=None):
+    if session.is_failed:
+      raise RuntimeError("PendingRollbackError")
+    assert status == StatusTypes.FAILED
+    failed.append(ids)
+    return len(ids)
+
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "update", update)
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "bulk_update_status", bulk_update_status)
+
+  is_processed = await process_resumes.apply_assessment(
+    session=session, resume_id="resume-1", resume_data=ASSESSMENT, worker_id="worker-1"
+  )
+
+  assert not is_processed
+  assert failed == [["resume-1"]]
+
+
+@pytest.mark.asyncio
+async def test_fail_resumes_logs_instead_of_raising(monkeypatch):
+  session = FakeSession()
+
+  async def bulk_update_status(session, ids, status, worker_id=None):
+    raise RuntimeError("connection reset")
+
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "bulk_update_status", bulk_update_status)
+
+  await process_resumes.fail_resumes(session=session, ids=["resume-1"], worker_id="worker-1")
+
+  assert session.rollbacks == 1
+
+
+class FakeResume:
+  def __init__(self, id: str, role_id: str = "role-1", content: str = "Resume"):
+    self.id = id
+    self.role_id = role_id
+    self.content = content
+
+
+def patch_run(monkeypatch, resumes: list[FakeResume], claim_error: Exception | None = None) -> dict[str, list]:
+  """
+  Patches the DB access of `process_resumes`, claiming `resumes` once.
+
+  Returns:
+    - The IDs released back to PENDING, under "released"
+  """
+
+  calls: dict[str, list] = {"released": []}
+  batches: list[list[FakeResume]] = [resumes]
+
+  @contextlib.asynccontextmanager
+  async def get_session():
+    yield FakeSession()
+
+  async def claim_pending_resumes(session, worker_id, limit, lease_seconds):
+    if claim_error is not None and not batches:
+      raise claim_error
+    return batches.pop(0) if batches else []
+
+  async def release(session, ids, worker_id):
+    calls["released"] += ids
+
+  monkeypatch.setattr(process_resumes, "get_context_managed_session", get_session)
+  monkeypatch.setattr(process_resumes, "claim_pending_resumes", claim_pending_resumes)
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "release", release)
+  monkeypatch.setattr(process_resumes.scoring_settings, "MULTI_RESUME_ENABLED", False)
+
+  return calls
+
+
+@pytest.mark.asyncio
+async def test_failing_pack_is_released_without_stopping_the_run(monkeypatch):
+  calls = patch_run(monkeypatch, [FakeResume("resume-1"), FakeResume("resume-2"), FakeResume("resume-3")])
+
+  async def process_resume(session, resume, **kwargs):
+    if resume.id == "resume-2":
+      raise RuntimeError("unexpected")
+    return True
+
+  monkeypatch.setattr(process_resumes, "process_resume", process_resume)
+
+  processed_ids = await process_resumes.process_resumes(concurrency=2)
+
+  assert sorted(processed_ids) == ["resume-1", "resume-3"]
+  assert calls["released"] == ["resume-2"]
+
+
+@pytest.mark.asyncio
+async def test_failing_claim_cancels_workers_and_releases_claimed_resumes(monkeypatch):
+  calls = patch_run(
+    monkeypatch,
+    [FakeResume("resume-1"), FakeResume("resume-2")],
+    claim_error=RuntimeError("database is down"),
+  )
+
+  async def process_resume(session, resume, **kwargs):
+    await asyncio.sleep(10)
+    return True
+
+  monkeypatch.setattr(process_resumes, "process_resume", process_resume)
+
+  with pytest.raises(ExceptionGroup):
+    await asyncio.wait_for(process_resumes.process_resumes(concurrency=2), timeout=5)
+
+  assert sorted(calls["released"]) == ["resume-1", "resume-2"]
+
+
+@pytest.mark.parametrize("multi_resume_enabled", [False, True])
+@pytest.mark.asyncio
+async def test_process_resumes_end_to_end_against_the_stub_backend(monkeypatch, multi_resume_enabled):
+  resumes = [FakeResume(f"resume-{i}", content=f"Software engineer, {i} years of Python") for i in range(6)]
+  calls = patch_run(monkeypatch, resumes)
+  monkeypatch.setattr(process_resumes.scoring_settings, "MULTI_RESUME_ENABLED", multi_resume_enabled)
+  stored: dict[str, dict] = {}
+
+  async def get_role_details(session, id):
+    return RoleDetails(id=id, name="Engineer", description="Senior product engineer")
+
+  async def update(session, id, worker_id=None, **assessment):
+    stored[id] = assessment
+    return True
+
+  async def update_status(session, id, status, worker_id=None):
+    assert status == StatusTypes.COMPLETE
+    return True
+
+  helper = AsyncOpenAIHelper(backend=StubBackend(seed=1), model="test-model")
+  monkeypatch.setattr(process_resumes, "get_async_openai_helper", lambda: helper)
+  monkeypatch.setattr(process_resumes, "get_assessment_cache", lambda: AssessmentCache(ttl_seconds=60, max_entries=10, enabled=False))
+  monkeypatch.setattr(process_resumes.RoleDBHelper, "get_role_details", get_role_details)
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "update", update)
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "update_status", update_status)
+
+  processed_ids = await process_resumes.process_resumes(concurrency=3)
+
+  assert sorted(processed_ids) == [resume.id for resume in resumes]
+  assert sorted(stored) == [resume.id for resume in resumes]
+  assert all(0 <= assessment["fitness_score"] <= 100 for assessment in stored.values())
+  assert calls["released"] == []
+  if multi_resume_enabled:
+    assert helper.usage_stats.requests < len(resumes)
+  else:
+    assert helper.usage_stats.requests == len(resumes)
+
+
+def build_pack_assessment(resume_id: str, fitness_score=80, **overrides) -> dict:
+  return {"resume_id": resume_id, **ASSESSMENT, "fitness_score": fitness_score, **overrides}
+
+
+def test_parse_multi_resume_assessments_keeps_valid_assessments_of_known_resumes():
+  resume_data = {
+    "assessments": [
+      build_pack_assessment("resume-1", fitness_score=10),
+      build_pack_assessment("resume-2", fitness_score=20),
+      build_pack_assessment("resume-9"),
+    ]
+  }
+
+  assessments = process_resumes.parse_multi_resume_assessments(resume_data, ["resume-1", "resume-2", "resume-3"])
+
+  assert sorted(assessments) == ["resume-1", "resume-2"]
+  assert assessments["resume-1"] == {**ASSESSMENT, "fitness_score": 10}
+  assert "resume_id" not in assessments["resume-2"]
+
+
+def test_parse_multi_resume_assessments_keeps_the_first_of_duplicate_assessments():
+  resume_data = {
+    "assessments": [
+      build_pack_assessment("resume-1", fitness_score=10),
+      build_pack_assessment("resume-1", fitness_score=90),
+    ]
+  }
+
+  assessments = process_resumes.parse_multi_resume_assessments(resume_data, ["resume-1"])
+
+  assert assessments == {"resume-1": {**ASSESSMENT, "fitness_score": 10}}
+
+
+@pytest.mark.parametrize(
+  "assessment",
+  [
+    build_pack_assessment("resume-1", fitness_score="80"),
+    build_pack_assessment("resume-1", fitness_score=80.5),
+    build_pack_assessment("resume-1", fitness_score=True),
+    build_pack_assessment("resume-1", fitness_score=101),
+    build_pack_assessment("resume-1", base_requirement_satisfaction_score=-1),
+    build_pack_assessment("resume-1", exceptionals=None),
+    {"resume_id": "resume-1", "fitness_score": 80},
+    {**ASSESSMENT},
+    "resume-1",
+  ],
+)
+def test_parse_multi_resume_assessments_leaves_out_invalid_assessments(assessment):
+  assessments = process_resumes.parse_multi_resume_assessments({"assessments": [assessment]}, ["resume-1"])
+
+  assert assessments == {}
+
+
+@pytest.mark.parametrize("resume_data", [{}, {"assessments": None}, {"assessments": {"resume-1": ASSESSMENT}}, []])
+def test_parse_multi_resume_assessments_of_a_malformed_response_is_empty(resume_data):
+  assert process_resumes.parse_multi_resume_assessments(resume_data, ["resume-1"]) == {}
+
+
+class PackBackend(LLMBackend):
+  """
+  Stub backend that answers multi-resume requests with `pack_arguments`, and single resume requests like `StubBackend`
+  """
+
+  def __init__(self, pack_arguments: str):
+    self.stub = StubBackend(seed=1)
+    self.pack_arguments = pack_arguments
+    self.pack_requests: int = 0
+    self.single_requests: list[str] = []
+
+  async def create_chat_completion(self, model, messages, tools, prompt_cache_key=None):
+    if tools[0]["function"]["name"] != "get_resume_assessments":
+      self.single_requests.append(prompt_cache_key)
+      return await self.stub.create_chat_completion(model, messages, tools, prompt_cache_key)
+
+    self.pack_requests += 1
+    completion = await self.stub.create_chat_completion(model, messages, tools, prompt_cache_key)
+    completion.choices[0].message.tool_calls[0].function.arguments = self.pack_arguments
+    return completion
+
+
+def patch_pack(monkeypatch) -> dict[str, dict]:
+  """
+  Patches the DB access of `process_resume_pack`.
+
+  Returns:
+    - The assessment stored on each resume, by resume ID
+  """
+
+  stored: dict[str, dict] = {}
+
+  async def get_role_details(session, id):
+    return RoleDetails(id=id, name="Engineer", description="Senior product engineer")
+
+  async def update(session, id, worker_id=None, **assessment):
+    stored[id] = assessment
+    return True
+
+  async def update_status(session, id, status, worker_id=None):
+    return True
+
+  monkeypatch.setattr(process_resumes.RoleDBHelper, "get_role_details", get_role_details)
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "update", update)
+  monkeypatch.setattr(process_resumes.ResumeDBHelper, "update_status", update_status)
+
+  return stored
+
+
+async def process_pack(backend: PackBackend, resume_ids: list[str]) -> tuple[list[str], process_resumes.ResumePackStats]:
+  pack_stats = process_resumes.ResumePackStats()
+  processed_ids = await process_resumes.process_resume_pack(
+    session=FakeSession(),
+    resumes=[FakeResume(resume_id, content=f"Software engineer {resume_id}") for resume_id in resume_ids],
+    openai_helper=AsyncOpenAIHelper(backend=backend, model="test-model"),
+    rate_limiter=RateLimiter(requests_per_minute=10_000, tokens_per_minute=10_000_000),
+    assessment_cache=AssessmentCache(ttl_seconds=60, max_entries=10, enabled=False),
+    pack_stats=pack_stats,
+    worker_id="worker-1",
+  )
+
+  return processed_ids, pack_stats
+
+
+@pytest.mark.asyncio
+async def test_pack_applies_its_assessments_in_a_single_request(monkeypatch):
+  stored = patch_pack(monkeypatch)
+  backend = PackBackend(json.dumps({
+    "assessments": [build_pack_assessment("resume-1", fitness_score=10), build_pack_assessment("resume-2", fitness_score=20)]
+  }))
+
+  processed_ids, pack_stats = await process_pack(backend, ["resume-1", "resume-2"])
+
+  assert processed_ids == ["resume-1", "resume-2"]
+  assert stored["resume-1"]["fitness_score"] == 10
+  assert stored["resume-2"]["fitness_score"] == 20
+  assert backend.pack_requests == 1
+  assert backend.single_requests == []
+  assert (pack_stats.packs, pack_stats.packed_resumes, pack_stats.fallbacks) == (1, 2, 0)
+
+
+@pytest.mark.asyncio
+async def test_pack_assesses_resumes_missing_from_the_response_alone(monkeypatch):
+  stored = patch_pack(monkeypatch)
+  backend = PackBackend(json.dumps({
+    "assessments": [
+      build_pack_assessment("resume-1", fitness_score=10),
+      build_pack_assessment("resume-2", fitness_score=200),
+      build_pack_assessment("resume-9", fitness_score=90),
+    ]
+  }))
+
+  processed_ids, pack_stats = await process_pack(backend, ["resume-1", "resume-2", "resume-3"])
+
+  assert processed_ids == ["resume-1", "resume-2", "resume-3"]
+  assert stored["resume-1"]["fitness_score"] == 10
+  assert 0 <= stored["resume-2"]["fitness_score"] <= 100
+  assert backend.pack_requests == 1
+  assert len(backend.single_requests) == 2
+  assert pack_stats.fallbacks == 2
+
+
+@pytest.mark.asyncio
+async def test_pack_that_cannot_be_parsed_falls_back_to_a_request_per_resume(monkeypatch):
+  stored = patch_pack(monkeypatch)
+  backend = PackBackend("not json")
+
+  processed_ids, pack_stats = await process_pack(backend, ["resume-1", "resume-2", "resume-3"])
+
+  assert processed_ids == ["resume-1", "resume-2", "resume-3"]
+  assert sorted(stored) == ["resume-1", "resume-2", "resume-3"]
+  assert backend.pack_requests == 1
+  assert len(backend.single_requests) == 3
+  assert (pack_stats.packs, pack_stats.fallbacks) == (1, 3)
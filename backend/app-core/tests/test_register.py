@@ -0,0 +1,146 @@
+import asyncio
+import contextlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from lib.helpers import ingestion
+from lib.helpers.extracted_text_cache import ExtractedTextCache
+from lib.helpers.extraction import PDF_CONTENT_TYPE
+from lib.models.product.resume import IngestionStatusTypes
+from lib.models.resume import RegisterFailure
+from router import resume
+
+
+def build_client(monkeypatch, ids: list[str], failures: list[RegisterFailure], status: IngestionStatusTypes) -> TestClient:
+  """
+  An app serving `/register`, whose ingestion jobs finish with the given IDs, failures and status
+  """
+
+  async def ingest_resumes(job, role_id, files):
+    job.ids = ids
+    job.failures = failures
+    job.status = status
+    return job
+
+  monkeypatch.setattr(resume, "ingest_resumes", ingest_resumes)
+
+  app = FastAPI()
+  app.include_router(resume.router)
+
+  return TestClient(app)
+
+
+def register(client: TestClient):
+  return client.post(
+    "/register",
+    data={"role_id": "role-1"},
+    files=[("files", ("a.pdf", b"a", PDF_CONTENT_TYPE)), ("files", ("b.pdf", b"b", PDF_CONTENT_TYPE))],
+  )
+
+
+def test_complete_registration_is_a_200(monkeypatch):
+  client = build_client(
+    monkeypatch,
+    ids=["resume-1"],
+    failures=[RegisterFailure(filename="b.pdf", detail="Invalid file type")],
+    status=IngestionStatusTypes.COMPLETE,
+  )
+
+  response = register(client)
+
+  assert response.status_code == 200
+  assert response.json()["ids"] == ["resume-1"]
+  assert response.json()["failures"] == [{"filename": "b.pdf", "detail": "Invalid file type"}]
+
+
+def test_failed_registration_with_inserted_resumes_is_a_207_with_its_results(monkeypatch):
+  client = build_client(
+    monkeypatch,
+    ids=["resume-1"],
+    failures=[RegisterFailure(filename="b.pdf", detail="Registration was interrupted")],
+    status=IngestionStatusTypes.FAILED,
+  )
+
+  response = register(client)
+
+  assert response.status_code == 207
+  assert response.json()["ids"] == ["resume-1"]
+  assert response.json()["failures"] == [{"filename": "b.pdf", "detail": "Registration was interrupted"}]
+
+
+def test_failed_registration_without_inserted_resumes_is_a_500(monkeypatch):
+  client = build_client(
+    monkeypatch,
+    ids=[],
+    failures=[RegisterFailure(filename="a.pdf", detail="Registration was interrupted")],
+    status=IngestionStatusTypes.FAILED,
+  )
+
+  assert register(client).status_code == 500
+
+
+class FakeSession:
+  async def rollback(self) -> None:
+    pass
+
+
+class FakeExtractionResult:
+  def __init__(self, text: str):
+    self.text = text
+
+
+@pytest.mark.asyncio
+async def test_interrupted_ingestion_keeps_inserted_resumes_and_fails_every_other_file(monkeypatch):
+  job = ingestion.IngestionJob(total=4)
+
+  @contextlib.asynccontextmanager
+  async def get_session():
+    yield FakeSession()
+
+  class Extractor:
+    async def extract(self, source, content_type, filename):
+      if filename == "b.pdf":
+        # Fails the process stage once a.pdf is inserted
+        while not job.ids:
+          await asyncio.sleep(0.01)
+      return FakeExtractionResult(text=source.decode())
+
+  def sanitize_content(text: str) -> str:
+    if text == "b":
+      raise RuntimeError("process pool is gone")
+    return text
+
+  async def select_ids_by_content_hashes(session, role_id, content_hashes):
+    return {}
+
+  async def bulk_insert(session, role_id, status, contents, s3_object_keys=None, content_hashes=None):
+    return [f"resume-{content}" for content in contents]
+
+  monkeypatch.setattr(ingestion, "get_context_managed_session", get_session)
+  monkeypatch.setattr(ingestion, "get_extracted_text_cache", lambda: ExtractedTextCache(max_entries=10, enabled=False))
+  monkeypatch.setattr(ingestion, "get_document_extractor", lambda: Extractor())
+  monkeypatch.setattr(ingestion, "sanitize_content", sanitize_content)
+  monkeypatch.setattr(ingestion.s3_settings, "BUCKET_NAME", "")
+  monkeypatch.setattr(ingestion.ResumeDBHelper, "select_ids_by_content_hashes", select_ids_by_content_hashes)
+  monkeypatch.setattr(ingestion.ResumeDBHelper, "bulk_insert", bulk_insert)
+
+  await ingestion.ingest_resumes(
+    job=job,
+    role_id="role-1",
+    files=[
+      ingestion.IngestionFile.from_bytes(filename="a.pdf", content_type=PDF_CONTENT_TYPE, contents=b"a"),
+      ingestion.IngestionFile.from_bytes(filename="b.pdf", content_type=PDF_CONTENT_TYPE, contents=b"b"),
+      ingestion.IngestionFile.from_bytes(filename="c.txt", content_type="text/plain", contents=b"c"),
+      ingestion.IngestionFile.from_bytes(filename="d.pdf", content_type=PDF_CONTENT_TYPE, contents=b"d"),
+    ],
+    concurrency=1,
+    queue_size=1,
+    insert_batch_size=1,
+  )
+
+  assert job.status == IngestionStatusTypes.FAILED
+  assert job.ids == ["resume-a"]
+  assert sorted(failure.filename for failure in job.failures) == ["b.pdf", "c.txt", "d.pdf"]
+  assert [failure.detail.startswith("Registration was interrupted") for failure in job.failures].count(True) == 2
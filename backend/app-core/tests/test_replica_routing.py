@@ -0,0 +1,81 @@
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from db import db
+
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+
+def build_session_factory(name: str):
+  class Session:
+    async def __aenter__(self):
+      return name
+
+    async def __aexit__(self, *args):
+      return False
+
+  return Session
+
+
+@pytest.fixture
+def client(monkeypatch) -> TestClient:
+  """
+  An app tracking writes like the API does, whose read sessions are the name of the database they are served by,
+  with a replica lagging 0.5s behind
+  """
+
+  async def get_lag_seconds():
+    return 0.5
+
+  monkeypatch.setattr(db, "replica_engine", object())
+  monkeypatch.setattr(db, "AsyncSessionLocal", build_session_factory(PRIMARY))
+  monkeypatch.setattr(db, "ReadSessionLocal", build_session_factory(REPLICA))
+  monkeypatch.setattr(db.replica_router, "get_lag_seconds", get_lag_seconds)
+
+  app = FastAPI()
+  app.middleware("http")(db.track_writes)
+
+  @app.post("/write")
+  async def write():
+    # What the commit of a write session does
+    db.record_primary_commit(None)
+    return {}
+
+  @app.get("/read")
+  async def read(session: str = Depends(db.get_read_db)):
+    return {"database": session}
+
+  return TestClient(app)
+
+
+def test_reads_go_to_the_replica_without_a_recent_write(client):
+  assert client.get("/read").json() == {"database": REPLICA}
+
+
+def test_a_client_reads_its_own_writes_from_the_primary(client):
+  response = client.post("/write")
+  assert db.LAST_WRITE_COOKIE in response.cookies
+
+  assert client.get("/read").json() == {"database": PRIMARY}
+
+
+def test_writes_of_one_client_do_not_pin_the_reads_of_others(client):
+  client.post("/write")
+
+  other_client = TestClient(client.app)
+  assert other_client.get("/read").json() == {"database": REPLICA}
+
+
+def test_reads_go_back_to_the_replica_once_it_caught_up(client):
+  client.cookies.set(db.LAST_WRITE_COOKIE, str(time.time() - 5))
+
+  assert client.get("/read").json() == {"database": REPLICA}
+
+
+def test_requests_that_do_not_write_set_no_cookie(client):
+  assert db.LAST_WRITE_COOKIE not in client.get("/read").cookies
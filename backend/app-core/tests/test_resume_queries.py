@@ -0,0 +1,21 @@
+import re
+
+from sqlalchemy.dialects import postgresql
+
+from lib.helpers.db.resume import ResumeDBHelper
+
+
+def compile_sql(stmt) -> str:
+  return " ".join(str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True})).split())
+
+
+def test_claimable_ids_walk_each_work_queue_index_separately():
+  sql = compile_sql(ResumeDBHelper.build_select_claimable_ids(limit=10))
+
+  assert " OR " not in sql
+  assert "UNION ALL" in sql
+  # Inlined, so that the partial indexes match in generic plans of prepared statements too
+  assert "WHERE resume.status = 'pending' ORDER BY resume.id LIMIT" in sql
+  assert "WHERE resume.status = 'in_progress' AND resume.lease_expires_at < now() ORDER BY resume.lease_expires_at LIMIT" in sql
+  assert sql.count("FOR UPDATE SKIP LOCKED") == 2
+  assert re.search(r"\) AS claimable ORDER BY claimable.id LIMIT \S+$", sql)
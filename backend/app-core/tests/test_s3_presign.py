@@ -0,0 +1,120 @@
+import boto3
+import pytest
+import requests
+from moto import mock_aws
+
+from lib.helpers import s3_presign
+from lib.helpers.s3_presign import S3Presigner
+
+
+BUCKET = "resumes-test"
+REGION = "us-east-1"
+
+
+class FakeClock:
+  def __init__(self):
+    self.now: float = 1000.0
+
+  def __call__(self) -> float:
+    return self.now
+
+
+@pytest.fixture
+def s3():
+  with mock_aws():
+    client = boto3.client(
+      "s3", region_name=REGION, aws_access_key_id="test", aws_secret_access_key="test"
+    )
+    client.create_bucket(Bucket=BUCKET)
+    yield client
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+  clock = FakeClock()
+  monkeypatch.setattr(s3_presign.time, "monotonic", clock)
+  return clock
+
+
+def build_presigner(**kwargs) -> S3Presigner:
+  return S3Presigner(
+    aws_access_key_id="test",
+    aws_secret_access_key="test",
+    aws_region_name=REGION,
+    s3_bucket_name=BUCKET,
+    **kwargs,
+  )
+
+
+def test_presigned_GET_URLs_of_a_batch_download_each_object(s3):
+  for key in ["resumes/1.pdf", "resumes/2.pdf"]:
+    s3.put_object(Bucket=BUCKET, Key=key, Body=f"content of {key}".encode())
+
+  urls = build_presigner().generate_presigned_GET_URLs(["resumes/1.pdf", "resumes/2.pdf", "resumes/1.pdf"])
+
+  assert list(urls) == ["resumes/1.pdf", "resumes/2.pdf"]
+  for key, url in urls.items():
+    response = requests.get(url)
+    assert response.status_code == 200
+    assert response.content == f"content of {key}".encode()
+
+
+def count_signatures(presigner: S3Presigner, monkeypatch) -> list[str]:
+  """
+  Records the key of every GET URL the presigner signs
+  """
+
+  signatures: list[str] = []
+  generate_presigned_url = presigner.client.generate_presigned_url
+
+  def counting_generate_presigned_url(*args, **kwargs):
+    signatures.append(kwargs["Params"]["Key"])
+    return generate_presigned_url(*args, **kwargs)
+
+  monkeypatch.setattr(presigner.client, "generate_presigned_url", counting_generate_presigned_url)
+  return signatures
+
+
+def test_cached_GET_URL_is_served_until_close_to_expiry(s3, clock, monkeypatch):
+  presigner = build_presigner(cache_enabled=True, cache_margin_seconds=300)
+  signatures = count_signatures(presigner, monkeypatch)
+  url = presigner.generate_presigned_GET_URL("resumes/1.pdf", expiration=3600)
+
+  clock.now += 3600 - 301
+  assert presigner.generate_presigned_GET_URL("resumes/1.pdf", expiration=3600) == url
+  assert signatures == ["resumes/1.pdf"]
+
+  # A different expiration is signed separately
+  presigner.generate_presigned_GET_URL("resumes/1.pdf", expiration=60)
+  assert signatures == ["resumes/1.pdf", "resumes/1.pdf"]
+
+
+def test_cached_GET_URL_is_refreshed_close_to_expiry(s3, clock, monkeypatch):
+  presigner = build_presigner(cache_enabled=True, cache_margin_seconds=300)
+  signatures = count_signatures(presigner, monkeypatch)
+
+  presigner.generate_presigned_GET_URL("resumes/1.pdf", expiration=3600)
+  clock.now += 3600 - 300
+  presigner.generate_presigned_GET_URL("resumes/1.pdf", expiration=3600)
+  presigner.generate_presigned_GET_URL("resumes/1.pdf", expiration=3600)
+
+  assert signatures == ["resumes/1.pdf", "resumes/1.pdf"]
+
+
+def test_GET_URL_cache_evicts_least_recently_used_URLs(s3, clock):
+  presigner = build_presigner(cache_enabled=True, cache_max_entries=2)
+
+  presigner.generate_presigned_GET_URLs(["resumes/1.pdf", "resumes/2.pdf"])
+  presigner.generate_presigned_GET_URL("resumes/1.pdf")
+  presigner.generate_presigned_GET_URL("resumes/3.pdf")
+
+  assert [key for key, _ in presigner._cache] == ["resumes/1.pdf", "resumes/3.pdf"]
+
+
+def test_presigned_POST_uploads_the_object(s3):
+  post = build_presigner().generate_presigned_POST("resumes/uploaded.pdf")
+
+  response = requests.post(post["url"], data=post["fields"], files={"file": b"uploaded content"})
+
+  assert response.status_code == 204
+  assert s3.get_object(Bucket=BUCKET, Key="resumes/uploaded.pdf")["Body"].read() == b"uploaded content"
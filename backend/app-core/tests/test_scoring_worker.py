@@ -0,0 +1,141 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from lib.scripts.scoring_worker import PendingResumeListener
+
+
+class FakeConnection:
+  """
+  Stands in for an asyncpg connection, that can be terminated or made to fail its health checks
+  """
+
+  def __init__(self):
+    self.listeners: list = []
+    self.termination_listeners: list = []
+    self.is_healthy: bool = True
+    self.is_terminated: bool = False
+    self.is_closed: bool = False
+
+  async def add_listener(self, channel, callback) -> None:
+    self.listeners.append(callback)
+
+  def add_termination_listener(self, callback) -> None:
+    self.termination_listeners.append(callback)
+
+  async def execute(self, query: str) -> str:
+    if not self.is_healthy:
+      raise ConnectionResetError("connection reset by peer")
+    return "SELECT 1"
+
+  def notify(self) -> None:
+    for callback in self.listeners:
+      callback(self, 1, "resume_pending", "")
+
+  def lose(self) -> None:
+    for callback in self.termination_listeners:
+      callback(self)
+
+  def terminate(self) -> None:
+    self.is_terminated = True
+
+  async def close(self, timeout=None) -> None:
+    self.is_closed = True
+
+
+class FakeConnector:
+  """
+  Opens fake connections, failing the first `failures` attempts
+  """
+
+  def __init__(self, failures: int = 0):
+    self.failures = failures
+    self.attempts: int = 0
+    self.connections: list[FakeConnection] = []
+
+  async def __call__(self) -> FakeConnection:
+    self.attempts += 1
+    if self.attempts <= self.failures:
+      raise ConnectionRefusedError("connection refused")
+    self.connections.append(FakeConnection())
+    return self.connections[-1]
+
+
+async def wait_for(condition, timeout: float = 2) -> None:
+  async with asyncio.timeout(timeout):
+    while not condition():
+      await asyncio.sleep(0.005)
+
+
+@contextlib.asynccontextmanager
+async def run_listener(connector: FakeConnector, **kwargs):
+  wakeup_event = asyncio.Event()
+  listener = PendingResumeListener(
+    wakeup_event=wakeup_event,
+    backoff_base_seconds=0.01,
+    backoff_max_seconds=0.05,
+    connect=connector,
+    **kwargs,
+  )
+  task = asyncio.create_task(listener.run())
+  try:
+    yield listener, wakeup_event
+  finally:
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+      await task
+    await listener.close()
+
+
+@pytest.mark.asyncio
+async def test_notifications_wake_the_worker_up():
+  connector = FakeConnector()
+  async with run_listener(connector) as (listener, wakeup_event):
+    await wait_for(lambda: listener.connection is not None)
+    assert not wakeup_event.is_set()
+
+    connector.connections[0].notify()
+    assert wakeup_event.is_set()
+
+  assert connector.connections[0].is_closed
+
+
+@pytest.mark.asyncio
+async def test_terminated_connection_is_re_established_and_wakes_the_worker_up():
+  connector = FakeConnector()
+  async with run_listener(connector) as (listener, wakeup_event):
+    await wait_for(lambda: listener.connection is not None)
+    connector.connections[0].lose()
+
+    await wait_for(lambda: len(connector.connections) == 2 and listener.connection is connector.connections[1])
+    assert connector.connections[0].is_terminated
+    assert listener.reconnects == 1
+    # Notifications sent while disconnected are lost, the worker checks the queue instead
+    assert wakeup_event.is_set()
+
+    wakeup_event.clear()
+    connector.connections[1].notify()
+    assert wakeup_event.is_set()
+
+
+@pytest.mark.asyncio
+async def test_connection_failing_its_health_check_is_re_established():
+  connector = FakeConnector()
+  async with run_listener(connector, health_check_seconds=0.02) as (listener, wakeup_event):
+    await wait_for(lambda: listener.connection is not None)
+    connector.connections[0].is_healthy = False
+
+    await wait_for(lambda: len(connector.connections) == 2 and listener.connection is connector.connections[1])
+    assert connector.connections[0].is_terminated
+    assert listener.reconnects == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_connections_are_retried_with_backoff():
+  connector = FakeConnector(failures=3)
+  async with run_listener(connector) as (listener, wakeup_event):
+    await wait_for(lambda: listener.connection is not None)
+
+    assert connector.attempts == 4
+    assert wakeup_event.is_set()